@@ -0,0 +1,191 @@
+"""Admission control: keep collection posts fast while admins run reports.
+
+gunicorn runs each worker with a fixed pool of threads (gunicorn_config.py).
+A few slow report pages used to be able to take every thread, and field
+staff posting ``/loan_collection/collect`` then waited behind them. Every
+request is now put in a class:
+
+* ``write`` - POSTs and other changes (collections, new loans, ...)
+* ``read`` - interactive pages and API lists
+* ``heavy`` - reports and long history pages, marked ``@request_class('heavy')``
+* ``poll`` - the staff message long-poll, marked ``@request_class('poll')``
+
+and each class has its own per-process limit of concurrent requests
+(``ADMISSION_LIMITS``, 0 for no limit) plus a short queue
+(``ADMISSION_QUEUE``) of requests that may wait up to ``ADMISSION_WAIT``
+seconds for a slot. Waiting holds a thread, so the queues are kept small.
+A request that finds its class's queue full, or whose wait runs out, gets an
+immediate 503 with a ``Retry-After`` of about how long the requests ahead of
+it take. Views marked with ``fallback=True`` run anyway without a slot and
+answer cheaply instead: a refused long-poll checks for messages once and
+tells the page when to poll again, so any number of staff can keep one open.
+Since reads, reports and polls together cannot fill the thread pool, there
+is always a thread free for a write.
+
+Responses carry ``X-Request-Class``.
+
+    python stress_admission.py     # collection latency under report load, with and without
+"""
+import logging
+import math
+import threading
+import time
+
+from flask import Response, current_app, g, jsonify, request
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class Gate:
+    """At most ``limit`` requests of one class at once; ``queue`` more may
+    wait up to ``wait`` seconds for a slot."""
+
+    def __init__(self, name, limit, queue, wait):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(limit) if limit else None
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.average = 1.0  # seconds, moving average of the class's requests
+
+    def enter(self):
+        """Take a slot, waiting in the queue if there is room in it. Returns
+        whether the request was admitted."""
+        if self._slots is None or self._slots.acquire(blocking=False):
+            return self._admit()
+        with self._lock:
+            if self.waiting >= self.queue:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+        try:
+            admitted = self._slots.acquire(timeout=self.wait)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not admitted:
+            with self._lock:
+                self.rejected += 1
+            return False
+        return self._admit()
+
+    def _admit(self):
+        with self._lock:
+            self.running += 1
+            self.admitted += 1
+        return True
+
+    def leave(self, elapsed):
+        with self._lock:
+            self.running -= 1
+            self.average = 0.8 * self.average + 0.2 * elapsed
+        if self._slots is not None:
+            self._slots.release()
+
+    def retry_after(self):
+        """Seconds until the requests running and queued now should be done."""
+        with self._lock:
+            batches = (self.running + self.waiting) / (self.limit or 1)
+            return max(1, math.ceil(self.average * max(batches, 1)))
+
+    def stats(self):
+        with self._lock:
+            return {'limit': self.limit, 'queue': self.queue, 'running': self.running, 'waiting': self.waiting,
+                    'admitted': self.admitted, 'rejected': self.rejected, 'average_ms': round(self.average * 1000)}
+
+
+def request_class(name, fallback=False):
+    """Put a view in request class ``name`` (``heavy`` or ``poll``); place
+    it directly below the route decorator. With ``fallback`` a request
+    refused a slot still runs, and the view should check ``refused()``."""
+    def decorator(view):
+        view.request_class = name
+        view.admission_fallback = fallback
+        return view
+    return decorator
+
+
+def refused():
+    """For a ``fallback`` view, the seconds to wait before retrying when this
+    request was refused a slot, or None when it was admitted."""
+    gate = g.get('admission_refused')
+    return gate.retry_after() if gate is not None else None
+
+
+def classify(app):
+    """The class of the current request, or None for static files."""
+    if request.endpoint in (None, 'static', 'asset'):
+        return None
+    view = app.view_functions.get(request.endpoint)
+    marked = getattr(view, 'request_class', None)
+    if marked:
+        return marked
+    return 'read' if request.method in READ_METHODS else 'write'
+
+
+def stats(app=None):
+    """``{class: counters}`` of this process's gates."""
+    gates = (app or current_app).extensions.get('admission', {})
+    return {name: gate.stats() for name, gate in gates.items()}
+
+
+def _busy(gate):
+    retry_after = gate.retry_after()
+    logging.warning(f'Admission: {gate.name} request {request.path} refused, '
+                    f'{gate.running} running, {gate.waiting} waiting')
+    if request.blueprint == 'api' or request.accept_mimetypes.best == 'application/json':
+        response = jsonify({'error': 'busy', 'retry_after': retry_after})
+    else:
+        response = Response('সার্ভার এখন ব্যস্ত, কিছুক্ষণ পরে আবার চেষ্টা করুন। '
+                            f'Server busy, please retry in {retry_after} seconds.',
+                            mimetype='text/plain')
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    response.headers['X-Request-Class'] = gate.name
+    return response
+
+
+def init_admission(app):
+    if not app.config.get('ADMISSION_CONTROL'):
+        return
+    limits = app.config['ADMISSION_LIMITS']
+    queues = app.config['ADMISSION_QUEUE']
+    app.extensions['admission'] = {
+        name: Gate(name, limit, queues.get(name, 0), app.config['ADMISSION_WAIT'])
+        for name, limit in limits.items()
+    }
+
+    @app.before_request
+    def admit():
+        name = classify(app)
+        gate = app.extensions['admission'].get(name)
+        if gate is None:
+            return None
+        if not gate.enter():
+            if getattr(app.view_functions.get(request.endpoint), 'admission_fallback', False):
+                g.admission_refused = gate
+                return None
+            return _busy(gate)
+        g.admission = (gate, time.monotonic())
+        return None
+
+    @app.after_request
+    def label(response):
+        admitted = g.get('admission')
+        if admitted is not None:
+            response.headers['X-Request-Class'] = admitted[0].name
+        elif g.get('admission_refused') is not None:
+            response.headers['X-Request-Class'] = g.admission_refused.name
+        return response
+
+    @app.teardown_request
+    def release(exc):
+        admitted = g.pop('admission', None)
+        if admitted is not None:
+            gate, started = admitted
+            gate.leave(time.monotonic() - started)
@@ -0,0 +1,224 @@
+"""Incremental Parquet export of the loan book for offline analytics.
+
+Writes loans, collections, members and the cash ledger tables as Parquet
+files partitioned by month of their business date, so analysts can work with
+DuckDB or pandas instead of querying the production database:
+
+    python analytics_export.py                          # everything new since the last run
+    python analytics_export.py --output /srv/analytics --tables loan_collections loans
+    python analytics_export.py --partition day --full   # forget the high-water marks, export again
+
+    -- DuckDB
+    SELECT month, sum(amount) FROM read_parquet('analytics/loan_collections/*/*.parquet', hive_partitioning=true)
+    GROUP BY month ORDER BY month;
+
+Each run only reads rows past the table's stored high-water mark, kept in
+``<output>/_state.json`` and advanced after every chunk, so an interrupted run
+resumes where it stopped. Append-only tables are tracked by ``id``.
+``customers`` and ``loans`` are tracked by ``(updated_date, id)`` because
+balances, amounts and statuses change (loans since migration 0016; an output
+written before it gets every loan once more). Every changed row is written
+again, and readers keep the latest copy per id
+(``QUALIFY row_number() OVER (PARTITION BY id ORDER BY updated_date DESC) = 1``).
+A chunk's file is named after the first row it holds, so a chunk repeated
+after a crash overwrites its earlier file instead of duplicating rows.
+
+Reads go to the read replica when REPLICA_DATABASE_URL is set. Branches with
+their own storage (branches.py) are exported to ``<output>/branches/<code>/``
+with the same layout and their own high-water marks, since their ids repeat
+those of the main database. Collections moved to the archive (archive.py)
+before their first export are not included. Writes Parquet with ``pyarrow``
+(requirements.txt).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, and_, or_, select
+
+from models.user_model import db
+from models.money import Money
+from models.customer_model import Customer
+from models.loan_model import Loan
+from models.loan_collection_model import LoanCollection
+from models.saving_collection_model import SavingCollection
+from models.expense_model import Expense
+from models.investment_model import Investment
+from models.withdrawal_model import Withdrawal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# table -> (model, business date column, high-water mark: 'id' or 'updated')
+TABLES = {
+    'loan_collections': (LoanCollection, 'collection_date', 'id'),
+    'saving_collections': (SavingCollection, 'collection_date', 'id'),
+    'loans': (Loan, 'loan_date', 'updated'),
+    'customers': (Customer, 'created_date', 'updated'),
+    'expenses': (Expense, 'date', 'id'),
+    'investments': (Investment, 'date', 'id'),
+    'withdrawals': (Withdrawal, 'date', 'id'),
+}
+CHUNK_SIZE = 50000
+STATE_FILE = '_state.json'
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, (Float, Money)):  # money is read back in taka, as in earlier exports
+        return pa.float64()
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def schema(model):
+    return pa.schema([(c.name, _arrow_type(c)) for c in model.__table__.columns])
+
+
+def partition(value, by):
+    if not isinstance(value, (date, datetime)):
+        return 'unknown'
+    return value.strftime('%Y-%m-%d' if by == 'day' else '%Y-%m')
+
+
+def load_state(output):
+    try:
+        with open(os.path.join(output, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(output, state):
+    path = os.path.join(output, STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def _chunk_query(model, mark, watermark):
+    table = model.__table__
+    stmt = select(table)
+    if mark == 'updated':
+        if watermark and 'updated' in watermark:
+            since = datetime.fromisoformat(watermark['updated'])
+            stmt = stmt.where(or_(table.c.updated_date > since,
+                                  and_(table.c.updated_date == since, table.c.id > watermark['id'])))
+        return stmt.order_by(table.c.updated_date, table.c.id).limit(CHUNK_SIZE)
+    if watermark:
+        stmt = stmt.where(table.c.id > watermark['id'])
+    return stmt.order_by(table.c.id).limit(CHUNK_SIZE)
+
+
+def _write(output, name, model, date_column, by, rows, columns):
+    """Write ``rows`` to one file per partition; returns the files written."""
+    first = rows[0]
+    tag = f"{first._mapping['id']:010d}"
+    if 'updated_date' in columns and first._mapping['updated_date']:
+        tag = f"{first._mapping['updated_date']:%Y%m%dT%H%M%S%f}-{tag}"
+    groups = defaultdict(list)
+    index = columns.index(date_column)
+    for row in rows:
+        groups[partition(row[index], by)].append(row)
+
+    arrow_schema = schema(model)
+    written = []
+    for key, group in sorted(groups.items()):
+        directory = os.path.join(output, name, f'{by}={key}')
+        os.makedirs(directory, exist_ok=True)
+        data = {c: [row[i] for row in group] for i, c in enumerate(columns)}
+        path = os.path.join(directory, f'part-{tag}.parquet')
+        pq.write_table(pa.table(data, schema=arrow_schema), path + '.tmp', compression='zstd')
+        os.replace(path + '.tmp', path)
+        written.append(path)
+    return written
+
+
+def export_table(engine, output, name, by, state, verbose=True):
+    """Export the rows of ``name`` past its high-water mark. Returns the row count."""
+    model, date_column, mark = TABLES[name]
+    columns = [c.name for c in model.__table__.columns]
+    total = 0
+    with engine.connect() as conn:
+        while True:
+            watermark = state.get(name)
+            rows = conn.execute(_chunk_query(model, mark, watermark)).all()
+            if not rows:
+                break
+            files = _write(output, name, model, date_column, by, rows, columns)
+            last = rows[-1]._mapping
+            state[name] = {'id': last['id']}
+            if mark == 'updated':
+                state[name]['updated'] = last['updated_date'].isoformat()
+            save_state(output, state)
+            total += len(rows)
+            if verbose:
+                print(f'  {name}: {total} rows, {len(files)} file(s), up to id {last["id"]}')
+            if len(rows) < CHUNK_SIZE:
+                break
+    return total
+
+
+def export(output, tables=None, by='month', full=False, verbose=True):
+    """Export ``tables`` (default: all) of the main database to ``output``
+    and of each branch with its own storage to ``output/branches/<code>``;
+    returns ``{table: rows}`` over all of them."""
+    import branches
+
+    if pa is None:
+        raise RuntimeError('The Parquet export needs the pyarrow package: pip install -r requirements.txt')
+    storages = [(output, db.engines.get('replica', db.engines[None]))]
+    for branch in branches.all_branches(refresh=True).values():
+        engine = branches.engine_for(branch)
+        if engine is not None:
+            storages.append((os.path.join(output, 'branches', branch.code), engine))
+    counts = defaultdict(int)
+    for directory, engine in storages:
+        if verbose and directory != output:
+            print(f'{directory}:')
+        for name, rows in export_storage(engine, directory, tables, by, full, verbose).items():
+            counts[name] += rows
+    return dict(counts)
+
+
+def export_storage(engine, output, tables=None, by='month', full=False, verbose=True):
+    """Export ``tables`` of one database to ``output``; returns ``{table: rows}``."""
+    os.makedirs(output, exist_ok=True)
+    state = {} if full else load_state(output)
+    if state.get('_partition', by) != by:
+        raise ValueError(f"{output} is partitioned by {state['_partition']}; use --partition {state['_partition']} "
+                         f"or --full into a new directory")
+    state['_partition'] = by
+    return {name: export_table(engine, output, name, by, state, verbose) for name in tables or TABLES}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Incremental Parquet export for analytics')
+    parser.add_argument('--output', help='defaults to ANALYTICS_EXPORT_DIR')
+    parser.add_argument('--tables', nargs='+', choices=list(TABLES))
+    parser.add_argument('--partition', choices=['month', 'day'], default='month')
+    parser.add_argument('--full', action='store_true', help='ignore the high-water marks and export everything')
+    args = parser.parse_args()
+    if pa is None:
+        sys.exit('The Parquet export needs the pyarrow package: pip install -r requirements.txt')
+
+    from app import app
+    with app.app_context():
+        started = time.perf_counter()
+        counts = export(args.output or app.config['ANALYTICS_EXPORT_DIR'], args.tables, args.partition, args.full)
+        print(f'Exported {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s: '
+              + ', '.join(f'{k} {v}' for k, v in counts.items()))
+    sys.exit(0)
@@ -0,0 +1,273 @@
+"""JSON API for the collector app, mounted at ``/api/v1``.
+
+Authentication is the normal login session (POST ``/login``). List
+endpoints share their queries with the HTML pages (queries.py) and support:
+
+* ``?fields=id,name,remaining_loan`` - only those columns are selected,
+* ``?limit=100&cursor=...`` - keyset pagination on id; pass the response's
+  ``next_cursor`` to get the next page (``null`` on the last page),
+* ETag / If-None-Match, via ``conditional`` from http_cache.py.
+
+Rows are read as plain tuples and serialised without building model objects,
+with orjson when it is installed.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from flask import Blueprint, Response, abort, request
+from flask_login import current_user, login_required
+
+import ledger
+import queries
+from admission import request_class
+from http_cache import conditional
+from replica import reads_from_replica
+from archive import collection_summary
+from models.user_model import db
+from models.customer_model import Customer
+from models.loan_model import Loan
+from models.loan_collection_model import LoanCollection
+from models.saving_collection_model import SavingCollection
+from models.withdrawal_model import Withdrawal
+from models.archive_model import CollectionSummary
+from models.ledger_model import JournalLine, AccountCheckpoint
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# selectable fields of each resource, and the default selection
+CUSTOMER_FIELDS = ['id', 'name', 'member_no', 'phone', 'father_husband', 'village', 'post', 'thana', 'district',
+                   'address', 'staff_id', 'total_loan', 'remaining_loan', 'savings_balance', 'created_date',
+                   'updated_date']
+CUSTOMER_DEFAULT = ['id', 'name', 'member_no', 'phone', 'staff_id', 'total_loan', 'remaining_loan', 'savings_balance']
+LOAN_FIELDS = ['id', 'customer_id', 'customer_name', 'amount', 'interest', 'loan_date', 'due_date',
+               'installment_count', 'installment_amount', 'installment_type', 'service_charge', 'status', 'staff_id']
+LOAN_DEFAULT = ['id', 'customer_id', 'amount', 'interest', 'loan_date', 'due_date', 'installment_count',
+                'installment_amount', 'installment_type', 'status', 'staff_id']
+COLLECTION_FIELDS = ['id', 'customer_id', 'amount', 'collection_date', 'staff_id']
+WITHDRAWAL_FIELDS = ['id', 'customer_id', 'investor_name', 'amount', 'date', 'note', 'withdrawal_type']
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _json(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+# registered per code so they win over the app's HTML 400 handler
+@api.errorhandler(400)
+@api.errorhandler(401)
+@api.errorhandler(403)
+@api.errorhandler(404)
+@api.errorhandler(405)
+def _http_error(e):
+    return _json({'error': e.name, 'message': e.description}, e.code)
+
+
+def _fields(allowed, default):
+    requested = request.args.get('fields')
+    if not requested:
+        return default
+    fields = [f.strip() for f in requested.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        abort(400, f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return fields
+
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        abort(400, f'{name} must be YYYY-MM-DD')
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (ValueError, binascii.Error):
+        abort(400, 'Invalid cursor')
+
+
+def paginate(query, model, fields, newest_first=False):
+    """One page of ``query`` as ``{'data': [...], 'next_cursor': ...}``,
+    selecting only ``fields`` and keyset-paginating on ``model.id``."""
+    limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT))
+    cursor = request.args.get('cursor')
+    if cursor:
+        last_id = decode_cursor(cursor)
+        query = query.filter(model.id < last_id if newest_first else model.id > last_id)
+    query = query.order_by(None).order_by(model.id.desc() if newest_first else model.id)
+    rows = query.with_entities(*[getattr(model, f) for f in fields], model.id).limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'data': [dict(zip(fields, row)) for row in rows],
+        'next_cursor': encode_cursor(rows[-1][-1]) if more and rows else None,
+    }
+
+
+def _admin_staff_id():
+    """``staff_id`` filter, which only admins may set."""
+    return request.args.get('staff_id', type=int) if current_user.role == 'admin' else None
+
+
+@api.route('/customers')
+@login_required
+@reads_from_replica
+@conditional(Customer, ignore_flashes=True)
+def customers():
+    query = queries.customers(current_user, with_loan=request.args.get('with_loan') == '1',
+                              outstanding=request.args.get('outstanding') == '1')
+    staff_id = _admin_staff_id()
+    if staff_id:
+        query = query.filter(Customer.staff_id == staff_id)
+    return _json(paginate(query, Customer, _fields(CUSTOMER_FIELDS, CUSTOMER_DEFAULT)))
+
+
+@api.route('/customers/<int:id>')
+@login_required
+@reads_from_replica
+@conditional(Customer, LoanCollection, SavingCollection, Withdrawal, CollectionSummary, ignore_flashes=True)
+def customer(id):
+    fields = _fields(CUSTOMER_FIELDS, CUSTOMER_FIELDS)
+    row = (queries.customers(current_user).filter(Customer.id == id)
+           .with_entities(*[getattr(Customer, f) for f in fields]).first())
+    if row is None:
+        abort(404, 'No such member')
+    result = dict(zip(fields, row))
+    summary = collection_summary(id)
+    totals = {}
+    for key, model in (('loan_collected', LoanCollection), ('saving_collected', SavingCollection)):
+        totals[key] = (db.session.query(db.func.coalesce(db.func.sum(model.amount), 0))
+                       .filter(model.customer_id == id).scalar())
+    if summary:
+        totals['loan_collected'] += summary.archived_loan_total or 0
+        totals['saving_collected'] += summary.archived_saving_total or 0
+    totals['withdrawn'] = (db.session.query(db.func.coalesce(db.func.sum(Withdrawal.amount), 0))
+                           .filter(Withdrawal.customer_id == id).scalar())
+    result['totals'] = totals
+    return _json(result)
+
+
+@api.route('/customers/<int:id>/balances')
+@login_required
+@reads_from_replica
+@conditional(JournalLine, AccountCheckpoint, ignore_flashes=True)
+def customer_balances(id):
+    """Loan outstanding and savings from the ledger, at the end of ``?as_of=YYYY-MM-DD`` (default now)."""
+    if not queries.customers(current_user).filter(Customer.id == id).with_entities(Customer.id).first():
+        abort(404, 'No such member')
+    as_of = _date_arg('as_of')
+    as_of = as_of.date() if as_of else None
+    return _json(dict(ledger.member_balances(id, as_of), customer_id=id, as_of=as_of))
+
+
+@api.route('/loans')
+@login_required
+@reads_from_replica
+@conditional(Loan, ignore_flashes=True)
+def loans():
+    query = queries.loans(current_user)
+    customer_id = request.args.get('customer_id', type=int)
+    if customer_id:
+        query = query.filter(Loan.customer_id == customer_id)
+    staff_id = _admin_staff_id()
+    if staff_id:
+        query = query.filter(Loan.staff_id == staff_id)
+    return _json(paginate(query, Loan, _fields(LOAN_FIELDS, LOAN_DEFAULT), newest_first=True))
+
+
+def _collections(model):
+    query = queries.collections(model, current_user, staff_id=_admin_staff_id(),
+                                customer_id=request.args.get('customer_id', type=int),
+                                since=_date_arg('since'), until=_date_arg('until'))
+    return _json(paginate(query, model, _fields(COLLECTION_FIELDS, COLLECTION_FIELDS), newest_first=True))
+
+
+@api.route('/loan_collections')
+@login_required
+@reads_from_replica
+@conditional(LoanCollection, ignore_flashes=True)
+def loan_collections():
+    return _collections(LoanCollection)
+
+
+@api.route('/saving_collections')
+@login_required
+@reads_from_replica
+@conditional(SavingCollection, ignore_flashes=True)
+def saving_collections():
+    return _collections(SavingCollection)
+
+
+@api.route('/withdrawals')
+@login_required
+@reads_from_replica
+@conditional(Withdrawal, ignore_flashes=True)
+def withdrawals():
+    if current_user.role != 'admin':
+        abort(403, 'Admins only')
+    query = queries.withdrawals(customer_id=request.args.get('customer_id', type=int),
+                                since=_date_arg('since'), until=_date_arg('until'))
+    return _json(paginate(query, Withdrawal, _fields(WITHDRAWAL_FIELDS, WITHDRAWAL_FIELDS), newest_first=True))
+
+
+@api.route('/reports/collections')
+@request_class('heavy')
+@login_required
+@reads_from_replica
+@conditional(LoanCollection, SavingCollection, ignore_flashes=True)
+def collection_report():
+    """Collection totals of the reports page's daily / weekly / monthly window."""
+    period = request.args.get('period', 'daily')
+    if period not in ('daily', 'weekly', 'monthly'):
+        abort(400, 'period must be daily, weekly or monthly')
+    since = queries.period_start(period)
+    totals = queries.collection_totals(current_user, since, staff_id=_admin_staff_id())
+    return _json({
+        'period': period,
+        'since': since,
+        'loan': {'count': totals['loan'][0], 'total': totals['loan'][1]},
+        'saving': {'count': totals['saving'][0], 'total': totals['saving'][1]},
+        'by_staff': totals['by_staff'],
+    })
+
+
+@api.route('/me')
+@login_required
+def me():
+    return _json({'id': current_user.id, 'name': current_user.name, 'email': current_user.email,
+                  'role': current_user.role})
+
+
+def init_api(app, login_manager):
+    # API clients get a JSON 401 instead of a redirect to the login page
+    login_manager.blueprint_login_views['api'] = None
+    app.register_blueprint(api)
@@ -1,4 +1,8 @@
+"""WSGI entry point for gunicorn, PythonAnywhere and Vercel (``vercel.json``).
+Importing it builds the app once; see ``python coldstart.py`` for its cost."""
 from app import app as application
 
+app = application  # the name @vercel/python looks for
+
 if __name__ == '__main__':
     application.run()
@@ -0,0 +1,138 @@
+"""Move old collections out of the hot tables.
+
+Collections older than ARCHIVE_HORIZON_DAYS that belong to customers with no
+outstanding loan are copied to the archive tables (see models/archive_model.py,
+optionally a separate database via ARCHIVE_DATABASE_URL) and deleted from
+``loan_collections`` / ``saving_collections``. Their totals are kept in
+``collection_summaries`` so customer totals stay correct.
+
+    python archive.py                      # use ARCHIVE_HORIZON_DAYS
+    python archive.py --horizon-days 365 --batch-size 2000 --pause 0.1
+
+Safe to interrupt and rerun: each batch is copied first and only then
+deleted from the hot table, and rows already present in the archive are not
+copied twice.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.user_model import db, User
+from models.customer_model import Customer
+from models.loan_collection_model import LoanCollection
+from models.saving_collection_model import SavingCollection
+from models.archive_model import LoanCollectionArchive, SavingCollectionArchive, CollectionSummary
+
+# hot model, archive model, summary total column, summary count column
+TIERS = [
+    (LoanCollection, LoanCollectionArchive, 'archived_loan_total', 'archived_loan_count'),
+    (SavingCollection, SavingCollectionArchive, 'archived_saving_total', 'archived_saving_count'),
+]
+COLUMNS = ['id', 'customer_id', 'amount', 'collection_date', 'staff_id', 'branch_id']
+
+
+def _archive_session():
+    return Session(bind=db.engines['archive'])
+
+
+def archive_batch(hot_model, archive_model, total_field, count_field, cutoff, batch_size):
+    """Archive up to ``batch_size`` rows of one table. Returns the number moved."""
+    settled = select(Customer.id).where(Customer.remaining_loan <= 0)
+    rows = (db.session.query(*[getattr(hot_model, c) for c in COLUMNS])
+            .filter(hot_model.collection_date < cutoff, hot_model.customer_id.in_(settled))
+            .order_by(hot_model.id).limit(batch_size).all())
+    if not rows:
+        return 0
+    ids = [r.id for r in rows]
+
+    archive_session = _archive_session()
+    try:
+        existing = {i for (i,) in archive_session.query(archive_model.id).filter(archive_model.id.in_(ids))}
+        new_rows = [dict(zip(COLUMNS, r), archived_date=datetime.utcnow()) for r in rows if r.id not in existing]
+        if new_rows:
+            archive_session.execute(archive_model.__table__.insert(), new_rows)
+        archive_session.commit()
+    finally:
+        archive_session.close()
+
+    totals = {}
+    for r in rows:
+        total, count, latest = totals.get(r.customer_id, (0.0, 0, r.collection_date))
+        totals[r.customer_id] = (total + r.amount, count + 1, max(latest, r.collection_date))
+    summaries = {s.customer_id: s for s in CollectionSummary.query.filter(CollectionSummary.customer_id.in_(totals))}
+    for customer_id, (total, count, latest) in totals.items():
+        summary = summaries.get(customer_id)
+        if summary is None:
+            summary = CollectionSummary(customer_id=customer_id, archived_loan_total=0.0, archived_loan_count=0,
+                                        archived_saving_total=0.0, archived_saving_count=0)
+            db.session.add(summary)
+        setattr(summary, total_field, (getattr(summary, total_field) or 0) + total)
+        setattr(summary, count_field, (getattr(summary, count_field) or 0) + count)
+        if summary.archived_through is None or latest > summary.archived_through:
+            summary.archived_through = latest
+    hot_model.query.filter(hot_model.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+    return len(rows)
+
+
+def archive_collections(horizon_days, batch_size=1000, pause=0.0, verbose=True):
+    """Archive everything older than ``horizon_days``. Returns ``{table: rows moved}``."""
+    cutoff = datetime.now() - timedelta(days=horizon_days)
+    moved = {}
+    for hot_model, archive_model, total_field, count_field in TIERS:
+        table = hot_model.__tablename__
+        moved[table] = 0
+        while True:
+            count = archive_batch(hot_model, archive_model, total_field, count_field, cutoff, batch_size)
+            if not count:
+                break
+            moved[table] += count
+            if verbose:
+                print(f'{table}: {moved[table]} archived')
+            if pause:
+                time.sleep(pause)
+    return moved
+
+
+def collection_summary(customer_id):
+    return CollectionSummary.query.get(customer_id)
+
+
+def archived_collections(customer_id):
+    """Archived ``(loan_collections, saving_collections)`` of a customer, newest first."""
+    archive_session = _archive_session()
+    try:
+        result = []
+        for model in (LoanCollectionArchive, SavingCollectionArchive):
+            rows = (archive_session.query(model).filter_by(customer_id=customer_id)
+                    .order_by(model.collection_date.desc()).all())
+            archive_session.expunge_all()
+            result.append(rows)
+    finally:
+        archive_session.close()
+
+    staff_ids = {r.staff_id for rows in result for r in rows if r.staff_id}
+    staffs = {u.id: u for u in User.query.filter(User.id.in_(staff_ids))} if staff_ids else {}
+    for rows in result:
+        for r in rows:
+            r.staff = staffs.get(r.staff_id)
+    return tuple(result)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Archive old collections of settled customers')
+    parser.add_argument('--horizon-days', type=int, help='defaults to ARCHIVE_HORIZON_DAYS')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--pause', type=float, default=0.05, help='seconds to sleep between batches')
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        horizon = args.horizon_days or app.config['ARCHIVE_HORIZON_DAYS']
+        moved = archive_collections(horizon, batch_size=args.batch_size, pause=args.pause)
+        print(f'Archived collections older than {horizon} days: {moved}')
+    sys.exit(0)
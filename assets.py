@@ -0,0 +1,159 @@
+"""Fingerprinted static assets.
+
+CSS and JS live under ``static/`` (Bootstrap and Popper are vendored in
+``static/vendor/``, so pages render without internet access). The build
+copies each of them to ``static/dist/`` with a content hash in the filename,
+plus precompressed ``.gz`` and ``.br`` variants, and writes
+``static/dist/manifest.json``:
+
+    python assets.py          # rebuild after changing anything in static/
+    python assets.py --check  # exit 1 if static/dist is out of date
+
+Templates refer to assets by their source path and get the hashed URL::
+
+    <link href="{{ asset_url('vendor/bootstrap/css/bootstrap.min.css') }}" rel="stylesheet">
+
+Hashed files are served from ``/assets/`` with a one-year immutable
+Cache-Control header, picking the ``.br`` or ``.gz`` file when the browser
+accepts it. An asset missing from the manifest falls back to the plain
+``/static/`` URL. The app logs a warning at startup when the manifest does
+not match the sources, since pages would keep serving the old build.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+
+from flask import abort, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST = os.path.join(DIST_DIR, 'manifest.json')
+MIMETYPES = {'.css': 'text/css', '.js': 'application/javascript', '.svg': 'image/svg+xml'}
+EXTENSIONS = tuple(MIMETYPES)
+MAX_AGE = 365 * 24 * 3600
+
+
+def sources():
+    """Asset paths relative to ``static/``, excluding the build output."""
+    found = []
+    for directory, subdirs, files in os.walk(STATIC_DIR):
+        if os.path.abspath(directory) == DIST_DIR:
+            subdirs[:] = []
+            continue
+        for name in files:
+            if name.endswith(EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(directory, name), STATIC_DIR).replace(os.sep, '/'))
+    return sorted(found)
+
+
+def hashed_name(path, data):
+    stem, ext = os.path.splitext(path)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+def build(verbose=True):
+    """Rebuild ``static/dist`` and its manifest. Returns the manifest."""
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    manifest = {}
+    for path in sources():
+        with open(os.path.join(STATIC_DIR, path), 'rb') as f:
+            data = f.read()
+        target = hashed_name(path, data)
+        out = os.path.join(DIST_DIR, target)
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        with open(out, 'wb') as f:
+            f.write(data)
+        with open(out + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(out + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+        manifest[path] = target
+        if verbose:
+            print(f'{path} -> dist/{target}')
+    if brotli is None and verbose:
+        print('brotli is not installed; only .gz variants were written')
+    with open(MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def stale(manifest=None):
+    """Sources whose build in ``static/dist`` is missing or out of date, and
+    manifest entries whose source is gone."""
+    manifest = load_manifest() if manifest is None else manifest
+    found = []
+    for path in sources():
+        with open(os.path.join(STATIC_DIR, path), 'rb') as f:
+            target = hashed_name(path, f.read())
+        if manifest.get(path) != target or not os.path.isfile(os.path.join(DIST_DIR, target)):
+            found.append(path)
+    return found + sorted(set(manifest) - set(sources()))
+
+
+def init_assets(app):
+    manifest = load_manifest()
+    outdated = stale(manifest)
+    if outdated:
+        logging.warning(f'static/dist is out of date for {", ".join(outdated)}; run python assets.py')
+
+    def asset_url(path):
+        if path in manifest:
+            return url_for('asset', filename=manifest[path])
+        return url_for('static', filename=path)
+
+    @app.route('/assets/<path:filename>')
+    def asset(filename):
+        if not os.path.isfile(os.path.join(DIST_DIR, filename)):
+            abort(404)
+        accepted = request.accept_encodings
+        encoding = None
+        if accepted['br'] and os.path.isfile(os.path.join(DIST_DIR, filename + '.br')):
+            encoding = 'br'
+        elif accepted['gzip'] and os.path.isfile(os.path.join(DIST_DIR, filename + '.gz')):
+            encoding = 'gzip'
+        served = filename + {'br': '.br', 'gzip': '.gz'}.get(encoding, '')
+        mimetype = MIMETYPES[os.path.splitext(filename)[1]]
+        response = send_from_directory(DIST_DIR, served, mimetype=mimetype, max_age=MAX_AGE)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.jinja_env.globals['asset_url'] = asset_url
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the fingerprinted assets in static/dist')
+    parser.add_argument('--check', action='store_true', help='only check that static/dist matches static/')
+    args = parser.parse_args()
+    if args.check:
+        outdated = stale()
+        for path in outdated:
+            print(f'{path}: static/dist is out of date')
+        sys.exit('Run python assets.py and commit static/dist' if outdated else 0)
+    build()
+    sys.exit(0)
@@ -0,0 +1,89 @@
+"""Race-free changes to member and cash balances.
+
+Every change is a single UPDATE that does the arithmetic in the database
+(``SET remaining_loan = remaining_loan - :amount``), and every debit carries
+its own guard (``AND remaining_loan >= :amount``). Two staff posting for the
+same member at the same moment can therefore neither overwrite each other's
+change nor both pass a check made in Python: the second UPDATE waits for the
+first and then re-evaluates the guard. No row is locked for longer than its
+own UPDATE, so busy collection periods are not serialised.
+
+A debit that would go below zero matches no row and raises
+:class:`InsufficientBalance`; the caller rolls back the transaction.
+
+    python stress_balances.py      # hammer one member from many threads
+"""
+from sqlalchemy import select, update
+
+from models.user_model import db
+from models.customer_model import Customer
+from models.cash_balance_model import CashBalance
+
+
+class InsufficientBalance(Exception):
+    def __init__(self, message, available):
+        super().__init__(message)
+        self.available = available
+
+
+def _change(model, row_id, column, delta, minimum=None, **others):
+    """``column += delta`` (and ``others``) on one row, only while ``column >= minimum``.
+    Returns whether the row was updated."""
+    target = getattr(model, column)
+    stmt = update(model).where(model.id == row_id)
+    if minimum is not None:
+        stmt = stmt.where(target >= minimum)
+    values = {column: target + delta}
+    values.update({name: getattr(model, name) + value for name, value in others.items()})
+    result = db.session.execute(stmt.values(values).execution_options(synchronize_session='fetch'))
+    return result.rowcount == 1
+
+
+def _current(model, row_id, column):
+    return db.session.execute(select(getattr(model, column)).where(model.id == row_id)).scalar() or 0
+
+
+def repay_loan(customer_id, amount):
+    """Take ``amount`` off the member's outstanding loan, never below zero."""
+    if not _change(Customer, customer_id, 'remaining_loan', -amount, minimum=amount):
+        available = _current(Customer, customer_id, 'remaining_loan')
+        raise InsufficientBalance(f'Loan outstanding is ৳{available}, less than ৳{amount}', available)
+
+
+def disburse_loan(customer_id, total):
+    """Add a new loan's ``total`` (principal plus interest) to the member."""
+    _change(Customer, customer_id, 'remaining_loan', total, total_loan=total)
+
+
+def deposit_savings(customer_id, amount):
+    _change(Customer, customer_id, 'savings_balance', amount)
+
+
+def withdraw_savings(customer_id, amount):
+    if not _change(Customer, customer_id, 'savings_balance', -amount, minimum=amount):
+        available = _current(Customer, customer_id, 'savings_balance')
+        raise InsufficientBalance(f'Savings balance is ৳{available}, less than ৳{amount}', available)
+
+
+def cash_account():
+    """Id of the cash balance row (the first one, as the pages always read
+    it), created on first use."""
+    row_id = db.session.execute(select(CashBalance.id).order_by(CashBalance.id).limit(1)).scalar()
+    if row_id is None:
+        record = CashBalance(balance=0)
+        db.session.add(record)
+        db.session.flush()
+        row_id = record.id
+    return row_id
+
+
+def cash_in(amount):
+    _change(CashBalance, cash_account(), 'balance', amount)
+
+
+def cash_out(amount):
+    """Pay ``amount`` out of the cash balance, which may not go negative."""
+    row_id = cash_account()
+    if not _change(CashBalance, row_id, 'balance', -amount, minimum=amount):
+        available = _current(CashBalance, row_id, 'balance')
+        raise InsufficientBalance(f'Cash balance is ৳{available}, less than ৳{amount}', available)
@@ -0,0 +1,198 @@
+"""Drive the main routes through the Flask test client and record latency,
+query counts and peak memory.
+
+    python seed_data.py --database-url sqlite:///bench.db
+    python benchmark.py --database-url sqlite:///bench.db --output before.json
+    python benchmark.py --database-url sqlite:///bench.db --output after.json --compare before.json
+
+Each scenario is timed over --iterations requests (after --warmup untimed
+ones); peak memory comes from one extra request traced with tracemalloc so
+the tracing overhead does not distort the latency numbers.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# (name, role, method, path, form data builder)
+SCENARIOS = [
+    ('dashboard_admin', 'admin', 'GET', '/dashboard', None),
+    ('dashboard_staff', 'staff', 'GET', '/dashboard', None),
+    ('reports_daily', 'admin', 'GET', '/reports?period=daily', None),
+    ('reports_monthly', 'admin', 'GET', '/reports?period=monthly', None),
+    ('daily_report', 'admin', 'GET', '/daily_report', None),
+    ('monthly_report', 'admin', 'GET', '/monthly_report', None),
+    ('profit_loss_monthly', 'admin', 'GET', '/profit_loss?period=monthly', None),
+    ('profit_loss_yearly', 'admin', 'GET', '/profit_loss?period=yearly', None),
+    ('withdrawal_report', 'admin', 'GET', '/withdrawal_report', None),
+    ('manage_customers', 'admin', 'GET', '/customers', None),
+    ('manage_loans', 'admin', 'GET', '/loans', None),
+    ('loan_customers', 'admin', 'GET', '/loan_customers', None),
+    ('loan_collection', 'staff', 'GET', '/loan_collection', None),
+    ('loan_collections_history', 'staff', 'GET', '/loan_collections_history', None),
+    ('manage_savings', 'staff', 'GET', '/savings', None),
+    ('manage_collections', 'staff', 'GET', '/manage_collections', None),
+    ('manage_withdrawals', 'admin', 'GET', '/manage_withdrawals', None),
+    ('customer_details', 'admin', 'GET', '/customer_details/{customer_id}', None),
+    ('collect_loan', 'staff', 'POST', '/loan_collection/collect', lambda c: {'customer_id': c, 'amount': '1'}),
+    ('collect_saving', 'staff', 'POST', '/saving_collection/collect', lambda c: {'customer_id': c, 'amount': '1'}),
+    ('collection', 'staff', 'POST', '/collection', lambda c: {'customer_id': c, 'loan_amount': '1', 'saving_amount': '1'}),
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Flask routes')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:///bench.db'))
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--only', action='append', help='run only the named scenario (repeatable)')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--label', default='')
+    parser.add_argument('--compare', help='previous results file to diff against')
+    return parser.parse_args(argv)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    ordered = sorted(values)
+    index = max(int(round(pct / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def login(app, email, password):
+    client = app.test_client()
+    response = client.post('/login', data={'email': email, 'password': password})
+    if response.status_code != 302:
+        raise RuntimeError(f'login failed for {email}')
+    return client
+
+
+def run(args):
+    from sqlalchemy import event
+    from app import app, db
+    from models.customer_model import Customer
+    from models.user_model import User
+
+    results = {}
+    with app.app_context():
+        staff = User.query.filter_by(role='staff').order_by(User.id).first()
+        if staff is None:
+            raise SystemExit('No staff found - run seed_data.py first')
+        staff_email = staff.email
+        customer = (Customer.query.filter_by(staff_id=staff.id).filter(Customer.remaining_loan > 1000)
+                    .order_by(Customer.id).first()
+                    or Customer.query.filter_by(staff_id=staff.id).order_by(Customer.id).first())
+        customer_id = str(customer.id)
+        engine = db.engine
+
+    clients = {
+        'admin': login(app, 'admin@example.com', 'admin123'),
+        'staff': login(app, staff_email, 'staff123'),
+    }
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+
+    def request(role, method, path, data):
+        # collect_loan prints debug output on every call
+        with contextlib.redirect_stdout(io.StringIO()):
+            if method == 'POST':
+                return clients[role].post(path, data=data)
+            return clients[role].get(path)
+
+    try:
+        for name, role, method, path, form in SCENARIOS:
+            if args.only and name not in args.only:
+                continue
+            path = path.format(customer_id=customer_id)
+            data = form(customer_id) if form else None
+            for i in range(args.warmup):
+                request(role, method, path, data)
+
+            timings = []
+            queries = []
+            status = None
+            for i in range(args.iterations):
+                counter.count = 0
+                start = time.perf_counter()
+                response = request(role, method, path, data)
+                timings.append((time.perf_counter() - start) * 1000)
+                queries.append(counter.count)
+                status = response.status_code
+
+            tracemalloc.start()
+            response = request(role, method, path, data)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            results[name] = {
+                'method': method,
+                'path': path,
+                'status': status,
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'mean_ms': round(sum(timings) / len(timings), 3),
+                'max_ms': round(max(timings), 3),
+                'queries': max(queries),
+                'peak_memory_kb': round(peak / 1024, 1),
+                'response_bytes': len(response.get_data()),
+            }
+            r = results[name]
+            if status >= 500:
+                print(f'{name:28} returned {status}')
+            print(f"{name:28} p50 {r['p50_ms']:9.2f}ms  p95 {r['p95_ms']:9.2f}ms  "
+                  f"queries {r['queries']:4}  peak {r['peak_memory_kb']:10.1f}KB")
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+    return {
+        'label': args.label,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'database_url': args.database_url,
+        'iterations': args.iterations,
+        'python': platform.python_version(),
+        'scenarios': results,
+    }
+
+
+def compare(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)['scenarios']
+    print(f'\nCompared with {previous_path}:')
+    for name, r in current['scenarios'].items():
+        old = previous.get(name)
+        if not old:
+            continue
+        change = (r['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+        print(f"{name:28} p50 {old['p50_ms']:9.2f} -> {r['p50_ms']:9.2f}ms ({change:+6.1f}%)  "
+              f"queries {old['queries']} -> {r['queries']}  "
+              f"peak {old['peak_memory_kb']:.0f} -> {r['peak_memory_kb']:.0f}KB")
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    os.environ['DATABASE_URL'] = args.database_url
+    # app.py configures DEBUG logging, which would dominate the timings;
+    # failing routes still show up as a 500 status in the results
+    logging.disable(logging.CRITICAL)
+    report = run(args)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nResults saved to {args.output}')
+    if args.compare:
+        compare(report, args.compare)
+    sys.exit(0)
@@ -0,0 +1,341 @@
+"""Branch offices: data partitioning, per-branch routing and admin-wide reports.
+
+Members, loans, collections and the ledger (savings, withdrawals, expenses,
+investments, cash balance) carry a ``branch_id``, and so does every user.
+Users with a branch only ever see their branch: each request of a branch user
+adds ``branch_id = <their branch>`` to every ORM query on those models, and
+new rows are stamped with it. Head-office admins (``branch_id`` NULL) see
+everything in the main database; their own new rows go to branch 1.
+
+Where a branch's rows are stored is set per branch:
+
+* by default, in the main database, next to the other branches' rows,
+* ``--schema branch_x`` (PostgreSQL): in their own schema of the main
+  database, reached with ``search_path=branch_x,public``,
+* ``--database-url sqlite:///branch_x.db`` (SQLite): in their own file, with
+  the main database ATTACHed.
+
+Either way users, branches, messages and table versions stay in the main
+database and unqualified queries reach them, so joins such as a member's
+staff keep working and the app code does not change; ``RoutingSession`` in
+models/user_model.py sends the branch user's session to the branch engine.
+
+Admin-wide reports run once per branch, in parallel threads each with its
+own session and branch scope, and are merged (``fan_out`` / ``merge``); the
+admin dashboard adds the branches with separate storage to the main
+database's totals this way. The other head-office pages read the main
+database only and name the branches they leave out::
+
+    python branches.py list
+    python branches.py create DHK2 "Dhaka 2" --schema branch_dhk2
+    python branches.py provision DHK2       # create missing tables / columns after a migration
+    python branches.py assign staff1@example.com DHK2
+    python branches.py summary              # per-branch totals, computed in parallel
+
+Existing rows are not moved when a branch gets its own storage; give
+separate storage to new branches.
+"""
+import argparse
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import case, create_engine, event, func, inspect, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import with_loader_criteria
+
+from models.user_model import db, User
+from models.branch_model import Branch
+from models.customer_model import Customer
+from models.loan_model import Loan
+from models.loan_collection_model import LoanCollection
+from models.saving_collection_model import SavingCollection
+from models.collection_model import Collection
+from models.saving_model import Saving
+from models.withdrawal_model import Withdrawal
+from models.expense_model import Expense
+from models.investment_model import Investment
+from models.cash_balance_model import CashBalance
+from models.ledger_model import JournalEntry, JournalLine, AccountCheckpoint
+
+HEAD_OFFICE_BRANCH = 1
+BRANCH_MODELS = (User, Customer, Loan, LoanCollection, SavingCollection, Collection, Saving, Withdrawal, Expense,
+                 Investment, CashBalance, JournalEntry, JournalLine, AccountCheckpoint)
+# tables that always live in the main database
+GLOBAL_TABLES = {'user', 'branches', 'staffs', 'messages', 'message_counters', 'table_versions',
+                 'schema_migrations', 'migration_progress'}
+DIRECTORY_CACHE_SECONDS = 60
+SCHEMA_NAME = re.compile(r'^[a-z_][a-z0-9_]{0,62}$')
+
+_lock = threading.Lock()
+_engines = {}
+_directory = {'loaded': 0.0, 'branches': {}}
+
+
+def all_branches(refresh=False):
+    """Branch rows (``id, code, name, database_url, schema_name``) by id,
+    cached per process for DIRECTORY_CACHE_SECONDS."""
+    with _lock:
+        if refresh or time.monotonic() - _directory['loaded'] > DIRECTORY_CACHE_SECONDS:
+            with db.engines[None].connect() as conn:
+                rows = conn.execute(select(Branch.id, Branch.code, Branch.name, Branch.database_url,
+                                           Branch.schema_name).order_by(Branch.id)).all()
+            _directory.update(loaded=time.monotonic(), branches={row.id: row for row in rows})
+        return _directory['branches']
+
+
+def get_branch(branch_id):
+    return all_branches().get(branch_id)
+
+
+def separate_storage():
+    """Branches kept outside the main database (own file or schema)."""
+    return [b for b in all_branches().values() if b.database_url or b.schema_name]
+
+
+def branch_tables():
+    """Tables stored per branch: every default-bind table that is not global."""
+    return [t for t in db.metadata.sorted_tables if t.name not in GLOBAL_TABLES and t.info.get('bind_key') is None]
+
+
+def _create_engine(branch):
+    primary = db.engines[None]
+    if branch.schema_name:
+        if not SCHEMA_NAME.match(branch.schema_name):
+            raise ValueError(f'Branch {branch.code}: invalid schema name {branch.schema_name!r}')
+        if primary.dialect.name != 'postgresql':
+            raise ValueError(f'Branch {branch.code}: schemas need PostgreSQL, the main database is {primary.dialect.name}')
+        return create_engine(primary.url, pool_pre_ping=True,
+                             connect_args={'options': f'-c search_path={branch.schema_name},public'})
+
+    url = make_url(branch.database_url)
+    if url.get_backend_name() != 'sqlite' or primary.dialect.name != 'sqlite':
+        raise ValueError(f'Branch {branch.code}: a separate database must be a SQLite file next to a SQLite main '
+                         f'database; on PostgreSQL give the branch a schema instead')
+    engine = create_engine(url)
+    directory = primary.url.database
+
+    @event.listens_for(engine, 'connect')
+    def attach_directory(dbapi_connection, connection_record):
+        # tables missing from the branch file resolve to the main database
+        dbapi_connection.execute('ATTACH DATABASE ? AS directory', (directory,))
+
+    return engine
+
+
+def engine_for(branch):
+    """Engine of ``branch``'s own storage, or None when it is kept in the main database."""
+    if branch is None or not (branch.database_url or branch.schema_name):
+        return None
+    with _lock:
+        engine = _engines.get(branch.id)
+        if engine is None:
+            engine = _engines[branch.id] = _create_engine(branch)
+    return engine
+
+
+def provision(branch):
+    """Create the branch's schema and any missing tables and columns in its
+    own storage. Returns the names of what was added."""
+    engine = engine_for(branch)
+    if engine is None:
+        return []
+    added = []
+    with engine.begin() as conn:
+        if branch.schema_name:
+            conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS {branch.schema_name}'))
+        existing = set(inspect(conn).get_table_names())
+        for table in branch_tables():
+            if table.name not in existing:
+                table.create(conn)
+                added.append(table.name)
+                continue
+            columns = {c['name'] for c in inspect(conn).get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} '
+                                      f'{column.type.compile(engine.dialect)}'))
+                    added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def use_branch(branch):
+    """Scope the current app context to ``branch`` (None: head office)."""
+    g.branch_id = branch.id if branch is not None else None
+    g.branch_engine = engine_for(branch)
+
+
+def _select_branch():
+    g.branch_id = None
+    g.branch_engine = None
+    if request.endpoint in ('static', 'asset') or not current_user.is_authenticated:
+        return
+    if current_user.branch_id:
+        branch = get_branch(current_user.branch_id)
+        g.branch_id = current_user.branch_id
+        g.branch_engine = engine_for(branch)
+
+
+def _excluded_branches():
+    """``excluded_branches`` for templates: the branches a head-office page
+    reading the main database leaves out (empty for branch users)."""
+    if not has_request_context() or not current_user.is_authenticated or current_user.branch_id is not None:
+        return {'excluded_branches': []}
+    return {'excluded_branches': separate_storage()}
+
+
+def _current_branch_id():
+    return g.get('branch_id') if has_app_context() else None
+
+
+def _scope_to_branch(state):
+    branch_id = _current_branch_id()
+    if branch_id is None or not state.is_select or state.is_column_load or state.is_relationship_load:
+        return
+    state.statement = state.statement.options(
+        *[with_loader_criteria(model, lambda cls: cls.branch_id == branch_id, include_aliases=True)
+          for model in BRANCH_MODELS])
+
+
+def _stamp_branch(session, flush_context, instances):
+    branch_id = _current_branch_id()
+    for obj in session.new:
+        if isinstance(obj, BRANCH_MODELS) and obj.branch_id is None:
+            if isinstance(obj, User):
+                # users added by head office stay head-office until assigned
+                obj.branch_id = branch_id
+            else:
+                obj.branch_id = branch_id or HEAD_OFFICE_BRANCH
+
+
+def fan_out(fn, branches=None, workers=None):
+    """Run ``fn(branch)`` for every branch in parallel threads, each in its
+    own app context and session scoped to that branch. Returns
+    ``[(branch, result), ...]`` in branch order."""
+    app = current_app._get_current_object()
+    branches = list(all_branches().values() if branches is None else branches)
+    if not branches:
+        return []
+
+    def run(branch):
+        with app.app_context():
+            use_branch(branch)
+            return fn(branch)
+
+    workers = min(workers or app.config['BRANCH_FANOUT_WORKERS'], len(branches))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(zip(branches, pool.map(run, branches)))
+
+
+def merge(results):
+    """Sum the per-branch dicts of ``fan_out`` key by key."""
+    total = {}
+    for branch, summary in results:
+        for key, value in summary.items():
+            total[key] = total.get(key, 0) + (value or 0)
+    return total
+
+
+def branch_summary(branch=None):
+    """Headline figures of the current branch scope, a handful of SQL aggregates."""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    month = today.replace(day=1)
+    summary = {}
+    (summary['members'], summary['total_loan'], summary['outstanding'],
+     summary['savings']) = db.session.execute(select(func.count(Customer.id),
+                                                     func.coalesce(func.sum(Customer.total_loan), 0),
+                                                     func.coalesce(func.sum(Customer.remaining_loan), 0),
+                                                     func.coalesce(func.sum(Customer.savings_balance), 0))).one()
+    summary['staff'] = db.session.execute(select(func.count(User.id)).where(User.role == 'staff')).scalar()
+    for key, model in (('loan', LoanCollection), ('saving', SavingCollection)):
+        today_total, month_total = db.session.execute(
+            select(func.coalesce(func.sum(case((model.collection_date >= today, model.amount), else_=0)), 0),
+                   func.coalesce(func.sum(model.amount), 0))
+            .where(model.collection_date >= month)).one()
+        summary[f'{key}_today'] = today_total
+        summary[f'{key}_month'] = month_total
+    summary['withdrawals_month'] = db.session.execute(
+        select(func.coalesce(func.sum(Withdrawal.amount), 0)).where(Withdrawal.date >= month)).scalar()
+    summary['expenses_month'] = db.session.execute(
+        select(func.coalesce(func.sum(Expense.amount), 0)).where(Expense.date >= month)).scalar()
+    summary['cash_balance'] = db.session.execute(select(func.coalesce(func.sum(CashBalance.balance), 0))).scalar()
+    return summary
+
+
+def init_branches(app):
+    app.before_request(_select_branch)
+    app.context_processor(_excluded_branches)
+    event.listen(db.session, 'do_orm_execute', _scope_to_branch)
+    event.listen(db.session, 'before_flush', _stamp_branch)
+
+
+def _find(code):
+    branch = next((b for b in all_branches(refresh=True).values() if b.code == code), None)
+    if branch is None:
+        sys.exit(f'No branch with code {code}')
+    return branch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list')
+    create = sub.add_parser('create')
+    create.add_argument('code')
+    create.add_argument('name')
+    storage = create.add_mutually_exclusive_group()
+    storage.add_argument('--schema', help='PostgreSQL schema for the branch')
+    storage.add_argument('--database-url', help='separate SQLite database for the branch')
+    provision_cmd = sub.add_parser('provision')
+    provision_cmd.add_argument('code', nargs='?', help='default: every branch with its own storage')
+    assign = sub.add_parser('assign')
+    assign.add_argument('email')
+    assign.add_argument('code', help="branch code, or 'head-office'")
+    sub.add_parser('summary')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for b in all_branches(refresh=True).values():
+            where = f'schema {b.schema_name}' if b.schema_name else (b.database_url or 'main database')
+            print(f'{b.id:>4}  {b.code:<10} {b.name:<30} {where}')
+    elif args.command == 'create':
+        branch = Branch(code=args.code, name=args.name, schema_name=args.schema, database_url=args.database_url)
+        db.session.add(branch)
+        db.session.commit()
+        all_branches(refresh=True)
+        added = provision(get_branch(branch.id))
+        print(f'Created branch {branch.id} {branch.code}' + (f"; created {', '.join(added)}" if added else ''))
+    elif args.command == 'provision':
+        targets = [_find(args.code)] if args.code else list(all_branches(refresh=True).values())
+        for branch in targets:
+            added = provision(branch)
+            print(f"{branch.code}: {', '.join(added) if added else 'up to date'}")
+    elif args.command == 'assign':
+        user = User.query.filter_by(email=args.email).first()
+        if user is None:
+            sys.exit(f'No user {args.email}')
+        user.branch_id = None if args.code == 'head-office' else _find(args.code).id
+        db.session.commit()
+        print(f'{user.email} -> {args.code}')
+    elif args.command == 'summary':
+        started = time.perf_counter()
+        results = fan_out(branch_summary)
+        elapsed = time.perf_counter() - started
+        keys = ['members', 'outstanding', 'savings', 'loan_today', 'saving_today', 'loan_month', 'saving_month']
+        print(f"{'branch':<10}" + ''.join(f'{k:>14}' for k in keys))
+        for branch, summary in results + [(None, merge(results))]:
+            print(f"{branch.code if branch else 'TOTAL':<10}" + ''.join(f'{summary[k]:>14,.0f}' for k in keys))
+        print(f'{len(results)} branches in {elapsed:.2f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        sys.exit(main())
@@ -0,0 +1,122 @@
+"""Measure cold start: a fresh interpreter importing the WSGI entry point and
+serving its first requests, as a serverless (vercel.json) or freshly forked
+worker does.
+
+    python coldstart.py --database-url sqlite:///bench.db
+    python coldstart.py --runs 20 --entry app:app --output coldstart_before.json
+    python coldstart.py --compare coldstart_before.json
+
+Every run is a new process. It times the import of ``--entry``, which
+builds the app, then the first request (``GET /login``) and the first
+logged-in page (``POST /login`` and ``GET /dashboard``). The time until the
+interpreter is ready is reported separately so the numbers are comparable
+across machines.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+CHILD = '''
+import contextlib, io, json, logging, sys, time
+started = time.perf_counter()
+logging.disable(logging.CRITICAL)
+module, attr = sys.argv[1].split(':')
+app = getattr(__import__(module), attr)
+imported = time.perf_counter()
+client = app.test_client()
+status = client.get('/login').status_code
+first = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    client.post('/login', data={'email': sys.argv[2], 'password': sys.argv[3]})
+    status = max(status, client.get('/dashboard').status_code)
+dashboard = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'first_request_ms': (first - imported) * 1000,
+                  'first_dashboard_ms': (dashboard - first) * 1000, 'status': status,
+                  'modules': len(sys.modules)}))
+'''
+
+FIELDS = ('process_ms', 'interpreter_ms', 'import_ms', 'first_request_ms', 'first_dashboard_ms')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Measure app cold start in fresh processes')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:///bench.db'))
+    parser.add_argument('--entry', default='application:application', help='module:attribute of the WSGI app')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--email', default='admin@example.com')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--output', default='coldstart_results.json')
+    parser.add_argument('--compare', help='previous results file to diff against')
+    return parser.parse_args(argv)
+
+
+def median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def interpreter_ms(env):
+    """Time for a bare ``python -c pass``, the floor under every run."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], env=env, check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def run(args):
+    env = dict(os.environ, DATABASE_URL=args.database_url, PYTHONDONTWRITEBYTECODE='')
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for i in range(args.runs):
+        floor = interpreter_ms(env)
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', CHILD, args.entry, args.email, args.password],
+                                env=env, cwd=here, capture_output=True, text=True)
+        elapsed = (time.perf_counter() - started) * 1000
+        if output.returncode:
+            raise SystemExit(output.stderr)
+        sample = json.loads(output.stdout.strip().splitlines()[-1])
+        sample.update(process_ms=elapsed, interpreter_ms=floor)
+        samples.append(sample)
+
+    summary = {field: round(median([s[field] for s in samples]), 1) for field in FIELDS}
+    summary['max_process_ms'] = round(max(s['process_ms'] for s in samples), 1)
+    summary['modules'] = samples[-1]['modules']
+    summary['status'] = max(s['status'] for s in samples)
+    for field in FIELDS:
+        print(f'{field:20} {summary[field]:9.1f}ms (median of {args.runs})')
+    print(f"{'modules loaded':20} {summary['modules']:9}")
+    return {
+        'entry': args.entry,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'database_url': args.database_url,
+        'runs': args.runs,
+        'python': platform.python_version(),
+        'summary': summary,
+    }
+
+
+def compare(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)['summary']
+    print(f'\nCompared with {previous_path}:')
+    for field in FIELDS + ('modules',):
+        old, new = previous.get(field), current['summary'][field]
+        if old:
+            print(f'{field:20} {old:9.1f} -> {new:9.1f} ({(new - old) / old * 100:+6.1f}%)')
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    report = run(args)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nResults saved to {args.output}')
+    if args.compare:
+        compare(report, args.compare)
+    sys.exit(0)
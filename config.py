@@ -10,5 +10,84 @@ elif DATABASE_URL.startswith("mysql://"):
     DATABASE_URL = DATABASE_URL.replace("mysql://", "mysql+pymysql://", 1)
 
 SQLALCHEMY_DATABASE_URI = DATABASE_URL
+
+# Old collection history (see archive.py). Defaults to the main database;
+# point it at e.g. sqlite:///archive.db to keep the archive in its own file.
+ARCHIVE_DATABASE_URL = os.environ.get("ARCHIVE_DATABASE_URL", DATABASE_URL)
+ARCHIVE_HORIZON_DAYS = int(os.environ.get("ARCHIVE_HORIZON_DAYS", "730"))
+SQLALCHEMY_BINDS = {"archive": ARCHIVE_DATABASE_URL}
+
+# Optional read replica for report pages (see replica.py). Reports fall back
+# to the primary when the replica is more than REPLICA_MAX_LAG seconds behind
+# or unreachable; the lag is rechecked every REPLICA_CHECK_INTERVAL seconds.
+REPLICA_DATABASE_URL = os.environ.get("REPLICA_DATABASE_URL")
+REPLICA_MAX_LAG = float(os.environ.get("REPLICA_MAX_LAG", "10"))
+REPLICA_CHECK_INTERVAL = float(os.environ.get("REPLICA_CHECK_INTERVAL", "5"))
+if REPLICA_DATABASE_URL:
+    if REPLICA_DATABASE_URL.startswith("postgres://"):
+        REPLICA_DATABASE_URL = REPLICA_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+    if REPLICA_DATABASE_URL.startswith("postgresql"):
+        SQLALCHEMY_BINDS["replica"] = {"url": REPLICA_DATABASE_URL,
+                                       "connect_args": {"options": "-c default_transaction_read_only=on"}}
+    else:
+        SQLALCHEMY_BINDS["replica"] = REPLICA_DATABASE_URL
+
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+
+# Request profiling (see profiler.py). Both are off by default.
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", "0"))
+
+# Template caching (see templating.py): compiled template bytecode directory
+# and the number of rendered fragments kept per worker (0 disables).
+TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR", "template_cache")
+FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", "20000"))
+
+# Response compression (see http_cache.py). Brotli is used when the
+# optional ``brotli`` package is installed and the client accepts it.
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+
+# Message long-poll (see messaging.py): how long a poll request waits for a
+# new message, and how often it checks while waiting.
+MESSAGE_POLL_WAIT = float(os.environ.get("MESSAGE_POLL_WAIT", "25"))
+MESSAGE_POLL_INTERVAL = float(os.environ.get("MESSAGE_POLL_INTERVAL", "1"))
+
+# Branch offices (see branches.py): threads used to run admin-wide reports
+# against every branch at once.
+BRANCH_FANOUT_WORKERS = int(os.environ.get("BRANCH_FANOUT_WORKERS", "8"))
+
+# Parquet export for analytics (see analytics_export.py).
+ANALYTICS_EXPORT_DIR = os.environ.get("ANALYTICS_EXPORT_DIR", "analytics")
+
+# Rows per page on the paginated history pages (withdrawal report, expenses,
+# cash balance); their totals always cover the whole date range.
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", "50"))
+
+# Admission control (see admission.py): concurrent requests per worker
+# process for each request class (0 = no limit), how many more may wait for
+# a slot, and for how many seconds. Keep read + heavy + poll, limits and
+# queues together, below gunicorn's threads so writes always find a thread.
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "1") == "1"
+ADMISSION_LIMITS = {
+    "write": int(os.environ.get("ADMISSION_WRITE_LIMIT", "0")),
+    "read": int(os.environ.get("ADMISSION_READ_LIMIT", "5")),
+    "heavy": int(os.environ.get("ADMISSION_HEAVY_LIMIT", "1")),
+    "poll": int(os.environ.get("ADMISSION_POLL_LIMIT", "2")),
+}
+ADMISSION_QUEUE = {
+    "read": int(os.environ.get("ADMISSION_READ_QUEUE", "2")),
+    "heavy": int(os.environ.get("ADMISSION_HEAVY_QUEUE", "1")),
+}
+ADMISSION_WAIT = float(os.environ.get("ADMISSION_WAIT", "5"))
+
+# Slow-query log (see slow_queries.py): statements slower than SLOW_QUERY_MS
+# milliseconds (0 disables) are recorded with their query plan in
+# SLOW_QUERY_LOG, a local SQLite file that keeps the SLOW_QUERY_LOG_SIZE
+# statements with the most total time.
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.environ.get("SLOW_QUERY_LOG", "slow_queries.db")
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("SLOW_QUERY_LOG_SIZE", "500"))
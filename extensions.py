@@ -0,0 +1,11 @@
+"""Flask extensions shared by the app factory (app.py) and the views.
+
+They are created unbound here and attached to an app in ``create_app``, so
+the view modules can import them without importing the app.
+"""
+from flask_bcrypt import Bcrypt
+from flask_login import LoginManager
+
+bcrypt = Bcrypt()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
@@ -36,6 +36,13 @@ with app.app_context():
         if customer:
             customer.remaining_loan -= collection.amount
     
+    # আর্কাইভ করা কালেকশনগুলোও বিয়োগ করি
+    from models.archive_model import CollectionSummary
+    for summary in CollectionSummary.query.all():
+        customer = Customer.query.get(summary.customer_id)
+        if customer:
+            customer.remaining_loan -= summary.archived_loan_total or 0
+    
     db.session.commit()
     print("\n✅ সফলভাবে সম্পন্ন হয়েছে!")
     print("\nসব customer এর নতুন হিসাব:")
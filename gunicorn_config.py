@@ -1,3 +1,7 @@
 bind = "0.0.0.0:10000"
 workers = 2
+# threads so that message long-polls (messaging.py) do not tie up a whole worker;
+# admission.py keeps reads, reports and polls below this so writes always get one
+worker_class = "gthread"
+threads = 12
 preload_app = True
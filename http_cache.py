@@ -0,0 +1,182 @@
+"""Response compression and conditional GET.
+
+Compression: HTML, JSON, CSV, CSS and JS responses larger than
+COMPRESS_MIN_SIZE bytes are compressed with brotli when the client accepts
+it and the ``brotli`` package is installed, otherwise with gzip.
+
+Conditional GET: every commit that writes to a table bumps that table's row
+in ``table_versions`` (see models/table_version_model.py). The tables a
+transaction touches are noted as it flushes and bumped in a short
+transaction of their own once it has committed, so concurrent writers to
+the same table (collection posts) do not queue on its version row for the
+length of each other's transactions, and a rolled-back write bumps nothing. A view decorated
+with ``@conditional(Model, ...)`` gets an ETag built from the versions of
+those tables, the user, the URL and the date, and a Last-Modified from the
+latest write. When the browser's copy is still current the view is not run
+at all and a 304 is returned.
+
+Writes made outside the app's session (raw SQL in migrations or one-off
+scripts) do not bump the versions; a deploy changes the ETag anyway, and
+``bump('table')`` can be called by hand.
+"""
+import gzip
+import hashlib
+import logging
+import os
+from datetime import date, datetime, timezone
+from functools import wraps
+
+from flask import Response, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event, insert, update
+
+from models.user_model import db
+from models.table_version_model import TableVersion
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = {'text/html', 'text/css', 'text/csv', 'text/plain', 'application/json', 'application/javascript',
+                'text/javascript', 'image/svg+xml'}
+VERSIONS = TableVersion.__table__
+
+_app_token = ''
+
+
+def _bump(connection, tables):
+    now = datetime.utcnow()
+    for name in sorted(tables - {VERSIONS.name}):
+        result = connection.execute(update(VERSIONS).where(VERSIONS.c.table_name == name)
+                                    .values(version=VERSIONS.c.version + 1, updated_at=now))
+        if result.rowcount == 0:
+            connection.execute(insert(VERSIONS).values(table_name=name, version=1, updated_at=now))
+
+
+def bump(*tables):
+    """Mark ``tables`` as changed, for writes that bypass the session."""
+    with db.session.get_bind(TableVersion.__mapper__).begin() as connection:
+        _bump(connection, set(tables))
+
+
+def _changed(session, tables):
+    """Note ``tables`` as written by the session's transaction, against the
+    engine its ``table_versions`` live on (branch storage or the main one)."""
+    engine = session.get_bind(TableVersion.__mapper__)
+    session.info.setdefault('changed_tables', {}).setdefault(engine, set()).update(tables - {VERSIONS.name})
+
+
+def _after_flush(session, flush_context):
+    tables = {obj.__table__.name for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+              if hasattr(obj, '__table__')}
+    if tables:
+        _changed(session, tables)
+
+
+def _do_orm_execute(state):
+    """Bulk ``query.update()`` / ``delete()`` and Core DML run through the session."""
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return None
+    table = getattr(state.statement, 'table', None)
+    if table is not None:
+        _changed(state.session, {table.name})
+    return None
+
+
+def _after_commit(session):
+    for engine, tables in session.info.pop('changed_tables', {}).items():
+        if not tables:
+            continue
+        try:
+            with engine.begin() as connection:
+                _bump(connection, tables)
+        except Exception as e:
+            # the write itself is committed; a missed bump only costs a stale 304 until the next one
+            logging.warning(f'Could not bump table versions of {sorted(tables)}: {e}')
+
+
+def _after_rollback(session):
+    session.info.pop('changed_tables', None)
+
+
+def _source_token(app):
+    """Changes whenever the code or templates are deployed, so ETags from an
+    older release are not reused."""
+    latest = 0.0
+    for directory in (app.root_path, os.path.join(app.root_path, app.template_folder)):
+        for name in os.listdir(directory):
+            if name.endswith(('.py', '.html')):
+                latest = max(latest, os.path.getmtime(os.path.join(directory, name)))
+    return str(int(latest))
+
+
+def conditional(*models, ignore_flashes=False):
+    """Serve the view with ETag / Last-Modified derived from the write
+    versions of ``models``' tables, answering 304 without running it when
+    the client's copy is current. ``ignore_flashes`` is for views that never
+    show flash messages (the JSON API)."""
+    tables = [m.__tablename__ for m in models]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # pages carrying flash messages are one-off and never revalidated
+            if request.method != 'GET' or (session.get('_flashes') and not ignore_flashes):
+                return view(*args, **kwargs)
+            rows = (db.session.query(TableVersion.table_name, TableVersion.version, TableVersion.updated_at)
+                    .filter(TableVersion.table_name.in_(tables)).all())
+            today = date.today()
+            key = repr((_app_token, current_user.get_id(), request.full_path, today.isoformat(),
+                        sorted((name, version) for name, version, _ in rows)))
+            etag = hashlib.sha1(key.encode()).hexdigest()
+            midnight = datetime(today.year, today.month, today.day).astimezone(timezone.utc).replace(tzinfo=None)
+            last_modified = max([midnight] + [u for _, _, u in rows if u])
+
+            if request.if_none_match:
+                fresh = request.if_none_match.contains_weak(etag)
+            else:
+                fresh = request.if_modified_since is not None and \
+                    last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+            if fresh:
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
+
+
+def _compress(app, response):
+    if (response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < app.config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        response.set_data(brotli.compress(data, quality=app.config.get('BROTLI_QUALITY', 5)))
+        response.headers['Content-Encoding'] = 'br'
+    elif accepted['gzip']:
+        response.set_data(gzip.compress(data, compresslevel=app.config.get('COMPRESS_LEVEL', 6)))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def init_http_cache(app):
+    global _app_token
+    _app_token = _source_token(app)
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'do_orm_execute', _do_orm_execute)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_rollback', _after_rollback)
+    app.after_request(lambda response: _compress(app, response))
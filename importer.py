@@ -0,0 +1,432 @@
+"""Bulk import of members, loans and collection history from CSV or XLSX.
+
+Used to onboard a branch that kept paper ledgers or spreadsheets:
+
+    python importer.py customers members.csv
+    python importer.py loans loans.xlsx
+    python importer.py loan_collections old_installments.csv --errors errors.csv
+    python importer.py saving_collections savings.csv --dry-run
+    python importer.py customers members.csv --branch DHK2
+
+The first row holds the column names (case and spaces do not matter):
+
+=====================  ==================================================================
+customers              member_no*, name*, phone, father_husband, village, post, thana,
+                       district, address, nid_no, profession, granter, admission_fee,
+                       staff_email, created_date, total_loan, remaining_loan, savings_balance
+loans                  member_no*, amount*, interest, loan_date*, due_date*, installment_count,
+                       installment_amount, installment_type, service_charge, status
+loan_collections       member_no*, amount*, collection_date*, staff_email
+saving_collections     member_no*, amount*, collection_date*, staff_email
+=====================  ==================================================================
+
+Rows are validated a column at a time in batches: every distinct value of a
+column is parsed once with NumPy mapping the results back, and members
+(``member_no``) and staff (``staff_email``) are looked up in dictionaries
+loaded once. Valid rows are inserted with executemany in chunks of
+INSERT_CHUNK, and the members' loan and savings balances are adjusted with
+one batched UPDATE. The cash balance is not touched, since historical money
+is not in today's till. The imported rows are then posted to the ledger
+(ledger.py), and what the till and the members' stored balances say is
+booked against ``opening``.
+
+By default a file with any invalid row imports nothing, so it can be fixed
+and imported again without duplicates; ``--skip-invalid`` imports the valid
+rows. Loans are imported without installment schedules; run
+``python installments.py backfill`` afterwards.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+from flask import g, has_app_context
+from sqlalchemy import bindparam, insert, select, update
+
+import ledger
+from models.user_model import db, User
+from models.customer_model import Customer
+from models.loan_model import Loan
+from models.loan_collection_model import LoanCollection
+from models.saving_collection_model import SavingCollection
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+BATCH_SIZE = 5000
+INSERT_CHUNK = 5000
+MAX_REPORTED_ERRORS = 1000
+DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y')
+
+RowError = namedtuple('RowError', 'row column message')
+Field = namedtuple('Field', 'name type required')
+
+_INVALID = object()
+
+
+def _text(value):
+    return value
+
+
+def _money(value):
+    try:
+        number = float(value.replace(',', ''))
+    except ValueError:
+        return _INVALID
+    return number if number >= 0 and np.isfinite(number) else _INVALID
+
+
+def _integer(value):
+    try:
+        number = float(value)
+    except ValueError:
+        return _INVALID
+    return int(number) if number.is_integer() and number >= 0 else _INVALID
+
+
+def _date(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return _INVALID
+
+
+TYPES = {
+    'text': (_text, None),
+    'money': (_money, 'must be a non-negative number'),
+    'int': (_integer, 'must be a whole number'),
+    'date': (_date, 'must be a date (YYYY-MM-DD or DD/MM/YYYY)'),
+}
+
+KINDS = {
+    'customers': [
+        Field('member_no', 'text', True), Field('name', 'text', True), Field('phone', 'text', False),
+        Field('father_husband', 'text', False), Field('village', 'text', False), Field('post', 'text', False),
+        Field('thana', 'text', False), Field('district', 'text', False), Field('address', 'text', False),
+        Field('nid_no', 'text', False), Field('profession', 'text', False), Field('granter', 'text', False),
+        Field('admission_fee', 'money', False), Field('staff_email', 'text', False),
+        Field('created_date', 'date', False), Field('total_loan', 'money', False),
+        Field('remaining_loan', 'money', False), Field('savings_balance', 'money', False),
+    ],
+    'loans': [
+        Field('member_no', 'text', True), Field('amount', 'money', True), Field('interest', 'money', False),
+        Field('loan_date', 'date', True), Field('due_date', 'date', True), Field('installment_count', 'int', False),
+        Field('installment_amount', 'money', False), Field('installment_type', 'text', False),
+        Field('service_charge', 'money', False), Field('status', 'text', False),
+    ],
+    'loan_collections': [
+        Field('member_no', 'text', True), Field('amount', 'money', True), Field('collection_date', 'date', True),
+        Field('staff_email', 'text', False),
+    ],
+    'saving_collections': [
+        Field('member_no', 'text', True), Field('amount', 'money', True), Field('collection_date', 'date', True),
+        Field('staff_email', 'text', False),
+    ],
+}
+TABLES = {'customers': Customer.__table__, 'loans': Loan.__table__,
+          'loan_collections': LoanCollection.__table__, 'saving_collections': SavingCollection.__table__}
+
+
+def _header(name):
+    return str(name or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def read_rows(stream, filename):
+    """``(header, rows)`` of a CSV or XLSX file; each row a list of strings."""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        if openpyxl is None:
+            raise ValueError('XLSX import needs the openpyxl package; save the sheet as CSV or pip install openpyxl')
+        sheet = openpyxl.load_workbook(stream, read_only=True, data_only=True).worksheets[0]
+        values = sheet.iter_rows(values_only=True)
+        header = [_header(h) for h in next(values, [])]
+        rows = [[_cell(v) for v in row] for row in values if any(v is not None for v in row)]
+        return header, rows
+    if isinstance(stream, (bytes, bytearray)):
+        stream = io.BytesIO(stream)
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(stream)
+    header = [_header(h) for h in next(reader, [])]
+    return header, [[v.strip() for v in row] for row in reader if any(row)]
+
+
+def _parse_column(values, parse):
+    """Parse each distinct value of ``values`` once and map the results back."""
+    uniques, inverse = np.unique(values, return_inverse=True)
+    parsed = np.empty(len(uniques), dtype=object)
+    parsed[:] = [parse(v) if v != '' else None for v in uniques]
+    return parsed[inverse]
+
+
+def _lookup(values, mapping):
+    uniques, inverse = np.unique(values, return_inverse=True)
+    found = np.empty(len(uniques), dtype=object)
+    for i, value in enumerate(uniques):
+        found[i] = mapping.get(value)  # element-wise: values may be tuples
+    return found[inverse]
+
+
+class Importer:
+    def __init__(self, kind, branch_id=None, update_balances=True):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown import kind {kind!r}; choose from {', '.join(KINDS)}")
+        self.kind = kind
+        self.fields = KINDS[kind]
+        self.branch_id = branch_id
+        self.update_balances = update_balances
+        self.errors = []
+        self.error_count = 0
+        self.warnings = []
+        self.names = {}
+        self.seen = set()
+        self.members = {m: (i, staff, remaining) for i, m, staff, remaining in db.session.execute(
+            select(Customer.id, Customer.member_no, Customer.staff_id, Customer.remaining_loan))}
+        self.staff = {e.lower(): i for i, e in db.session.execute(
+            select(User.id, User.email).where(User.role == 'staff')) if e}
+
+    def error(self, row, column, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(row, column, message))
+
+    def _flag(self, bad, row_numbers, column, message):
+        for row in row_numbers[bad]:
+            self.error(int(row), column, message)
+        return bad
+
+    def check_header(self, header):
+        known = {f.name for f in self.fields}
+        missing = [f.name for f in self.fields if f.required and f.name not in header]
+        if missing:
+            self.error(1, ', '.join(missing), 'required column missing')
+        self.warnings = [f'unknown column {name!r} ignored' for name in header if name and name not in known]
+        return not missing
+
+    def validate(self, header, rows, first_row=2):
+        """Parsed columns of ``rows`` and a mask of the valid ones."""
+        count = len(rows)
+        row_numbers = np.arange(first_row, first_row + count)
+        positions = {name: i for i, name in enumerate(header)}
+        invalid = np.zeros(count, dtype=bool)
+        columns = {}
+        for field in self.fields:
+            if field.name not in positions:
+                columns[field.name] = np.full(count, None, dtype=object)
+                continue
+            i = positions[field.name]
+            raw = np.array([row[i] if i < len(row) else '' for row in rows], dtype=object)
+            parse, message = TYPES[field.type]
+            parsed = _parse_column(raw, parse)
+            if message:
+                invalid |= self._flag(parsed == _INVALID, row_numbers, field.name, message)
+            if field.required:
+                invalid |= self._flag(raw == '', row_numbers, field.name, 'required')
+            columns[field.name] = parsed
+
+        member = _lookup(np.where(columns['member_no'] == None, '', columns['member_no']), self.members)  # noqa: E711
+        if self.kind == 'customers':
+            dupes = np.zeros(count, dtype=bool)
+            for n, member_no in enumerate(columns['member_no']):
+                if member_no is not None and (member_no in self.seen or member_no in self.members):
+                    dupes[n] = True
+                self.seen.add(member_no)
+            invalid |= self._flag(dupes, row_numbers, 'member_no', 'member already exists')
+        else:
+            unknown = (member == None) & (columns['member_no'] != None)  # noqa: E711
+            invalid |= self._flag(unknown, row_numbers, 'member_no', 'no member with this member_no')
+        columns['_member'] = member
+
+        if 'staff_email' in columns:
+            emails = np.array([e.lower() if e else '' for e in columns['staff_email']], dtype=object)
+            staff = _lookup(emails, self.staff)
+            unknown = (staff == None) & (emails != '')  # noqa: E711
+            invalid |= self._flag(unknown, row_numbers, 'staff_email', 'no staff with this email')
+            columns['_staff'] = staff
+
+        if self.kind == 'loans':
+            early = np.array([bool(l and d and d < l) for l, d in zip(columns['loan_date'], columns['due_date'])])
+            invalid |= self._flag(early, row_numbers, 'due_date', 'before loan_date')
+        return columns, ~invalid
+
+    def records(self, columns, valid):
+        """Insert dicts of the valid rows."""
+        now = datetime.utcnow()
+        out = []
+        for n in np.flatnonzero(valid):
+            value = {name: columns[name][n] for name in columns}
+            member = value.pop('_member')
+            staff = value.pop('_staff', None)
+            value.pop('staff_email', None)
+            record = {'branch_id': self.branch_id}
+            if self.kind == 'customers':
+                record.update({k: v for k, v in value.items() if v is not None})
+                record.setdefault('created_date', now)
+                record['updated_date'] = now
+                record['staff_id'] = staff
+                for name in ('admission_fee', 'application_fee', 'welfare_fee', 'total_loan', 'remaining_loan',
+                             'savings_balance'):
+                    record.setdefault(name, 0.0)
+            elif self.kind == 'loans':
+                customer_id, customer_staff, remaining = member
+                record.update({k: v for k, v in value.items() if v is not None and k != 'member_no'})
+                record.update(customer_id=customer_id, staff_id=customer_staff,
+                              customer_name=self.names.get(customer_id))
+                record.setdefault('interest', 0.0)
+                record.setdefault('service_charge', 0.0)
+                record.setdefault('status', 'Pending')
+            else:
+                customer_id, customer_staff, remaining = member
+                record.update(customer_id=customer_id, amount=value['amount'],
+                              collection_date=value['collection_date'], staff_id=staff or customer_staff)
+            out.append(record)
+        return out
+
+    def balance_changes(self, records):
+        """``{customer_id: (d_total_loan, d_remaining_loan, d_savings)}`` the records imply."""
+        if not self.update_balances or self.kind == 'customers' or not records:
+            return {}
+        ids = np.fromiter((r['customer_id'] for r in records), dtype=np.int64, count=len(records))
+        amounts = np.fromiter((r['amount'] for r in records), dtype=float, count=len(records))
+        customers, inverse = np.unique(ids, return_inverse=True)
+        if self.kind == 'loans':
+            interest = np.fromiter((r['interest'] for r in records), dtype=float, count=len(records))
+            totals = np.bincount(inverse, weights=amounts + amounts * interest / 100)
+            deltas = zip(totals, totals, np.zeros(len(customers)))
+        elif self.kind == 'loan_collections':
+            totals = np.bincount(inverse, weights=amounts)
+            deltas = zip(np.zeros(len(customers)), -totals, np.zeros(len(customers)))
+        else:
+            totals = np.bincount(inverse, weights=amounts)
+            deltas = zip(np.zeros(len(customers)), np.zeros(len(customers)), totals)
+        return {int(c): tuple(float(x) for x in d) for c, d in zip(customers, deltas)}
+
+    def check_overpayment(self, changes):
+        """Members whose imported loan collections exceed their outstanding loan."""
+        if self.kind != 'loan_collections' or not self.update_balances:
+            return set()
+        remaining = {i: r for i, staff, r in self.members.values()}
+        member_nos = {i: m for m, (i, staff, r) in self.members.items()}
+        over = {c for c, (dt, dr, ds) in changes.items() if (remaining.get(c) or 0) + dr < -0.005}
+        for c in sorted(over):
+            self.error(None, 'amount', f'collections for member {member_nos.get(c)} exceed the outstanding loan '
+                                    f'(৳{remaining.get(c) or 0:,.2f})')
+        return over
+
+    def run(self, header, rows, dry_run=False, skip_invalid=False):
+        started = time.perf_counter()
+        if self.kind == 'loans':
+            self.names = dict(db.session.execute(select(Customer.id, Customer.name)).all())
+        records = []
+        if self.check_header(header):
+            for offset in range(0, len(rows), BATCH_SIZE):
+                columns, valid = self.validate(header, rows[offset:offset + BATCH_SIZE], first_row=offset + 2)
+                records += self.records(columns, valid)
+        changes = self.balance_changes(records)
+        over = self.check_overpayment(changes)
+        if over:
+            records = [r for r in records if r['customer_id'] not in over]
+            changes = {c: d for c, d in changes.items() if c not in over}
+
+        imported = 0
+        if not dry_run and records and (skip_invalid or not self.error_count):
+            table = TABLES[self.kind]
+            for offset in range(0, len(records), INSERT_CHUNK):
+                db.session.execute(insert(table), records[offset:offset + INSERT_CHUNK])
+            self._apply_balances(changes)
+            db.session.commit()
+            imported = len(records)
+            ledger.sync([self.kind])
+            ledger.reconcile(post_differences=True,
+                             customer_ids=None if self.kind == 'customers' else {r['customer_id'] for r in records})
+        else:
+            db.session.rollback()
+        return {'kind': self.kind, 'rows': len(rows), 'valid': len(records), 'imported': imported,
+                'error_count': self.error_count, 'errors': sorted(self.errors, key=lambda e: e.row or 0), 'warnings': self.warnings, 'dry_run': dry_run,
+                'seconds': time.perf_counter() - started}
+
+    def _apply_balances(self, changes):
+        if not changes:
+            return
+        table = Customer.__table__
+        stmt = (update(table).where(table.c.id == bindparam('cid'))
+                .values(total_loan=table.c.total_loan + bindparam('d_total'),
+                        remaining_loan=table.c.remaining_loan + bindparam('d_remaining'),
+                        savings_balance=table.c.savings_balance + bindparam('d_savings'),
+                        updated_date=datetime.utcnow()))
+        params = [{'cid': c, 'd_total': dt, 'd_remaining': dr, 'd_savings': ds} for c, (dt, dr, ds) in changes.items()]
+        for offset in range(0, len(params), INSERT_CHUNK):
+            db.session.execute(stmt, params[offset:offset + INSERT_CHUNK])
+
+
+def import_file(kind, stream, filename, branch_id=None, dry_run=False, skip_invalid=False, update_balances=True):
+    """Import one file of ``kind``; returns a summary dict with the row errors."""
+    if branch_id is None and has_app_context():
+        from branches import HEAD_OFFICE_BRANCH
+        branch_id = g.get('branch_id') or HEAD_OFFICE_BRANCH
+    header, rows = read_rows(stream, filename)
+    return Importer(kind, branch_id, update_balances).run(header, rows, dry_run=dry_run, skip_invalid=skip_invalid)
+
+
+def write_errors(errors, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['row', 'column', 'message'])
+        writer.writerows(errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('kind', choices=list(KINDS))
+    parser.add_argument('file')
+    parser.add_argument('--branch', help='branch code; default: head office')
+    parser.add_argument('--dry-run', action='store_true', help='validate only')
+    parser.add_argument('--skip-invalid', action='store_true', help='import the valid rows of a file with errors')
+    parser.add_argument('--no-balances', action='store_true',
+                        help="do not adjust members' loan and savings balances (they were imported with the members)")
+    parser.add_argument('--errors', help='write every reported row error to this CSV file')
+    args = parser.parse_args(argv)
+
+    import branches
+    branch = branches._find(args.branch) if args.branch else branches.get_branch(branches.HEAD_OFFICE_BRANCH)
+    branches.use_branch(branch)
+    with open(args.file, 'rb') as f:
+        result = import_file(args.kind, f, os.path.basename(args.file),
+                             branch_id=branch.id if branch else branches.HEAD_OFFICE_BRANCH, dry_run=args.dry_run,
+                             skip_invalid=args.skip_invalid, update_balances=not args.no_balances)
+    for warning in result['warnings']:
+        print(f'  {warning}')
+    for e in result['errors'][:20]:
+        print(f"  row {e.row or '-'}: {e.column}: {e.message}")
+    if result['error_count'] > 20:
+        print(f"  ... {result['error_count'] - 20} more")
+    if args.errors and result['errors']:
+        write_errors(result['errors'], args.errors)
+    print(f"{result['kind']}: {result['rows']} rows, {result['valid']} valid, {result['imported']} imported, "
+          f"{result['error_count']} errors in {result['seconds']:.1f}s")
+    return 1 if result['error_count'] and not result['imported'] else 0
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        sys.exit(main())
@@ -0,0 +1,175 @@
+"""Installment schedules and daily due lists.
+
+``create_schedule`` runs when a loan is added, ``apply_payment`` when a loan
+collection arrives (oldest installment first). The due list for a day is
+precomputed per staff member, normally by a nightly cron job for the next
+day's route:
+
+    python installments.py precompute                  # tomorrow
+    python installments.py precompute --date 2025-01-15
+    python installments.py backfill                    # schedules for existing loans
+"""
+import argparse
+import calendar
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import type_coerce
+
+from models.user_model import db
+from models.money import Money
+from models.customer_model import Customer
+from models.loan_model import Loan
+from models.installment_model import Installment, DueListEntry
+
+# installment_type values posted by add_loan.html, plus their English names
+DAILY = ('দৈনিক', 'daily')
+WEEKLY = ('সাপ্তাহিক', 'weekly')
+MONTHLY = ('মাসিক', 'monthly')
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def due_dates(start, count, installment_type):
+    """Due date of each of ``count`` installments of a loan given on ``start``."""
+    if installment_type in DAILY:
+        return [start + timedelta(days=i) for i in range(1, count + 1)]
+    if installment_type in WEEKLY:
+        return [start + timedelta(weeks=i) for i in range(1, count + 1)]
+    if installment_type in MONTHLY:
+        return [add_months(start, i) for i in range(1, count + 1)]
+    raise ValueError(f'Unknown installment type: {installment_type}')
+
+
+def create_schedule(loan, total):
+    """Add the installment rows of ``loan`` (repaying ``total``) to the session.
+
+    Loans without a count or a known type get no schedule. The last
+    installment absorbs rounding so the schedule always sums to ``total``.
+    """
+    count = loan.installment_count or 0
+    if count <= 0 or loan.customer_id is None:
+        return []
+    try:
+        dates = due_dates(loan.loan_date.date(), count, loan.installment_type)
+    except ValueError:
+        return []
+    amount = loan.installment_amount or round(total / count, 2)
+    rows = []
+    for seq, due in enumerate(dates, start=1):
+        this_amount = amount if seq < count else round(total - amount * (count - 1), 2)
+        if this_amount <= 0:
+            break
+        rows.append(Installment(loan=loan, customer_id=loan.customer_id, staff_id=loan.staff_id,
+                                seq=seq, due_date=due, amount=this_amount, paid_amount=0.0, status='due'))
+    db.session.add_all(rows)
+    return rows
+
+
+def _allocate(customer_id, amount, when):
+    remaining = amount
+    open_installments = (Installment.query.filter(Installment.customer_id == customer_id,
+                                                  Installment.status != 'paid')
+                         .order_by(Installment.due_date, Installment.seq).all())
+    for installment in open_installments:
+        if remaining <= 0:
+            break
+        outstanding = installment.amount - (installment.paid_amount or 0)
+        paying = min(outstanding, remaining)
+        installment.paid_amount = (installment.paid_amount or 0) + paying
+        installment.status = 'paid' if paying >= outstanding - 0.005 else 'partial'
+        installment.paid_date = when
+        remaining -= paying
+
+
+def apply_payment(customer_id, amount, when=None):
+    """Mark the customer's open installments paid, oldest first, and record
+    the payment against today's due list entry if there is one."""
+    when = when or datetime.now()
+    _allocate(customer_id, amount, when)
+    DueListEntry.query.filter_by(customer_id=customer_id, due_date=when.date()).update(
+        {DueListEntry.paid_amount: db.func.coalesce(DueListEntry.paid_amount, 0) + amount},
+        synchronize_session=False)
+
+
+def _due_query(day, staff_id=None):
+    """Open installments due on or before ``day`` grouped per customer."""
+    query = (db.session.query(Installment.staff_id, Installment.customer_id,
+                              db.func.count(Installment.id),
+                              db.func.sum(type_coerce(Installment.amount - db.func.coalesce(Installment.paid_amount, 0), Money)),
+                              db.func.min(Installment.due_date))
+             .filter(Installment.due_date <= day, Installment.status != 'paid'))
+    if staff_id is not None:
+        query = query.filter(Installment.staff_id == staff_id)
+    return query.group_by(Installment.staff_id, Installment.customer_id)
+
+
+def precompute_due_list(day):
+    """Rebuild every staff member's due list for ``day``. Returns the number of entries."""
+    DueListEntry.query.filter_by(due_date=day).delete(synchronize_session=False)
+    rows = [{'staff_id': staff_id, 'due_date': day, 'customer_id': customer_id, 'installments_due': count,
+             'amount_due': round(amount_due, 2), 'paid_amount': 0.0, 'oldest_due_date': oldest,
+             'created_date': datetime.utcnow()}
+            for staff_id, customer_id, count, amount_due, oldest in _due_query(day)]
+    if rows:
+        db.session.execute(DueListEntry.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def due_list(staff_id, day):
+    """The due list of ``staff_id`` for ``day``: the precomputed entries, or a
+    live computation (not stored) if the nightly job has not run for ``day``."""
+    entries = (DueListEntry.query.filter_by(staff_id=staff_id, due_date=day)
+               .options(db.joinedload(DueListEntry.customer)).all())
+    if entries:
+        return entries
+    live = _due_query(day, staff_id).all()
+    customers = {c.id: c for c in Customer.query.filter(Customer.id.in_([r[1] for r in live]))} if live else {}
+    return [DueListEntry(staff_id=s, due_date=day, customer_id=c, customer=customers.get(c), installments_due=n,
+                         amount_due=round(a, 2), paid_amount=0.0, oldest_due_date=oldest)
+            for s, c, n, a, oldest in live]
+
+
+def backfill_schedules():
+    """Create schedules for existing loans that have installment details but
+    no schedule yet, then mark what each member has already repaid
+    (``total_loan - remaining_loan``) against their oldest installments."""
+    scheduled = db.session.query(Installment.loan_id).distinct()
+    loans = (Loan.query.filter(Loan.installment_count > 0, Loan.customer_id.isnot(None),
+                               ~Loan.id.in_(scheduled)).all())
+    for loan in loans:
+        total = loan.amount + loan.amount * (loan.interest or 0) / 100
+        create_schedule(loan, total)
+    db.session.flush()
+
+    customer_ids = {loan.customer_id for loan in loans}
+    allocated = dict(db.session.query(Installment.customer_id, db.func.sum(Installment.paid_amount))
+                     .filter(Installment.customer_id.in_(customer_ids)).group_by(Installment.customer_id).all())
+    for customer in Customer.query.filter(Customer.id.in_(customer_ids)):
+        repaid = (customer.total_loan or 0) - (customer.remaining_loan or 0) - (allocated.get(customer.id) or 0)
+        if repaid > 0:
+            _allocate(customer.id, repaid, datetime.now())
+    db.session.commit()
+    return len(loans)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Installment schedules and due lists')
+    parser.add_argument('command', choices=['precompute', 'backfill'])
+    parser.add_argument('--date', help='YYYY-MM-DD, defaults to tomorrow')
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        if args.command == 'precompute':
+            day = datetime.strptime(args.date, '%Y-%m-%d').date() if args.date else date.today() + timedelta(days=1)
+            print(f'Due list for {day}: {precompute_due_list(day)} entries')
+        else:
+            print(f'Schedules created for {backfill_schedules()} loans')
+    sys.exit(0)
@@ -0,0 +1,434 @@
+"""Double-entry ledger behind the stored balances.
+
+Every money event is a journal entry (models/ledger_model.py) of two or more
+signed lines, debits positive and credits negative, that sum to zero:
+
+=====================  ======================================================
+loan collection        Dr cash, Cr customer_loan (member)
+saving collection      Dr cash, Cr customer_savings (member)
+loan                   Dr customer_loan (member) principal + interest,
+                       Cr cash principal, Cr interest; service charge
+                       Dr cash, Cr fees
+admission fee          Dr cash, Cr fees
+investment             Dr cash, Cr capital
+withdrawal             Dr customer_savings (member) or capital, Cr cash
+expense                Dr expenses, Cr cash
+=====================  ======================================================
+
+The pages keep updating ``customers`` and ``cash_balance`` through
+balances.py and post the entry in the same transaction (``record(row)``), so
+the stored balances stay the fast path and the journal is the history
+behind them: ``reconcile()`` compares the two.
+
+A balance on any date is the account's last checkpoint before it plus one
+indexed range sum over the lines after it, so it costs the same in year five
+as in month one. ``checkpoint()`` writes the balance of every account (per
+branch and member) at the start of a day; run it monthly::
+
+    python ledger.py sync [--full]          # rows that have no entry yet; --full adds archived collections
+    python ledger.py check [--post]         # stored balances vs ledger; --post books the differences as opening
+    python ledger.py checkpoint [--as-of 2024-07-01]
+    python ledger.py balance --customer 42 --as-of 2024-03-31
+
+Entries dated before an existing checkpoint (a back-dated loan, an import)
+drop the checkpoints after their date; the next ``checkpoint`` run rebuilds
+them. The commands work on the main database; branches with their own
+storage are not included.
+"""
+import argparse
+import sys
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import and_, delete, exists, func, insert, or_, select
+
+from models.user_model import db
+from models.money import paisa
+from models.customer_model import Customer
+from models.loan_model import Loan
+from models.loan_collection_model import LoanCollection
+from models.saving_collection_model import SavingCollection
+from models.withdrawal_model import Withdrawal
+from models.expense_model import Expense
+from models.investment_model import Investment
+from models.cash_balance_model import CashBalance
+from models.archive_model import LoanCollectionArchive, SavingCollectionArchive
+from models.ledger_model import JournalEntry, JournalLine, AccountCheckpoint
+
+CASH = 'cash'
+CUSTOMER_LOAN = 'customer_loan'
+CUSTOMER_SAVINGS = 'customer_savings'
+FEES = 'fees'
+INTEREST = 'interest'
+EXPENSES = 'expenses'
+CAPITAL = 'capital'
+OPENING = 'opening'
+ACCOUNTS = (CASH, CUSTOMER_LOAN, CUSTOMER_SAVINGS, FEES, INTEREST, EXPENSES, CAPITAL, OPENING)
+# shown with the sign flipped, so a member's savings or the fee income read positive
+CREDIT_ACCOUNTS = {CUSTOMER_SAVINGS, FEES, INTEREST, CAPITAL, OPENING}
+
+SYNC_CHUNK = 5000
+
+
+class UnbalancedEntry(ValueError):
+    pass
+
+
+def _round(amount):
+    return round(amount or 0.0, 2)
+
+
+def _collection_lines(account):
+    def lines(row):
+        return [(CASH, None, row.amount), (account, row.customer_id, -row.amount)]
+    return lines
+
+
+def _loan_lines(row):
+    principal = _round(row.amount)
+    total = _round(row.amount + row.amount * (row.interest or 0) / 100)
+    lines = [(CUSTOMER_LOAN, row.customer_id, total), (CASH, None, -principal), (INTEREST, None, principal - total)]
+    if row.service_charge:
+        lines += [(CASH, None, row.service_charge), (FEES, None, -row.service_charge)]
+    return lines
+
+
+def _admission_lines(row):
+    if not row.admission_fee:
+        return []
+    return [(CASH, None, row.admission_fee), (FEES, None, -row.admission_fee)]
+
+
+def _withdrawal_lines(row):
+    if row.customer_id:
+        return [(CUSTOMER_SAVINGS, row.customer_id, row.amount), (CASH, None, -row.amount)]
+    return [(CAPITAL, None, row.amount), (CASH, None, -row.amount)]
+
+
+# what each table's rows post: model, entry kind, date column, columns the lines need, lines(row)
+Source = namedtuple('Source', 'model kind date columns lines')
+SOURCES = {
+    'loan_collections': Source(LoanCollection, 'loan_collection', 'collection_date', ['customer_id', 'amount'],
+                               _collection_lines(CUSTOMER_LOAN)),
+    'saving_collections': Source(SavingCollection, 'saving_collection', 'collection_date', ['customer_id', 'amount'],
+                                 _collection_lines(CUSTOMER_SAVINGS)),
+    'loans': Source(Loan, 'loan', 'loan_date', ['customer_id', 'amount', 'interest', 'service_charge'], _loan_lines),
+    'customers': Source(Customer, 'admission_fee', 'created_date', ['admission_fee'], _admission_lines),
+    'investments': Source(Investment, 'investment', 'date', ['amount'],
+                          lambda row: [(CASH, None, row.amount), (CAPITAL, None, -row.amount)]),
+    'withdrawals': Source(Withdrawal, 'withdrawal', 'date', ['customer_id', 'amount'], _withdrawal_lines),
+    'expenses': Source(Expense, 'expense', 'date', ['amount'],
+                       lambda row: [(EXPENSES, None, row.amount), (CASH, None, -row.amount)]),
+}
+# archived collections keep their ids, so they post as the table they came from
+ARCHIVES = {'loan_collections': LoanCollectionArchive, 'saving_collections': SavingCollectionArchive}
+
+
+def _combine(lines):
+    """Lines merged per (account, member) and rounded to paisa, zero lines dropped."""
+    merged = defaultdict(float)
+    for account, customer_id, amount in lines:
+        merged[account, customer_id] += amount or 0.0
+    combined = [(account, customer_id, _round(amount)) for (account, customer_id), amount in merged.items()]
+    combined = [line for line in combined if line[2]]
+    if abs(sum(amount for account, customer_id, amount in combined)) > 0.005:
+        raise UnbalancedEntry(f'Journal lines do not balance: {combined}')
+    return combined
+
+
+def _start_of(day):
+    return datetime.combine(day, time.min)
+
+
+def _today():
+    return _start_of(date.today())
+
+
+def _invalidate(since):
+    """Drop checkpoints that a line dated ``since`` falls before."""
+    db.session.execute(delete(AccountCheckpoint).where(AccountCheckpoint.as_of > since))
+
+
+def post(kind, lines, date=None, source=None, memo=None, branch_id=None):
+    """Add a journal entry of ``lines`` (``(account, customer_id, amount)``,
+    debits positive) to the session. Returns the entry, or None when every
+    line is zero."""
+    lines = _combine(lines)
+    if not lines:
+        return None
+    date = date or datetime.now()
+    source_table, source_id = source or (None, None)
+    entry = JournalEntry(kind=kind, date=date, source_table=source_table, source_id=source_id, memo=memo,
+                         branch_id=branch_id)
+    entry.lines = [JournalLine(account=account, customer_id=customer_id, amount=amount, date=date, branch_id=branch_id)
+                   for account, customer_id, amount in lines]
+    db.session.add(entry)
+    # checkpoints are never later than the start of today
+    if date < _today():
+        _invalidate(date)
+    return entry
+
+
+def record(row):
+    """Post the entry for a new row of one of the SOURCES tables."""
+    table = row.__tablename__
+    source = SOURCES[table]
+    if row.id is None:
+        db.session.flush()
+    return post(source.kind, source.lines(row), date=getattr(row, source.date), source=(table, row.id),
+                branch_id=row.branch_id)
+
+
+def _existing(table, low, high):
+    return set(db.session.execute(select(JournalEntry.source_id).where(
+        JournalEntry.source_table == table, JournalEntry.source_id.between(low, high))).scalars())
+
+
+def _sync_rows(table, source, model, branch_of):
+    """Post entries for ``model`` rows that have none. Returns (entries
+    posted, earliest date posted)."""
+    has_branch = hasattr(model, 'branch_id')
+    columns = [model.id, getattr(model, source.date).label('date')] + [getattr(model, c) for c in source.columns]
+    if has_branch:
+        columns.append(model.branch_id)
+    stmt = select(*columns)
+    if model is source.model:
+        # rows without an entry, read through the unique (source_table, source_id) index;
+        # archived collections live on another bind and are checked a chunk at a time
+        stmt = stmt.where(~exists().where(JournalEntry.source_table == table, JournalEntry.source_id == model.id))
+    posted, earliest, after = 0, None, 0
+    while True:
+        rows = db.session.execute(stmt.where(model.id > after).order_by(model.id).limit(SYNC_CHUNK)).all()
+        if not rows:
+            return posted, earliest
+        after = rows[-1].id
+        existing = _existing(table, rows[0].id, after)
+        entries, lines = [], {}
+        for row in rows:
+            if row.id in existing:
+                continue
+            row_lines = _combine(source.lines(row))
+            if not row_lines:
+                continue
+            entry_date = row.date or datetime.now()
+            branch_id = (row.branch_id if has_branch else branch_of.get(row.customer_id)) or _head_office()
+            entries.append({'kind': source.kind, 'date': entry_date, 'source_table': table, 'source_id': row.id,
+                            'branch_id': branch_id, 'created_date': datetime.utcnow()})
+            lines[row.id] = (entry_date, branch_id, row_lines)
+            earliest = entry_date if earliest is None else min(earliest, entry_date)
+        if not entries:
+            continue
+        returned = db.session.execute(
+            insert(JournalEntry.__table__).returning(JournalEntry.__table__.c.id, JournalEntry.__table__.c.source_id,
+                                                     sort_by_parameter_order=True), entries)
+        line_rows = [{'entry_id': entry_id, 'account': account, 'customer_id': customer_id, 'amount': amount,
+                      'date': lines[source_id][0], 'branch_id': lines[source_id][1]}
+                     for entry_id, source_id in returned
+                     for account, customer_id, amount in lines[source_id][2]]
+        db.session.execute(insert(JournalLine.__table__), line_rows)
+        db.session.commit()
+        posted += len(entries)
+
+
+def _head_office():
+    from branches import HEAD_OFFICE_BRANCH
+    return HEAD_OFFICE_BRANCH
+
+
+def sync(tables=None, full=False):
+    """Post entries for source rows that have none, in chunks of SYNC_CHUNK
+    committed one at a time: every row of each table without an entry,
+    found with an anti-join, so rows older than the newest posted one
+    (history from before migration 0013, bulk imports) are included.
+    ``full`` also walks the archived collections. Returns ``{table: entries
+    posted}``."""
+    posted = {}
+    earliest = None
+    branch_of = None
+    for table in tables or SOURCES:
+        source = SOURCES[table]
+        models = [source.model]
+        if full and table in ARCHIVES:
+            models.insert(0, ARCHIVES[table])
+        posted[table] = 0
+        for model in models:
+            if not hasattr(model, 'branch_id') and branch_of is None:
+                branch_of = dict(db.session.execute(select(Customer.id, Customer.branch_id)).all())
+            count, first = _sync_rows(table, source, model, branch_of or {})
+            posted[table] += count
+            if first is not None:
+                earliest = first if earliest is None else min(earliest, first)
+    if earliest is not None:
+        _invalidate(earliest)
+        db.session.commit()
+    return posted
+
+
+def _ledger_sums(accounts, by_branch=False):
+    """``{(branch_id or None, account, customer_id): sum in paisa}`` over every line."""
+    keys = [JournalLine.branch_id] if by_branch else []
+    stmt = (select(*keys, JournalLine.account, JournalLine.customer_id, paisa(func.sum(JournalLine.amount)))
+            .where(JournalLine.account.in_(accounts))
+            .group_by(*keys, JournalLine.account, JournalLine.customer_id))
+    if by_branch:
+        return {(b, a, c): total for b, a, c, total in db.session.execute(stmt)}
+    return {(None, a, c): total for a, c, total in db.session.execute(stmt)}
+
+
+def reconcile(post_differences=False, customer_ids=None):
+    """Stored balances that differ from the ledger: member loans and
+    savings (of ``customer_ids`` only, if given), and the cash balance of
+    each branch. Returns ``[(branch_id, account, customer_id, stored,
+    ledger)]``. With ``post_differences`` the gaps are booked against
+    ``opening``, one entry per branch, so the ledger agrees from then on
+    (balances carried over from before the ledger, imported members'
+    opening balances, imported history that never went through the till)."""
+    members = db.session.execute(select(Customer.id, Customer.branch_id, paisa(Customer.remaining_loan),
+                                        paisa(Customer.savings_balance))).all()
+    if customer_ids is not None:
+        members = [m for m in members if m.id in customer_ids]
+    ledger = _ledger_sums([CUSTOMER_LOAN, CUSTOMER_SAVINGS])
+    cash = _ledger_sums([CASH], by_branch=True)
+    # compared exactly, in paisa; reported in taka
+    differences = []
+    for customer_id, branch_id, remaining_loan, savings_balance in members:
+        loan = ledger.get((None, CUSTOMER_LOAN, customer_id)) or 0
+        savings = -(ledger.get((None, CUSTOMER_SAVINGS, customer_id)) or 0)
+        if (remaining_loan or 0) != loan:
+            differences.append((branch_id, CUSTOMER_LOAN, customer_id, (remaining_loan or 0) / 100, loan / 100))
+        if (savings_balance or 0) != savings:
+            differences.append((branch_id, CUSTOMER_SAVINGS, customer_id, (savings_balance or 0) / 100, savings / 100))
+    stored_cash = dict(db.session.execute(select(CashBalance.branch_id, paisa(func.sum(CashBalance.balance)))
+                                          .group_by(CashBalance.branch_id)).all())
+    for branch_id in sorted(set(stored_cash) | {b for b, a, c in cash}, key=lambda b: b or 0):
+        ledger_cash = cash.get((branch_id, CASH, None)) or 0
+        if (stored_cash.get(branch_id) or 0) != ledger_cash:
+            differences.append((branch_id, CASH, None, (stored_cash.get(branch_id) or 0) / 100, ledger_cash / 100))
+
+    if post_differences and differences:
+        by_branch = defaultdict(list)
+        for branch_id, account, customer_id, stored, current in differences:
+            gap = stored - current
+            if account in CREDIT_ACCOUNTS:
+                gap = -gap
+            by_branch[branch_id or _head_office()] += [(account, customer_id, gap), (OPENING, None, -gap)]
+        for branch_id, lines in by_branch.items():
+            post('opening', lines, memo='balances carried into the ledger', branch_id=branch_id)
+        db.session.commit()
+    return differences
+
+
+def checkpoint(as_of=None):
+    """Write every account's balance (per branch and member) at the start of
+    ``as_of`` (a date, default today): the previous checkpoint plus the
+    lines since. Returns the number of balances written."""
+    as_of = min(_start_of(as_of or date.today()), _today())
+    key = (AccountCheckpoint.branch_id, AccountCheckpoint.account, AccountCheckpoint.customer_id)
+    previous = db.session.execute(select(func.max(AccountCheckpoint.as_of))
+                                  .where(AccountCheckpoint.as_of < as_of)).scalar()
+    balances = defaultdict(float)
+    if previous is not None:
+        for branch_id, account, customer_id, balance in db.session.execute(
+                select(*key, AccountCheckpoint.balance).where(AccountCheckpoint.as_of == previous)):
+            balances[branch_id, account, customer_id] = balance
+    window = JournalLine.date < as_of
+    if previous is not None:
+        window = and_(window, JournalLine.date >= previous)
+    for branch_id, account, customer_id, amount in db.session.execute(
+            select(JournalLine.branch_id, JournalLine.account, JournalLine.customer_id, func.sum(JournalLine.amount))
+            .where(window).group_by(JournalLine.branch_id, JournalLine.account, JournalLine.customer_id)):
+        balances[branch_id, account, customer_id] += amount
+
+    db.session.execute(delete(AccountCheckpoint).where(AccountCheckpoint.as_of == as_of))
+    # settled members are left out; their balance before the next checkpoint is zero either way
+    rows = [{'branch_id': b, 'account': a, 'customer_id': c, 'as_of': as_of, 'balance': _round(balance)}
+            for (b, a, c), balance in balances.items() if _round(balance)]
+    for offset in range(0, len(rows), SYNC_CHUNK):
+        db.session.execute(insert(AccountCheckpoint.__table__), rows[offset:offset + SYNC_CHUNK])
+    db.session.commit()
+    return len(rows)
+
+
+def balance(account, customer_id=None, as_of=None):
+    """Balance of ``account`` (a member's, with ``customer_id``) at the end
+    of ``as_of`` (a date, default now), summed over the branches the
+    session can see. Credit accounts (savings, income, capital) read
+    positive."""
+    until = _start_of(as_of + timedelta(days=1)) if as_of else None
+    marks_stmt = (select(AccountCheckpoint.branch_id, func.max(AccountCheckpoint.as_of))
+                  .where(AccountCheckpoint.account == account, AccountCheckpoint.customer_id == customer_id)
+                  .group_by(AccountCheckpoint.branch_id))
+    if until is not None:
+        marks_stmt = marks_stmt.where(AccountCheckpoint.as_of <= until)
+    marks = dict(db.session.execute(marks_stmt).all())
+
+    total = 0.0
+    if marks:
+        total += db.session.execute(select(func.sum(AccountCheckpoint.balance)).where(
+            AccountCheckpoint.account == account, AccountCheckpoint.customer_id == customer_id,
+            or_(*[and_(AccountCheckpoint.branch_id == b, AccountCheckpoint.as_of == m) for b, m in marks.items()])
+        )).scalar() or 0.0
+    lines = select(func.sum(JournalLine.amount)).where(
+        JournalLine.account == account, JournalLine.customer_id == customer_id,
+        or_(*[and_(JournalLine.branch_id == b, JournalLine.date >= m) for b, m in marks.items()],
+            JournalLine.branch_id.not_in(list(marks))))
+    if until is not None:
+        lines = lines.where(JournalLine.date < until)
+    total += db.session.execute(lines).scalar() or 0.0
+    total = _round(total)
+    return -total if account in CREDIT_ACCOUNTS else total
+
+
+def member_balances(customer_id, as_of=None):
+    """``{'loan': outstanding, 'savings': balance}`` of a member at the end of ``as_of``."""
+    return {'loan': balance(CUSTOMER_LOAN, customer_id, as_of), 'savings': balance(CUSTOMER_SAVINGS, customer_id, as_of)}
+
+
+def _date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sync_cmd = sub.add_parser('sync')
+    sync_cmd.add_argument('tables', nargs='*', help=f"default: every table ({', '.join(SOURCES)})")
+    sync_cmd.add_argument('--full', action='store_true', help='also post archived collections')
+    check = sub.add_parser('check')
+    check.add_argument('--post', action='store_true', help='book the differences against opening')
+    checkpoint_cmd = sub.add_parser('checkpoint')
+    checkpoint_cmd.add_argument('--as-of', type=_date, help='YYYY-MM-DD, default today')
+    balance_cmd = sub.add_parser('balance')
+    balance_cmd.add_argument('--customer', type=int)
+    balance_cmd.add_argument('--account', choices=ACCOUNTS, default=CASH)
+    balance_cmd.add_argument('--as-of', type=_date, help='YYYY-MM-DD, default now')
+    args = parser.parse_args(argv)
+    if args.command == 'sync' and set(args.tables) - set(SOURCES):
+        parser.error(f"unknown table(s): {', '.join(sorted(set(args.tables) - set(SOURCES)))}")
+
+    from app import app
+    with app.app_context():
+        if args.command == 'sync':
+            for table, count in sync(args.tables or None, full=args.full).items():
+                print(f'{table:20} {count:>8} entries posted')
+        elif args.command == 'check':
+            differences = reconcile(post_differences=args.post)
+            for branch_id, account, customer_id, stored, current in differences[:50]:
+                print(f'branch {branch_id} {account:17} {customer_id or "":>8} stored {stored:>14,.2f} '
+                      f'ledger {current:>14,.2f}')
+            if len(differences) > 50:
+                print(f'... {len(differences) - 50} more')
+            print(f'{len(differences)} difference(s)' + (', booked against opening' if args.post and differences else ''))
+            return 1 if differences and not args.post else 0
+        elif args.command == 'checkpoint':
+            print(f'{checkpoint(args.as_of)} balances written')
+        elif args.customer:
+            for name, value in member_balances(args.customer, args.as_of).items():
+                print(f'{name:8} {value:>14,.2f}')
+        else:
+            print(f'{args.account:8} {balance(args.account, as_of=args.as_of):>14,.2f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
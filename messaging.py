@@ -0,0 +1,93 @@
+"""Staff messages: sending, read state and delivery.
+
+Every send and every read updates the staff member's row in
+``message_counters`` in the same transaction, so the unread badge is one
+primary-key lookup instead of a count over ``messages``. Broadcasts to all
+staff are one multi-row insert plus one counter update.
+
+Staff pages pick up new messages through ``wait_for_messages``, a long-poll:
+the request checks the counter row every MESSAGE_POLL_INTERVAL seconds and
+returns as soon as a newer message exists, or empty-handed after
+MESSAGE_POLL_WAIT seconds, after which the browser asks again.
+"""
+import time
+from datetime import datetime
+
+from sqlalchemy import case, insert, select, update
+
+from models.user_model import db, User
+from models.message_model import Message, MessageCounter
+
+COUNTERS = MessageCounter.__table__
+
+
+def _ensure_counters(staff_ids):
+    existing = {s for (s,) in db.session.execute(select(COUNTERS.c.staff_id).where(COUNTERS.c.staff_id.in_(staff_ids)))}
+    missing = [{'staff_id': s, 'unread': 0, 'latest_message_id': 0, 'updated_date': datetime.utcnow()}
+               for s in staff_ids if s not in existing]
+    if missing:
+        db.session.execute(insert(COUNTERS), missing)
+
+
+def send(staff_ids, content):
+    """Send ``content`` to each of ``staff_ids`` with one insert. Returns the number sent."""
+    staff_ids = sorted(set(staff_ids))
+    if not staff_ids:
+        return 0
+    now = datetime.utcnow()
+    db.session.execute(insert(Message.__table__),
+                       [{'staff_id': s, 'content': content, 'is_read': False, 'created_date': now} for s in staff_ids])
+    latest = db.session.execute(select(db.func.max(Message.id))).scalar()
+    _ensure_counters(staff_ids)
+    db.session.execute(update(COUNTERS).where(COUNTERS.c.staff_id.in_(staff_ids))
+                       .values(unread=COUNTERS.c.unread + 1, latest_message_id=latest, updated_date=now))
+    db.session.commit()
+    return len(staff_ids)
+
+
+def broadcast(content):
+    staff_ids = [s for (s,) in db.session.query(User.id).filter_by(role='staff')]
+    return send(staff_ids, content)
+
+
+def mark_read(staff_id, message_ids=None):
+    """Mark ``message_ids`` (or all) of ``staff_id``'s unread messages read. Returns the number marked."""
+    stmt = update(Message.__table__).where(Message.staff_id == staff_id, Message.is_read == False)  # noqa: E712
+    if message_ids is not None:
+        stmt = stmt.where(Message.id.in_(message_ids))
+    marked = db.session.execute(stmt.values(is_read=True)).rowcount
+    if marked:
+        db.session.execute(update(COUNTERS).where(COUNTERS.c.staff_id == staff_id)
+                           .values(unread=case((COUNTERS.c.unread > marked, COUNTERS.c.unread - marked), else_=0),
+                                   updated_date=datetime.utcnow()))
+    db.session.commit()
+    return marked
+
+
+def counter(staff_id):
+    """``(unread, latest_message_id)`` of a staff member."""
+    row = db.session.execute(select(COUNTERS.c.unread, COUNTERS.c.latest_message_id)
+                             .where(COUNTERS.c.staff_id == staff_id)).first()
+    return (row[0], row[1]) if row else (0, 0)
+
+
+def messages_after(staff_id, since):
+    rows = db.session.execute(select(Message.id, Message.content, Message.created_date)
+                              .where(Message.staff_id == staff_id, Message.id > since).order_by(Message.id))
+    return [{'id': i, 'content': content, 'created_date': created.isoformat()} for i, content, created in rows]
+
+
+def wait_for_messages(staff_id, since, timeout, interval=1.0):
+    """Block until ``staff_id`` has a message newer than ``since`` or
+    ``timeout`` seconds pass. Returns ``{'unread', 'latest', 'messages'}``."""
+    deadline = time.monotonic() + timeout
+    while True:
+        unread, latest = counter(staff_id)
+        if latest > since or time.monotonic() >= deadline:
+            break
+        # hand the connection back to the pool while sleeping
+        db.session.rollback()
+        time.sleep(interval)
+    messages = messages_after(staff_id, since) if latest > since else []
+    db.session.rollback()
+    return {'unread': unread, 'latest': latest, 'messages': messages}
@@ -0,0 +1,206 @@
+"""Versioned schema migrations.
+
+Each file in ``migrations/`` is one revision, named ``NNNN_description.py``
+and defining ``upgrade(m)`` where ``m`` is a :class:`Migrator`. Applied
+revisions are recorded in ``schema_migrations`` so every revision runs once.
+
+    python migrate.py               # apply all pending revisions
+    python migrate.py status        # list applied / pending revisions
+    python migrate.py upgrade --target 0003 --chunk-size 2000 --pause 0.2
+
+Data changes go through :meth:`Migrator.backfill`, which updates one id
+range at a time in its own short transaction, sleeps between chunks so the
+app keeps serving, and records its position in ``migration_progress`` so an
+interrupted run continues where it stopped.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+DEFAULT_CHUNK_SIZE = int(os.environ.get('MIGRATION_CHUNK_SIZE', 5000))
+DEFAULT_PAUSE = float(os.environ.get('MIGRATION_PAUSE', 0.05))
+
+
+class Migrator:
+    def __init__(self, engine, revision, chunk_size=DEFAULT_CHUNK_SIZE, pause=DEFAULT_PAUSE, verbose=True):
+        self.engine = engine
+        self.revision = revision
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.verbose = verbose
+
+    @property
+    def dialect(self):
+        return self.engine.dialect.name
+
+    def log(self, message):
+        if self.verbose:
+            print(f'  [{self.revision}] {message}')
+
+    def execute(self, sql, **params):
+        with self.engine.begin() as conn:
+            return conn.execute(text(sql), params)
+
+    def scalar(self, sql, **params):
+        """Run a SQL string or SQLAlchemy statement and return the first column of the first row."""
+        with self.engine.connect() as conn:
+            return conn.execute(text(sql) if isinstance(sql, str) else sql, params).scalar()
+
+    def quote(self, name):
+        """``name`` quoted if the dialect needs it (``user`` is reserved on PostgreSQL)."""
+        return self.engine.dialect.identifier_preparer.quote(name)
+
+    def has_table(self, table):
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table, column):
+        return any(c['name'] == column for c in inspect(self.engine).get_columns(table))
+
+    def has_index(self, table, name):
+        return any(i['name'] == name for i in inspect(self.engine).get_indexes(table))
+
+    def add_column(self, table, column, ddl):
+        """``ALTER TABLE table ADD COLUMN column ddl`` unless it already exists."""
+        if self.has_column(table, column):
+            self.log(f'{table}.{column} already exists')
+            return False
+        self.execute(f'ALTER TABLE {self.quote(table)} ADD COLUMN {column} {ddl}')
+        self.log(f'added {table}.{column}')
+        return True
+
+    def create_index(self, name, table, columns):
+        if self.has_index(table, name):
+            return False
+        self.execute(f'CREATE INDEX {name} ON {self.quote(table)} ({", ".join(columns)})')
+        self.log(f'created index {name}')
+        return True
+
+    def create_all(self, *tables):
+        """Create the given model tables (or every model table) that do not exist yet."""
+        from models.user_model import db
+        db.metadata.create_all(self.engine, tables=[t.__table__ for t in tables] or None)
+
+    def _progress(self, step):
+        return self.scalar('SELECT last_id FROM migration_progress WHERE revision = :revision AND step = :step',
+                           revision=self.revision, step=step)
+
+    def _save_progress(self, conn, step, last_id):
+        updated = conn.execute(text('UPDATE migration_progress SET last_id = :last_id, updated_at = :now '
+                                    'WHERE revision = :revision AND step = :step'),
+                               {'last_id': last_id, 'now': datetime.utcnow(), 'revision': self.revision, 'step': step})
+        if updated.rowcount == 0:
+            conn.execute(text('INSERT INTO migration_progress (revision, step, last_id, updated_at) '
+                              'VALUES (:revision, :step, :last_id, :now)'),
+                         {'last_id': last_id, 'now': datetime.utcnow(), 'revision': self.revision, 'step': step})
+
+    def backfill(self, table, set_sql, where_sql='1=1', params=None, step=None, key='id'):
+        """Run ``UPDATE table SET set_sql WHERE where_sql`` in id-range chunks
+        (ranges of ``key``, an integer column, for tables without an id).
+
+        Each chunk commits on its own and its upper bound is recorded, so
+        locks are held for one chunk at a time and a rerun resumes after the
+        last committed chunk. Returns the number of rows updated.
+        """
+        step = step or f'{table}:{set_sql}'
+        params = params or {}
+        max_id = self.scalar(f'SELECT MAX({key}) FROM {self.quote(table)}')
+        if max_id is None:
+            return 0
+        last_id = self._progress(step)
+        if last_id is None:
+            last_id = (self.scalar(f'SELECT MIN({key}) FROM {self.quote(table)}') or 1) - 1
+        elif last_id >= max_id:
+            self.log(f'{step}: already complete')
+            return 0
+
+        total = 0
+        sql = text(f'UPDATE {self.quote(table)} SET {set_sql} WHERE {key} > :_lo AND {key} <= :_hi AND ({where_sql})')
+        while last_id < max_id:
+            hi = min(last_id + self.chunk_size, max_id)
+            with self.engine.begin() as conn:
+                total += conn.execute(sql, dict(params, _lo=last_id, _hi=hi)).rowcount
+                self._save_progress(conn, step, hi)
+            last_id = hi
+            self.log(f'{step}: {hi}/{max_id} ({total} rows updated)')
+            if self.pause:
+                time.sleep(self.pause)
+        return total
+
+
+def ensure_version_tables(engine):
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE IF NOT EXISTS schema_migrations ('
+                          'revision VARCHAR(32) PRIMARY KEY, description VARCHAR(200), applied_at TIMESTAMP)'))
+        conn.execute(text('CREATE TABLE IF NOT EXISTS migration_progress ('
+                          'revision VARCHAR(32) NOT NULL, step VARCHAR(200) NOT NULL, last_id BIGINT, '
+                          'updated_at TIMESTAMP, PRIMARY KEY (revision, step))'))
+
+
+def discover():
+    """Return ``[(revision, module)]`` for every migration file, oldest first."""
+    found = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not filename.endswith('.py') or not filename[:4].isdigit():
+            continue
+        revision = filename[:4]
+        spec = importlib.util.spec_from_file_location(f'migrations.m{filename[:-3]}', os.path.join(MIGRATIONS_DIR, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        found.append((revision, module))
+    return found
+
+
+def applied_revisions(engine):
+    ensure_version_tables(engine)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text('SELECT revision FROM schema_migrations'))}
+
+
+def upgrade(engine, target=None, chunk_size=DEFAULT_CHUNK_SIZE, pause=DEFAULT_PAUSE, verbose=True):
+    """Apply pending revisions up to and including ``target``. Returns the applied revisions."""
+    done = applied_revisions(engine)
+    applied = []
+    for revision, module in discover():
+        if target and revision > target:
+            break
+        if revision in done:
+            continue
+        if verbose:
+            print(f'Applying {revision}: {module.description}')
+        module.upgrade(Migrator(engine, revision, chunk_size=chunk_size, pause=pause, verbose=verbose))
+        with engine.begin() as conn:
+            conn.execute(text('INSERT INTO schema_migrations (revision, description, applied_at) '
+                              'VALUES (:revision, :description, :now)'),
+                         {'revision': revision, 'description': module.description, 'now': datetime.utcnow()})
+        applied.append(revision)
+    return applied
+
+
+def status(engine):
+    done = applied_revisions(engine)
+    for revision, module in discover():
+        print(f"{'applied' if revision in done else 'pending'}  {revision}  {module.description}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Apply database migrations')
+    parser.add_argument('command', nargs='?', default='upgrade', choices=['upgrade', 'status'])
+    parser.add_argument('--target', help='stop after this revision')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--pause', type=float, default=DEFAULT_PAUSE, help='seconds to sleep between backfill chunks')
+    args = parser.parse_args()
+
+    from app import app, db
+    with app.app_context():
+        if args.command == 'status':
+            status(db.engine)
+        else:
+            applied = upgrade(db.engine, target=args.target, chunk_size=args.chunk_size, pause=args.pause)
+            print(f'{len(applied)} revision(s) applied' if applied else 'Database is up to date')
+    sys.exit(0)
@@ -0,0 +1,6 @@
+"""Create any tables defined by the models that do not exist yet."""
+description = 'baseline schema'
+
+
+def upgrade(m):
+    m.create_all()
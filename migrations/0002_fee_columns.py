@@ -0,0 +1,19 @@
+"""Fee columns on customers and loans, previously added by hand with
+add_application_fee_column.py, add_welfare_column.py,
+add_welfare_fee_to_customer.py, add_loan_application_fee.py and
+add_welfare_fee_column.py. fix_existing_customers.py's NULL cleanup is now a
+chunked backfill.
+"""
+description = 'fee columns on customers and loans'
+
+
+def upgrade(m):
+    m.add_column('customers', 'application_fee', 'FLOAT DEFAULT 0.0')
+    m.add_column('customers', 'welfare_fee', 'FLOAT DEFAULT 0.0')
+    m.add_column('customers', 'admission_fee', 'FLOAT DEFAULT 0.0')
+    m.add_column('loans', 'application_fee', 'FLOAT DEFAULT 0.0')
+    m.add_column('loans', 'welfare_fee', 'FLOAT DEFAULT 0.0')
+    m.add_column('loans', 'service_charge', 'FLOAT DEFAULT 0.0')
+
+    for column in ['application_fee', 'welfare_fee', 'admission_fee']:
+        m.backfill('customers', f'{column} = 0.0', f'{column} IS NULL')
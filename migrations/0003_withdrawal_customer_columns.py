@@ -0,0 +1,14 @@
+"""Member withdrawals, previously update_withdrawal_table.py."""
+description = 'customer_id and withdrawal_type on withdrawals'
+
+
+def upgrade(m):
+    m.add_column('withdrawals', 'customer_id', 'INTEGER')
+    m.add_column('withdrawals', 'withdrawal_type', "VARCHAR(20) DEFAULT 'investment'")
+    m.backfill('withdrawals', "withdrawal_type = 'investment'", 'withdrawal_type IS NULL')
+
+    # investor_name is optional for member withdrawals; SQLite never enforced it
+    if m.dialect == 'mysql':
+        m.execute('ALTER TABLE withdrawals MODIFY COLUMN investor_name VARCHAR(100) NULL')
+    elif m.dialect == 'postgresql':
+        m.execute('ALTER TABLE withdrawals ALTER COLUMN investor_name DROP NOT NULL')
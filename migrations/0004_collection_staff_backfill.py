@@ -0,0 +1,16 @@
+"""Attribute collections without a staff member to the first admin,
+previously fix_staff_id.py.
+"""
+from sqlalchemy import func, select
+
+description = 'assign orphaned collections to the admin'
+
+
+def upgrade(m):
+    from models.user_model import User
+    admin_id = m.scalar(select(func.min(User.id)).where(User.role == 'admin'))
+    if admin_id is None:
+        m.log('no admin user, skipping')
+        return
+    for table in ['loan_collections', 'saving_collections']:
+        m.backfill(table, 'staff_id = :admin_id', 'staff_id IS NULL', {'admin_id': admin_id})
@@ -0,0 +1,11 @@
+"""Archive tables for old collections and the per-customer summary rows."""
+description = 'collection archive tables'
+
+
+def upgrade(m):
+    from models.user_model import db
+    from models.archive_model import CollectionSummary
+
+    m.create_all(CollectionSummary)
+    # the archive tables live on their own bind, possibly another database
+    db.metadatas['archive'].create_all(db.engines['archive'])
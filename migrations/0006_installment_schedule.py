@@ -0,0 +1,17 @@
+"""Installment schedules and precomputed due lists. Loans get a real
+customer_id; existing loans are matched to their member by name and staff,
+the same way fix_loan_calculation.py does.
+"""
+description = 'installment schedule and due lists'
+
+
+def upgrade(m):
+    from models.installment_model import Installment, DueListEntry
+
+    m.add_column('loans', 'customer_id', 'INTEGER REFERENCES customers(id)')
+    m.create_index('ix_loans_customer_id', 'loans', ['customer_id'])
+    m.backfill('loans',
+               'customer_id = (SELECT MIN(c.id) FROM customers c WHERE LOWER(c.name) = LOWER(loans.customer_name) '
+               'AND (c.staff_id = loans.staff_id OR loans.staff_id IS NULL))',
+               'customer_id IS NULL')
+    m.create_all(Installment, DueListEntry)
@@ -0,0 +1,7 @@
+"""Per-loan arrears snapshots written by portfolio.py."""
+description = 'arrears snapshots'
+
+
+def upgrade(m):
+    from models.arrears_model import ArrearsSnapshot
+    m.create_all(ArrearsSnapshot)
@@ -0,0 +1,8 @@
+"""Customers get an ``updated_date`` so rendered customer rows can be cached
+until the row changes (see templating.py)."""
+description = 'customer updated_date'
+
+
+def upgrade(m):
+    m.add_column('customers', 'updated_date', 'TIMESTAMP')
+    m.backfill('customers', 'updated_date = created_date', 'updated_date IS NULL')
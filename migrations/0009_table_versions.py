@@ -0,0 +1,7 @@
+"""Per-table write counters for conditional GET on report pages (see http_cache.py)."""
+description = 'table versions'
+
+
+def upgrade(m):
+    from models.table_version_model import TableVersion
+    m.create_all(TableVersion)
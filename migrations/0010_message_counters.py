@@ -0,0 +1,14 @@
+"""Per-staff unread message counters for the dashboard badge and message
+long-poll, seeded from the existing messages."""
+description = 'message counters'
+
+
+def upgrade(m):
+    from models.message_model import MessageCounter
+
+    m.create_index('ix_messages_staff_id_id', 'messages', ['staff_id', 'id'])
+    m.create_all(MessageCounter)
+    if not m.scalar('SELECT COUNT(*) FROM message_counters'):
+        m.execute('INSERT INTO message_counters (staff_id, unread, latest_message_id, updated_date) '
+                  'SELECT staff_id, SUM(CASE WHEN is_read THEN 0 ELSE 1 END), MAX(id), CURRENT_TIMESTAMP '
+                  'FROM messages WHERE staff_id IS NOT NULL GROUP BY staff_id')
@@ -0,0 +1,27 @@
+"""Branch offices: the ``branches`` table, with the existing book as branch
+1, and ``branch_id`` on users, members, loans, collections and the ledger.
+Staff are assigned to branch 1; admins stay head-office (NULL)."""
+description = 'branches and branch_id columns'
+
+BRANCH_TABLES = ['customers', 'loans', 'loan_collections', 'saving_collections', 'collections', 'savings',
+                 'withdrawals', 'expenses', 'investments', 'cash_balance']
+
+
+def upgrade(m):
+    from models.branch_model import Branch
+
+    m.create_all(Branch)
+    if not m.scalar('SELECT COUNT(*) FROM branches'):
+        m.execute("INSERT INTO branches (id, code, name, created_date) VALUES (1, 'HQ', 'Head office', CURRENT_TIMESTAMP)")
+        if m.dialect == 'postgresql':
+            m.execute("SELECT setval(pg_get_serial_sequence('branches', 'id'), 1)")
+
+    m.add_column('user', 'branch_id', 'INTEGER')
+    m.create_index('ix_user_branch_id', 'user', ['branch_id'])
+    m.backfill('user', 'branch_id = 1', "branch_id IS NULL AND role = 'staff'")
+    for table in BRANCH_TABLES:
+        if not m.has_table(table):
+            continue
+        m.add_column(table, 'branch_id', 'INTEGER')
+        m.create_index(f'ix_{table}_branch_id', table, ['branch_id'])
+        m.backfill(table, 'branch_id = 1', 'branch_id IS NULL')
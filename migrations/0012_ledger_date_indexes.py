@@ -0,0 +1,8 @@
+"""Indexes on the date of withdrawals, expenses and investments, so the
+date-filtered cash pages and withdrawal report read only their range."""
+description = 'withdrawal/expense/investment date indexes'
+
+
+def upgrade(m):
+    for table in ('withdrawals', 'expenses', 'investments'):
+        m.create_index(f'ix_{table}_date', table, ['date'])
@@ -0,0 +1,14 @@
+"""Double-entry ledger: journal entries and lines, and per-account balance
+checkpoints (models/ledger_model.py). Existing rows are posted afterwards,
+outside the migration::
+
+    python ledger.py sync --full
+    python ledger.py check --post
+    python ledger.py checkpoint
+"""
+description = 'journal entries, journal lines and account checkpoints'
+
+
+def upgrade(m):
+    from models.ledger_model import JournalEntry, JournalLine, AccountCheckpoint
+    m.create_all(JournalEntry, JournalLine, AccountCheckpoint)
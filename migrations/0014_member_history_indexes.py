@@ -0,0 +1,9 @@
+"""Indexes on (customer_id, date) of loan and saving collections and
+withdrawals, so a member's statement reads only that member's rows."""
+description = 'member history indexes'
+
+
+def upgrade(m):
+    m.create_index('ix_loan_collections_customer_date', 'loan_collections', ['customer_id', 'collection_date'])
+    m.create_index('ix_saving_collections_customer_date', 'saving_collections', ['customer_id', 'collection_date'])
+    m.create_index('ix_withdrawals_customer_date', 'withdrawals', ['customer_id', 'date'])
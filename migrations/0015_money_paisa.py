@@ -0,0 +1,156 @@
+"""Money as whole paisa. Every money column (``Money`` in models/money.py)
+changes from a float of taka to a BIGINT of paisa: a ``<column>_paisa``
+column is added and filled in id-range chunks, given the float column's
+NOT NULL and default (scaled to paisa), and then takes the float column's
+place. SQLite cannot change a column's constraints, so there the table is
+rebuilt once with the BIGINT columns where the float ones were. A rerun
+picks up where an interrupted one stopped, and columns that are already
+integers (a database created after this revision) are left alone. The
+archive bind and branches with their own storage (branches.py) are
+converted the same way.
+
+Run it before deploying the code from this revision: ``Money`` reads every
+column as paisa, so a float column that is not converted yet shows amounts
+100 times too small.
+"""
+import re
+
+description = 'money columns as integer paisa'
+
+
+def money_columns(tables):
+    from models.money import Money
+
+    return [(table, [column for column in table.columns if isinstance(column.type, Money)]) for table in tables
+            if any(isinstance(column.type, Money) for column in table.columns)]
+
+
+def paisa_default(default):
+    """A float column's server default (``0.0``, ``'0'::double precision``)
+    as a paisa literal, or None."""
+    from models.money import to_paisa
+
+    match = re.fullmatch(r"\(*'?(-?\d+(?:\.\d*)?)'?\)*(?:::[\w ]+)?", (default or '').strip())
+    return str(to_paisa(match.group(1))) if match else None
+
+
+def definition(name, nullable, default):
+    return f"{name} BIGINT{'' if nullable else ' NOT NULL'}{f' DEFAULT {default}' if default is not None else ''}"
+
+
+def split_columns(create_sql):
+    """The column and constraint definitions of a ``CREATE TABLE`` statement."""
+    body = create_sql[create_sql.index('(') + 1:create_sql.rindex(')')]
+    parts, depth, start, quote = [], 0, 0, None
+    for i, char in enumerate(body):
+        if quote:
+            quote = None if char == quote else quote
+        elif char in '\'"`[':
+            quote = ']' if char == '[' else char
+        elif char in '()':
+            depth += 1 if char == '(' else -1
+        elif char == ',' and depth == 0:
+            parts.append(body[start:i].strip())
+            start = i + 1
+    return parts + [body[start:].strip()]
+
+
+def rebuild_sqlite(m, name, converted):
+    """Rebuild ``name`` with each float column of ``converted`` ({column: (nullable,
+    default)}) replaced by its filled ``_paisa`` column, in one transaction."""
+    from sqlalchemy import text
+
+    quoted, rebuilt = m.quote(name), m.quote(f'{name}_paisa_rebuild')
+    with m.engine.connect() as conn:
+        create_sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                  {'name': name}).scalar()
+        extras = conn.execute(text("SELECT sql FROM sqlite_master WHERE tbl_name = :name "
+                                   "AND type IN ('index', 'trigger') AND sql IS NOT NULL"), {'name': name}).scalars().all()
+        names = [row[1] for row in conn.execute(text(f'PRAGMA table_info({quoted})'))]
+    columns = []
+    for part in split_columns(create_sql):
+        column = part.split()[0].strip('"`[]')
+        if column in converted:
+            columns.append(definition(column, *converted[column]))
+        elif column.endswith('_paisa') and column[:-len('_paisa')] in converted:
+            continue
+        else:
+            columns.append(part)
+    kept = [c for c in names if not (c.endswith('_paisa') and c[:-len('_paisa')] in converted)]
+    source = [f'{c}_paisa' if c in converted else c for c in kept]
+    m.execute(f'DROP TABLE IF EXISTS {rebuilt}')
+    with m.engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE {rebuilt} ({', '.join(columns)})"))
+        conn.execute(text(f"INSERT INTO {rebuilt} ({', '.join(kept)}) SELECT {', '.join(source)} FROM {quoted}"))
+        conn.execute(text(f'DROP TABLE {quoted}'))
+        conn.execute(text(f'ALTER TABLE {rebuilt} RENAME TO {quoted}'))
+        for sql in extras:
+            conn.execute(text(sql))
+
+
+def to_paisa(m, table, money, label=''):
+    from sqlalchemy import Integer, inspect
+
+    name = table.name
+    if not m.has_table(name):
+        return
+    existing = {c['name']: c for c in inspect(m.engine).get_columns(name)}
+    key = 'id' if 'id' in table.c else table.primary_key.columns.values()[0].name
+    quoted = m.quote(name)
+    converted = {}
+    for column in money:
+        new = f'{column.name}_paisa'
+        if column.name not in existing:
+            if new in existing:  # interrupted between the drop and the rename
+                m.execute(f'ALTER TABLE {quoted} RENAME COLUMN {new} TO {column.name}')
+                m.log(f'{label}{name}.{column.name} now in paisa')
+            continue
+        if isinstance(existing[column.name]['type'], Integer):
+            continue
+        m.add_column(name, new, 'BIGINT')
+        convert, pending = f'{new} = ROUND({column.name} * 100)', f'{new} IS NULL AND {column.name} IS NOT NULL'
+        m.backfill(name, convert, pending, step=f'{label}{name}.{column.name}', key=key)
+        m.execute(f'UPDATE {quoted} SET {convert} WHERE {pending}')  # rows added while the backfill ran
+        converted[column.name] = (existing[column.name]['nullable'], paisa_default(existing[column.name]['default']))
+
+    if not converted:
+        return
+    if m.dialect == 'sqlite':
+        rebuild_sqlite(m, name, converted)
+    else:
+        for column, (nullable, default) in converted.items():
+            new = f'{column}_paisa'
+            if m.dialect == 'postgresql':
+                if not nullable:
+                    m.execute(f'ALTER TABLE {quoted} ALTER COLUMN {new} SET NOT NULL')
+                if default is not None:
+                    m.execute(f'ALTER TABLE {quoted} ALTER COLUMN {new} SET DEFAULT {default}')
+            else:
+                m.execute(f'ALTER TABLE {quoted} MODIFY {definition(new, nullable, default)}')
+            m.execute(f'ALTER TABLE {quoted} DROP COLUMN {column}')
+            m.execute(f'ALTER TABLE {quoted} RENAME COLUMN {new} TO {column}')
+    for column in converted:
+        m.log(f'{label}{name}.{column} now in paisa')
+
+
+def upgrade(m):
+    from migrate import Migrator, ensure_version_tables
+    from models.user_model import db
+    import branches
+
+    def on(engine):
+        ensure_version_tables(engine)
+        return Migrator(engine, m.revision, chunk_size=m.chunk_size, pause=m.pause, verbose=m.verbose)
+
+    for table, money in money_columns(db.metadatas[None].sorted_tables):
+        to_paisa(m, table, money)
+    archive = on(db.engines['archive'])
+    for table, money in money_columns(db.metadatas['archive'].sorted_tables):
+        to_paisa(archive, table, money, label='archive:')
+    for branch in branches.all_branches(refresh=True).values():
+        engine = branches.engine_for(branch)
+        if engine is None:
+            continue
+        storage = on(engine)
+        for table, money in money_columns(branches.branch_tables()):
+            to_paisa(storage, table, money, label=f'{branch.code}:')
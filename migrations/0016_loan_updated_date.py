@@ -0,0 +1,24 @@
+"""Loans get an ``updated_date``, set on every change, so the analytics
+export (analytics_export.py) writes edited loans and status changes again.
+Branches with their own storage (branches.py) get the column too."""
+description = 'loan updated_date'
+
+
+def add_updated_date(m):
+    m.add_column('loans', 'updated_date', 'TIMESTAMP')
+    m.backfill('loans', 'updated_date = COALESCE(loan_date, CURRENT_TIMESTAMP)', 'updated_date IS NULL')
+
+
+def upgrade(m):
+    from migrate import Migrator, ensure_version_tables
+    import branches
+
+    add_updated_date(m)
+    for branch in branches.all_branches(refresh=True).values():
+        engine = branches.engine_for(branch)
+        if engine is None:
+            continue
+        ensure_version_tables(engine)
+        storage = Migrator(engine, m.revision, chunk_size=m.chunk_size, pause=m.pause, verbose=m.verbose)
+        if storage.has_table('loans'):
+            add_updated_date(storage)
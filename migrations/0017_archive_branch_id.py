@@ -0,0 +1,46 @@
+"""Archived collections keep their ``branch_id`` (archive.py copies it), so
+the ledger and branch reports can place them. Rows archived before this
+revision take their member's branch; the archive may be another database,
+so the members' branches are read from the main database and written to
+the archive a chunk of members at a time. Rows whose member is gone go to
+branch 1, as in revision 0011."""
+description = 'archive branch_id'
+
+TABLES = ['loan_collections_archive', 'saving_collections_archive']
+
+
+def upgrade(m):
+    from collections import defaultdict
+
+    from sqlalchemy import bindparam, text
+
+    from migrate import Migrator, ensure_version_tables
+    from models.user_model import db
+
+    ensure_version_tables(db.engines['archive'])
+    archive = Migrator(db.engines['archive'], m.revision, chunk_size=m.chunk_size, pause=m.pause, verbose=m.verbose)
+    tables = [table for table in TABLES if archive.has_table(table)]
+    for table in tables:
+        archive.add_column(table, 'branch_id', 'INTEGER')
+        archive.create_index(f'ix_{table}_branch_id', table, ['branch_id'])
+
+    last_id = 0
+    while tables:
+        with m.engine.connect() as conn:
+            rows = conn.execute(text('SELECT id, branch_id FROM customers WHERE id > :last ORDER BY id LIMIT :limit'),
+                                {'last': last_id, 'limit': m.chunk_size}).all()
+        if not rows:
+            break
+        by_branch = defaultdict(list)
+        for customer_id, branch_id in rows:
+            by_branch[branch_id or 1].append(customer_id)
+        with archive.engine.begin() as conn:
+            for table in tables:
+                sql = text(f'UPDATE {archive.quote(table)} SET branch_id = :branch '
+                           f'WHERE branch_id IS NULL AND customer_id IN :ids').bindparams(bindparam('ids', expanding=True))
+                for branch_id, ids in by_branch.items():
+                    conn.execute(sql, {'branch': branch_id, 'ids': ids})
+        last_id = rows[-1][0]
+        archive.log(f'archive branch_id: members up to {last_id}')
+    for table in tables:
+        archive.execute(f'UPDATE {archive.quote(table)} SET branch_id = 1 WHERE branch_id IS NULL')
@@ -0,0 +1,45 @@
+from models.user_model import db
+from models.money import Money
+from datetime import datetime
+
+# Archived collections live on the 'archive' bind, which may be a separate
+# database file, so they carry no foreign keys or relationships. `staff` is
+# filled in by archive.archived_collections().
+
+
+class LoanCollectionArchive(db.Model):
+    __tablename__ = 'loan_collections_archive'
+    __bind_key__ = 'archive'
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, nullable=False, index=True)
+    amount = db.Column(Money, nullable=False)
+    collection_date = db.Column(db.DateTime)
+    staff_id = db.Column(db.Integer)
+    branch_id = db.Column(db.Integer, index=True)
+    archived_date = db.Column(db.DateTime, default=datetime.utcnow)
+    staff = None
+
+
+class SavingCollectionArchive(db.Model):
+    __tablename__ = 'saving_collections_archive'
+    __bind_key__ = 'archive'
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, nullable=False, index=True)
+    amount = db.Column(Money, nullable=False)
+    collection_date = db.Column(db.DateTime)
+    staff_id = db.Column(db.Integer)
+    branch_id = db.Column(db.Integer, index=True)
+    archived_date = db.Column(db.DateTime, default=datetime.utcnow)
+    staff = None
+
+
+class CollectionSummary(db.Model):
+    """Per-customer totals of everything moved to the archive."""
+    __tablename__ = 'collection_summaries'
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), primary_key=True)
+    archived_loan_total = db.Column(Money, default=0.0)
+    archived_loan_count = db.Column(db.Integer, default=0)
+    archived_saving_total = db.Column(Money, default=0.0)
+    archived_saving_count = db.Column(db.Integer, default=0)
+    archived_through = db.Column(db.DateTime)
+    updated_date = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,23 @@
+from models.user_model import db
+from models.money import Money
+from datetime import datetime
+
+
+class ArrearsSnapshot(db.Model):
+    """Arrears position of one loan on ``snapshot_date`` (see portfolio.py)."""
+    __tablename__ = 'arrears_snapshots'
+    id = db.Column(db.Integer, primary_key=True)
+    snapshot_date = db.Column(db.Date, nullable=False, index=True)
+    loan_id = db.Column(db.Integer, db.ForeignKey('loans.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'))
+    staff_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'))
+    total = db.Column(Money, default=0.0)
+    expected = db.Column(Money, default=0.0)
+    paid = db.Column(Money, default=0.0)
+    outstanding = db.Column(Money, default=0.0)
+    arrears = db.Column(Money, default=0.0)
+    days_past_due = db.Column(db.Integer, default=0)
+    bucket = db.Column(db.String(10))  # current, 1-30, 31-60, 61-90, 90+
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    loan = db.relationship('Loan')
+    customer = db.relationship('Customer')
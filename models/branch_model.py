@@ -0,0 +1,13 @@
+from models.user_model import db
+from datetime import datetime
+
+class Branch(db.Model):
+    """A branch office. Its members, loans, collections and ledger rows carry
+    its ``branch_id``; where they are stored is decided by branches.py."""
+    __tablename__ = 'branches'
+    id = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(20), unique=True, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    database_url = db.Column(db.String(300))  # separate SQLite file; None: the main database
+    schema_name = db.Column(db.String(63))  # PostgreSQL schema in the main database
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
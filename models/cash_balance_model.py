@@ -1,8 +1,10 @@
 from models.user_model import db
+from models.money import Money
 from datetime import datetime
 
 class CashBalance(db.Model):
     __tablename__ = 'cash_balance'
     id = db.Column(db.Integer, primary_key=True)
-    balance = db.Column(db.Float, default=0.0)
+    branch_id = db.Column(db.Integer, index=True)
+    balance = db.Column(Money, default=0.0)
     updated_date = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
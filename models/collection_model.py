@@ -1,11 +1,13 @@
 from models.user_model import db
+from models.money import Money
 from datetime import datetime
 
 class Collection(db.Model):
     __tablename__ = 'collections'
     id = db.Column(db.Integer, primary_key=True)
+    branch_id = db.Column(db.Integer, index=True)
     loan_id = db.Column(db.Integer, db.ForeignKey('loans.id'))
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(Money, nullable=False)
     collection_date = db.Column(db.DateTime, default=datetime.utcnow)
     staff_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     loan = db.relationship('Loan', backref='collections')
@@ -1,9 +1,11 @@
 from models.user_model import db
+from models.money import Money
 from datetime import datetime
 
 class Customer(db.Model):
     __tablename__ = 'customers'
     id = db.Column(db.Integer, primary_key=True)
+    branch_id = db.Column(db.Integer, index=True)
     name = db.Column(db.String(100), nullable=False)
     member_no = db.Column(db.String(50))
     phone = db.Column(db.String(20))
@@ -15,13 +17,14 @@ class Customer(db.Model):
     granter = db.Column(db.String(100))
     profession = db.Column(db.String(100))
     nid_no = db.Column(db.String(50))
-    application_fee = db.Column(db.Float, default=0.0)
-    welfare_fee = db.Column(db.Float, default=0.0)
-    admission_fee = db.Column(db.Float, default=0.0)
+    application_fee = db.Column(Money, default=0.0)
+    welfare_fee = db.Column(Money, default=0.0)
+    admission_fee = db.Column(Money, default=0.0)
     address = db.Column(db.String(200))
     staff_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    total_loan = db.Column(db.Float, default=0.0)
-    remaining_loan = db.Column(db.Float, default=0.0)
-    savings_balance = db.Column(db.Float, default=0.0)
+    total_loan = db.Column(Money, default=0.0)
+    remaining_loan = db.Column(Money, default=0.0)
+    savings_balance = db.Column(Money, default=0.0)
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_date = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     staff = db.relationship('User', backref='customers')
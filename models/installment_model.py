@@ -0,0 +1,40 @@
+from models.user_model import db
+from models.money import Money
+from datetime import datetime
+
+
+class Installment(db.Model):
+    __tablename__ = 'installments'
+    id = db.Column(db.Integer, primary_key=True)
+    loan_id = db.Column(db.Integer, db.ForeignKey('loans.id'), nullable=False, index=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    staff_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True)
+    seq = db.Column(db.Integer, nullable=False)
+    due_date = db.Column(db.Date, nullable=False)
+    amount = db.Column(Money, nullable=False)
+    paid_amount = db.Column(Money, default=0.0)
+    status = db.Column(db.String(10), default='due')  # due, partial or paid
+    paid_date = db.Column(db.DateTime)
+    loan = db.relationship('Loan', backref='installments')
+    __table_args__ = (
+        db.Index('ix_installments_staff_due', 'staff_id', 'due_date'),
+        db.Index('ix_installments_customer_status', 'customer_id', 'status'),
+    )
+
+
+class DueListEntry(db.Model):
+    """One member on a staff member's precomputed route for a day."""
+    __tablename__ = 'due_lists'
+    id = db.Column(db.Integer, primary_key=True)
+    staff_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'))
+    due_date = db.Column(db.Date, nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    installments_due = db.Column(db.Integer, default=0)
+    amount_due = db.Column(Money, default=0.0)
+    paid_amount = db.Column(Money, default=0.0)
+    oldest_due_date = db.Column(db.Date)
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    customer = db.relationship('Customer')
+    __table_args__ = (
+        db.Index('ix_due_lists_staff_date', 'staff_id', 'due_date'),
+    )
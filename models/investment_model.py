@@ -1,10 +1,12 @@
 from models.user_model import db
+from models.money import Money
 from datetime import datetime
 
 class Investment(db.Model):
     __tablename__ = 'investments'
     id = db.Column(db.Integer, primary_key=True)
+    branch_id = db.Column(db.Integer, index=True)
     investor_name = db.Column(db.String(100), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    date = db.Column(db.DateTime, default=datetime.utcnow)
+    amount = db.Column(Money, nullable=False)
+    date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     note = db.Column(db.String(200))
@@ -0,0 +1,53 @@
+from models.user_model import db
+from models.money import Money
+from datetime import datetime
+
+# Double-entry journal, see ledger.py. Line amounts are signed: debits are
+# positive and credits negative, so every entry's lines sum to zero.
+
+
+class JournalEntry(db.Model):
+    """One money event (a collection, a loan, an expense, ...), posted as two
+    or more lines. ``source_table`` / ``source_id`` is the row it records."""
+    __tablename__ = 'journal_entries'
+    id = db.Column(db.Integer, primary_key=True)
+    branch_id = db.Column(db.Integer, index=True)
+    kind = db.Column(db.String(30), nullable=False)
+    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    source_table = db.Column(db.String(40))
+    source_id = db.Column(db.Integer)
+    memo = db.Column(db.String(200))
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    lines = db.relationship('JournalLine', backref='entry')
+    __table_args__ = (
+        db.UniqueConstraint('source_table', 'source_id', name='uq_journal_entries_source'),
+    )
+
+
+class JournalLine(db.Model):
+    __tablename__ = 'journal_lines'
+    id = db.Column(db.Integer, primary_key=True)
+    branch_id = db.Column(db.Integer)
+    entry_id = db.Column(db.Integer, db.ForeignKey('journal_entries.id'), nullable=False, index=True)
+    account = db.Column(db.String(30), nullable=False)
+    customer_id = db.Column(db.Integer)  # member sub-account of customer_loan / customer_savings
+    amount = db.Column(Money, nullable=False)
+    date = db.Column(db.DateTime, nullable=False)  # the entry's date, for indexed range sums
+    __table_args__ = (
+        db.Index('ix_journal_lines_account', 'account', 'customer_id', 'date'),
+    )
+
+
+class AccountCheckpoint(db.Model):
+    """Balance of one account (per branch and member) at ``as_of``, so a
+    balance on any date is the last checkpoint plus the lines after it."""
+    __tablename__ = 'account_checkpoints'
+    id = db.Column(db.Integer, primary_key=True)
+    branch_id = db.Column(db.Integer)
+    account = db.Column(db.String(30), nullable=False)
+    customer_id = db.Column(db.Integer)
+    as_of = db.Column(db.DateTime, nullable=False, index=True)
+    balance = db.Column(Money, nullable=False)
+    __table_args__ = (
+        db.Index('ix_account_checkpoints_account', 'account', 'customer_id', 'as_of'),
+    )
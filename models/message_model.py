@@ -3,9 +3,20 @@ from datetime import datetime
 
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (db.Index('ix_messages_staff_id_id', 'staff_id', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
     staff_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     is_read = db.Column(db.Boolean, default=False)
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
     staff = db.relationship('User', backref='messages')
+
+
+class MessageCounter(db.Model):
+    """Unread count and newest message id per staff member, kept in step by
+    messaging.py so the dashboard and the long-poll read one row."""
+    __tablename__ = 'message_counters'
+    staff_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
+    latest_message_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_date = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
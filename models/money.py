@@ -0,0 +1,46 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import BigInteger, type_coerce
+from sqlalchemy.types import TypeDecorator
+
+
+def to_paisa(amount):
+    """``amount`` in taka as a whole number of paisa, rounded half away from zero."""
+    return int(Decimal(str(amount)).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+class Money(TypeDecorator):
+    """An amount of money, stored exactly as an integer number of paisa.
+
+    Python sees taka as before (``lc.amount == 150.5``), and values bound
+    against the column (``Customer.remaining_loan - 20.25``) are converted
+    to paisa, so ``SUM`` and other aggregates add integers in the database
+    and are exact. Arithmetic between two money columns in SQL comes back
+    as a plain integer of paisa; wrap it in ``type_coerce(expr, Money)`` to
+    read it as taka.
+    """
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_paisa(value)
+
+    def process_result_value(self, value, dialect):
+        # SUM of a BIGINT is NUMERIC on PostgreSQL and comes back as a Decimal
+        return None if value is None else float(value) / 100
+
+
+class Paisa(TypeDecorator):
+    """A whole number of paisa, read as an int (see ``paisa()``)."""
+    impl = BigInteger
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else int(value)
+
+
+def paisa(expression):
+    """``expression`` (a money column or an aggregate of one) read as an
+    int of paisa, e.g. ``select(paisa(func.sum(LoanCollection.amount)))``
+    for rollups and checksums that need the exact total."""
+    return type_coerce(expression, Paisa)
@@ -1,12 +1,17 @@
 from models.user_model import db
+from models.money import Money
 from datetime import datetime
 
 class SavingCollection(db.Model):
     __tablename__ = 'saving_collections'
     id = db.Column(db.Integer, primary_key=True)
+    branch_id = db.Column(db.Integer, index=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(Money, nullable=False)
     collection_date = db.Column(db.DateTime, default=datetime.utcnow)
     staff_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True)
     customer = db.relationship('Customer', backref='saving_collections')
     staff = db.relationship('User', backref='saving_collections', foreign_keys=[staff_id])
+    __table_args__ = (
+        db.Index('ix_saving_collections_customer_date', 'customer_id', 'collection_date'),
+    )
@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from models.money import Money
 
 db = SQLAlchemy()
 
@@ -11,7 +12,7 @@ class Staff(db.Model):
     phone = db.Column(db.String(20), nullable=True)
     position = db.Column(db.String(100), nullable=True)
     join_date = db.Column(db.DateTime, default=datetime.utcnow)
-    salary = db.Column(db.Float, default=0.0)
+    salary = db.Column(Money, default=0.0)
 
     def __repr__(self):
         return f"<Staff {self.name}>"
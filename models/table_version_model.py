@@ -0,0 +1,10 @@
+from models.user_model import db
+from datetime import datetime
+
+class TableVersion(db.Model):
+    """Write counter per table, bumped by http_cache.py on every commit that
+    touches the table. Report pages derive their ETag / Last-Modified from it."""
+    __tablename__ = 'table_versions'
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
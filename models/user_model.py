@@ -1,7 +1,27 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_login import UserMixin
 
-db = SQLAlchemy()
+
+class RoutingSession(Session):
+    """Sends everything on the default bind to the logged-in user's branch
+    storage while ``g.branch_engine`` is set (see branches.py), and
+    otherwise SELECTs to the ``replica`` bind while ``g.use_replica`` is set
+    (see replica.py). Flushes and writes never go to the replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is None and has_app_context() and g.get('branch_engine') is not None \
+                and engine is self._db.engines.get(None):
+            return g.branch_engine
+        if (bind is None and clause is not None and getattr(clause, 'is_select', False) and not self._flushing
+                and has_app_context() and g.get('use_replica') and engine is self._db.engines.get(None)):
+            return self._db.engines.get('replica', engine)
+        return engine
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -9,3 +29,4 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(100), unique=True)
     password = db.Column(db.String(200))
     role = db.Column(db.String(20))  # "admin" or "staff"
+    branch_id = db.Column(db.Integer, index=True)  # None: head office, sees every branch
@@ -1,13 +1,18 @@
 from models.user_model import db
+from models.money import Money
 from datetime import datetime
 
 class Withdrawal(db.Model):
     __tablename__ = 'withdrawals'
     id = db.Column(db.Integer, primary_key=True)
+    branch_id = db.Column(db.Integer, index=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'))
     investor_name = db.Column(db.String(100))
-    amount = db.Column(db.Float, nullable=False)
-    date = db.Column(db.DateTime, default=datetime.utcnow)
+    amount = db.Column(Money, nullable=False)
+    date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     note = db.Column(db.String(200))
     withdrawal_type = db.Column(db.String(20), default='savings')
     customer = db.relationship('Customer', backref='withdrawals')
+    __table_args__ = (
+        db.Index('ix_withdrawals_customer_date', 'customer_id', 'date'),
+    )
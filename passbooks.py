@@ -0,0 +1,162 @@
+"""Month-end passbooks for every member.
+
+Each passbook is the member's statement for the month, rendered from
+customer_details_print.html like the print page: one timeline of loans, loan
+and saving collections and withdrawals with the loan outstanding and savings
+balance after every row (queries.member_timeline), all on one page, and the
+month's totals. Members are listed in the main process; the statements are
+queried and rendered in a process pool, which writes one HTML file per member:
+
+    python passbooks.py --month 2025-06                 # -> passbooks/2025-06/
+    python passbooks.py --month 2025-06 --workers 8 --zip
+    python passbooks.py --month 2025-06 --staff-id 3 --active-only
+
+Each file is written under a temporary name and renamed when complete, so a
+rerun skips members that are already done and resumes an interrupted batch.
+"""
+import argparse
+import calendar
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import select, union
+
+from models.user_model import db
+from models.customer_model import Customer
+from models.loan_collection_model import LoanCollection
+from models.saving_collection_model import SavingCollection
+from models.withdrawal_model import Withdrawal
+
+TEMPLATE = 'customer_details_print.html'
+CUSTOMER_FIELDS = ['id', 'name', 'member_no', 'phone', 'father_husband', 'village', 'thana', 'district',
+                   'total_loan', 'remaining_loan', 'savings_balance']
+CHUNK_SIZE = 200
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+ASSETS = ['vendor/bootstrap/css/bootstrap.min.css']
+
+
+def month_range(month):
+    year, mon = (int(p) for p in month.split('-'))
+    last_day = calendar.monthrange(year, mon)[1]
+    return datetime(year, mon, 1), datetime(year, mon, last_day, 23, 59, 59)
+
+
+def filename(customer):
+    return f"{customer['member_no'] or 'none'}-{customer['id']}.html".replace('/', '_')
+
+
+def _active(start, end, customer_ids):
+    """Ids of the members with a collection or withdrawal in ``start``-``end``."""
+    stmt = union(*[select(model.customer_id).where(column >= start, column <= end)
+                   for model, column in ((LoanCollection, LoanCollection.collection_date),
+                                         (SavingCollection, SavingCollection.collection_date),
+                                         (Withdrawal, Withdrawal.date))])
+    active = set(db.session.execute(stmt).scalars())
+    return active if customer_ids is None else active & set(customer_ids)
+
+
+def gather(start, end, staff_id=None, active_only=False):
+    """The members to write passbooks for, as dicts of CUSTOMER_FIELDS."""
+    stmt = select(*[getattr(Customer, f) for f in CUSTOMER_FIELDS]).order_by(Customer.id)
+    if staff_id:
+        stmt = stmt.where(Customer.staff_id == staff_id)
+    customers = [dict(zip(CUSTOMER_FIELDS, r)) for r in db.session.execute(stmt)]
+    if active_only:
+        active = _active(start, end, [c['id'] for c in customers] if staff_id else None)
+        customers = [c for c in customers if c['id'] in active]
+    for customer in customers:
+        for field in ('total_loan', 'remaining_loan', 'savings_balance'):
+            customer[field] = customer[field] or 0
+    return customers
+
+
+def statement(customer, start, end):
+    """The customer_details_print.html context of ``customer`` for ``start``-``end``,
+    as the print page builds it, with the whole period on one page and its totals."""
+    import queries
+    customer = SimpleNamespace(**customer)
+    timeline, totals, opening = queries.member_timeline(customer, start, end)
+    rows = queries.page(timeline, per_page=max(sum(count for count, amount in totals.values()), 1))
+    period = {kind: sum(row.amount or 0 for row in rows.items if row.kind == kind)
+              for kind in ('loan_collection', 'saving_collection', 'withdrawal')}
+    return {'customer': customer, 'rows': rows, 'totals': totals, 'opening': opening,
+            'total_loan_collected': period['loan_collection'], 'total_saving_collected': period['saving_collection'],
+            'total_withdrawn': period['withdrawal'], 'now': datetime.now()}
+
+
+_request_context = None
+
+
+def _init_worker():
+    global _request_context
+    from app import app
+    _request_context = app.test_request_context('/')
+    _request_context.push()
+    # passbooks are opened from disk, so assets are copied next to them
+    app.jinja_env.globals['asset_url'] = lambda path: os.path.basename(path)
+
+
+def render_chunk(customers, start, end, output_dir):
+    """Query, render and write one chunk of passbooks. Runs in a worker process."""
+    from flask import render_template
+    for customer in customers:
+        path = os.path.join(output_dir, filename(customer))
+        html = render_template(TEMPLATE, **statement(customer, start, end))
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(path + '.tmp', path)
+    db.session.remove()
+    return len(customers)
+
+
+def generate(month, output_dir, workers=None, staff_id=None, active_only=False, make_zip=False, verbose=True):
+    start, end = month_range(month)
+    os.makedirs(output_dir, exist_ok=True)
+    for asset in ASSETS:
+        shutil.copy(os.path.join(STATIC_DIR, asset), output_dir)
+    started = time.time()
+    customers = gather(start, end, staff_id=staff_id, active_only=active_only)
+    done = set(os.listdir(output_dir))
+    pending = [c for c in customers if filename(c) not in done]
+    if verbose:
+        print(f'{len(customers)} members, {len(customers) - len(pending)} already done, '
+              f'listed in {time.time() - started:.1f}s')
+
+    completed = 0
+    if pending:
+        chunks = [pending[i:i + CHUNK_SIZE] for i in range(0, len(pending), CHUNK_SIZE)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(render_chunk, chunk, start, end, output_dir) for chunk in chunks]
+            for future in as_completed(futures):
+                completed += future.result()
+                if verbose:
+                    print(f'{completed}/{len(pending)} rendered ({time.time() - started:.1f}s)')
+
+    archive = None
+    if make_zip:
+        archive = shutil.make_archive(output_dir.rstrip(os.sep), 'zip', output_dir)
+        if verbose:
+            print(f'Archive: {archive}')
+    return completed, archive
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate month-end passbooks')
+    parser.add_argument('--month', default=datetime.now().strftime('%Y-%m'), help='YYYY-MM')
+    parser.add_argument('--output', help='defaults to passbooks/<month>')
+    parser.add_argument('--workers', type=int, default=None, help='defaults to the number of CPUs')
+    parser.add_argument('--staff-id', type=int)
+    parser.add_argument('--active-only', action='store_true', help='skip members with no activity in the month')
+    parser.add_argument('--zip', action='store_true', help='also bundle the output into a .zip')
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        generate(args.month, args.output or os.path.join('passbooks', args.month), workers=args.workers,
+                 staff_id=args.staff_id, active_only=args.active_only, make_zip=args.zip)
+    sys.exit(0)
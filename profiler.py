@@ -0,0 +1,96 @@
+"""Opt-in request profiling.
+
+A request is profiled with cProfile when any of these hold:
+
+* a random draw falls under PROFILE_SAMPLE_RATE (0.0 - 1.0),
+* PROFILE_SLOW_MS is set - every request is then profiled, but only the
+  ones slower than the threshold are written out,
+* an admin adds ``?_profile=1`` to the URL.
+
+Profiles are written to PROFILE_DIR as ``.prof`` files named after the
+endpoint. They load in snakeviz, ``python -m pstats`` or flameprof (for
+flamegraphs), or can be summarised with ``python profiler.py FILE``.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import random
+import sys
+import time
+from datetime import datetime
+
+from flask import g, request
+from flask_login import current_user
+
+QUERY_FLAG = '_profile'
+
+
+def _wants_profile(app):
+    if request.args.get(QUERY_FLAG) and current_user.is_authenticated and current_user.role == 'admin':
+        return 'flag'
+    rate = app.config.get('PROFILE_SAMPLE_RATE', 0)
+    if rate and random.random() < rate:
+        return 'sample'
+    if app.config.get('PROFILE_SLOW_MS', 0):
+        return 'slow'
+    return None
+
+
+def _write_profile(app, profiler, reason, elapsed_ms):
+    directory = app.config.get('PROFILE_DIR', 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    endpoint = (request.endpoint or 'unknown').replace('.', '-')
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    path = os.path.join(directory, f'{stamp}-{endpoint}-{int(elapsed_ms)}ms-{reason}.prof')
+    profiler.dump_stats(path)
+    logging.info(f'Profiled {request.method} {request.full_path} ({elapsed_ms:.0f}ms) -> {path}')
+    return path
+
+
+def init_profiler(app):
+    """Register the profiling hooks on ``app``."""
+
+    @app.before_request
+    def start_profiler():
+        reason = _wants_profile(app)
+        if not reason:
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is already active on this thread
+            return
+        g._profiler = (profiler, reason, time.perf_counter())
+
+    @app.after_request
+    def stop_profiler(response):
+        state = g.pop('_profiler', None)
+        if state is None:
+            return response
+        profiler, reason, started = state
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if reason == 'slow' and elapsed_ms < app.config.get('PROFILE_SLOW_MS', 0):
+            return response
+        try:
+            path = _write_profile(app, profiler, reason, elapsed_ms)
+            if reason == 'flag':
+                response.headers['X-Profile'] = os.path.basename(path)
+        except OSError as e:
+            logging.error(f'Could not write profile: {e}')
+        return response
+
+    @app.teardown_request
+    def discard_profiler(exc):
+        state = g.pop('_profiler', None)
+        if state is not None:
+            state[0].disable()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit('usage: python profiler.py FILE.prof [LIMIT]')
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    pstats.Stats(sys.argv[1]).sort_stats('cumulative').print_stats(limit)
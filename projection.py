@@ -0,0 +1,73 @@
+"""Projected rows for report queries.
+
+The report pages only read a few columns of many rows (an amount and a
+date, a member's name). Loading them as ORM objects builds an instance
+with its own ``__dict__``, identity-map entry and change tracking per row,
+and following ``lc.customer`` loads the member too. Instead a report
+selects just the columns it shows and reads them as plain tuples, or as
+small ``__slots__`` rows when a template wants attribute names:
+
+    CollectionRow = row_type('CollectionRow', 'amount collection_date customer_name staff_name')
+    rows = fetch(select(LoanCollection.amount, ...).join(...), CollectionRow)
+    for day, amount in stream(select(LoanCollection.collection_date, LoanCollection.amount)):
+        ...
+
+Statements go through ``db.session``, so branch scoping (branches.py) and
+the read replica (replica.py) apply as usual. They are executed with
+``stream_results``: on PostgreSQL a server-side cursor hands the rows over
+STREAM_CHUNK at a time instead of the driver buffering the whole result.
+
+    python report_memory.py     # peak memory of the report pages
+"""
+from sqlalchemy import func, select
+
+from models.user_model import db
+
+STREAM_CHUNK = 2000
+
+
+class ProjectedRow:
+    """A row of a few named columns, without a per-instance ``__dict__``."""
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+def row_type(name, fields):
+    """A ProjectedRow subclass with ``fields`` (a list or a space-separated string)."""
+    if isinstance(fields, str):
+        fields = fields.split()
+    return type(name, (ProjectedRow,), {'__slots__': tuple(fields)})
+
+
+def stream(stmt, row=None, chunk=STREAM_CHUNK):
+    """Yield the rows of ``stmt`` as plain tuples, or as ``row(*values)``,
+    fetching ``chunk`` rows at a time from a streaming cursor."""
+    result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=chunk))
+    try:
+        for partition in result.partitions():
+            if row is None:
+                yield from (tuple(r) for r in partition)
+            else:
+                yield from (row(*r) for r in partition)
+    finally:
+        result.close()
+
+
+def fetch(stmt, row=None, chunk=STREAM_CHUNK):
+    """``list(stream(...))``, for templates that loop over the rows."""
+    return list(stream(stmt, row, chunk))
+
+
+def total(column, *criteria):
+    """``SUM(column)`` of the rows matching ``criteria``, 0 when there are none."""
+    return db.session.execute(select(func.coalesce(func.sum(column), 0)).where(*criteria)).scalar()
@@ -0,0 +1,200 @@
+"""Queries shared by the HTML pages (app.py) and the JSON API (api.py).
+
+Each function takes the logged-in ``user`` and applies the same visibility
+rule the pages always had: staff see their own members and collections,
+admins see everything.
+"""
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func, literal, null, select, type_coerce, union_all
+
+from models.user_model import db, User
+from models.money import Money
+from models.customer_model import Customer
+from models.loan_model import Loan
+from models.loan_collection_model import LoanCollection
+from models.saving_collection_model import SavingCollection
+from models.withdrawal_model import Withdrawal
+from models.expense_model import Expense
+from models.investment_model import Investment
+
+
+def is_staff(user):
+    return user.role == 'staff'
+
+
+def customers(user, with_loan=False, outstanding=False):
+    """Members visible to ``user``; ``with_loan`` keeps members who ever
+    borrowed, ``outstanding`` those who still owe."""
+    query = Customer.query
+    if is_staff(user):
+        query = query.filter(Customer.staff_id == user.id)
+    if with_loan:
+        query = query.filter(Customer.total_loan > 0)
+    if outstanding:
+        query = query.filter(Customer.remaining_loan > 0)
+    return query
+
+
+def loans(user):
+    query = Loan.query
+    if is_staff(user):
+        query = query.filter(Loan.staff_id == user.id)
+    return query
+
+
+def collections(model, user, staff_id=None, customer_id=None, since=None, until=None):
+    """Loan or saving collections (``model``) visible to ``user``."""
+    query = model.query
+    if is_staff(user):
+        query = query.filter(model.staff_id == user.id)
+    elif staff_id:
+        query = query.filter(model.staff_id == staff_id)
+    if customer_id:
+        query = query.filter(model.customer_id == customer_id)
+    if since:
+        query = query.filter(model.collection_date >= since)
+    if until:
+        query = query.filter(model.collection_date <= until)
+    return query
+
+
+def withdrawals(customer_id=None, since=None, until=None):
+    query = Withdrawal.query
+    if customer_id:
+        query = query.filter(Withdrawal.customer_id == customer_id)
+    return in_range(query, Withdrawal.date, since, until)
+
+
+def expenses(since=None, until=None):
+    return in_range(Expense.query, Expense.date, since, until)
+
+
+def investments(since=None, until=None):
+    return in_range(Investment.query, Investment.date, since, until)
+
+
+def in_range(query, column, since=None, until=None):
+    if since:
+        query = query.filter(column >= since)
+    if until:
+        query = query.filter(column <= until)
+    return query
+
+
+def date_range(args):
+    """``(since, until)`` datetimes for the ``from_date`` / ``to_date``
+    (``YYYY-MM-DD``) arguments of a report form; ``until`` covers the whole
+    last day. Missing or malformed dates leave that end open."""
+    bounds = []
+    for key, at in (('from_date', time.min), ('to_date', time.max)):
+        try:
+            bounds.append(datetime.combine(date.fromisoformat(args.get(key, '')), at))
+        except ValueError:
+            bounds.append(None)
+    return tuple(bounds)
+
+
+def totals_by(query, model, column):
+    """``{value: (count, total)}`` of ``model.amount`` grouped by ``column``,
+    summed in SQL over the rows ``query`` selects."""
+    rows = (query.with_entities(column, db.func.count(model.id), db.func.sum(model.amount))
+            .group_by(column).all())
+    return {key: (count, total or 0.0) for key, count, total in rows}
+
+
+def page(query, *order_by, arg='page', per_page=None):
+    """The ``?page=`` (or ``?<arg>=``) page of ``query`` for the current
+    request, ``per_page`` (default ``PAGE_SIZE``) rows long; out-of-range
+    pages come back empty."""
+    from flask import current_app, request
+    return query.order_by(*order_by).paginate(page=request.args.get(arg, 1, type=int),
+                                              per_page=per_page or current_app.config['PAGE_SIZE'], error_out=False)
+
+
+def period_start(period, now=None):
+    """Start of the ``daily`` / ``weekly`` / ``monthly`` window of the reports page."""
+    now = now or datetime.now()
+    if period == 'daily':
+        return now.replace(hour=0, minute=0, second=0)
+    if period == 'weekly':
+        return now - timedelta(days=7)
+    return now - timedelta(days=30)
+
+
+def collection_totals(user, since, staff_id=None):
+    """``{'loan': (count, total), 'saving': (count, total), 'by_staff': [...]}``
+    for collections since ``since``, summed in SQL."""
+    result = {'by_staff': {}}
+    for key, model in (('loan', LoanCollection), ('saving', SavingCollection)):
+        rows = (collections(model, user, staff_id=staff_id, since=since)
+                .with_entities(model.staff_id, db.func.count(model.id), db.func.sum(model.amount))
+                .group_by(model.staff_id).all())
+        result[key] = (sum(r[1] for r in rows), sum(r[2] or 0 for r in rows))
+        for staff, count, total in rows:
+            entry = result['by_staff'].setdefault(staff, {'staff_id': staff, 'loan_count': 0, 'loan_total': 0.0,
+                                                          'saving_count': 0, 'saving_total': 0.0})
+            entry[f'{key}_count'] = count
+            entry[f'{key}_total'] = total or 0.0
+    result['by_staff'] = sorted(result['by_staff'].values(), key=lambda e: e['staff_id'] or 0)
+    return result
+
+
+def timeline(customer_id):
+    """A member's loans, loan and saving collections and withdrawals as one
+    UNION ALL subquery with columns ``kind, id, date, amount, loan_change,
+    savings_change, staff_id, note``. A loan adds principal plus interest to
+    the outstanding loan, as balances.disburse_loan does, rounded to the paisa."""
+    zero = literal(0, Money)
+    loan_change = func.round(Loan.amount + Loan.amount * func.coalesce(Loan.interest, 0) / 100)
+    return union_all(
+        select(literal('loan').label('kind'), Loan.id, Loan.loan_date.label('date'), Loan.amount,
+               type_coerce(loan_change, Money).label('loan_change'),
+               zero.label('savings_change'), Loan.staff_id, null().label('note'))
+        .where(Loan.customer_id == customer_id),
+        select(literal('loan_collection'), LoanCollection.id, LoanCollection.collection_date, LoanCollection.amount,
+               -LoanCollection.amount, zero, LoanCollection.staff_id, null())
+        .where(LoanCollection.customer_id == customer_id),
+        select(literal('saving_collection'), SavingCollection.id, SavingCollection.collection_date,
+               SavingCollection.amount, zero, SavingCollection.amount, SavingCollection.staff_id, null())
+        .where(SavingCollection.customer_id == customer_id),
+        select(literal('withdrawal'), Withdrawal.id, Withdrawal.date, Withdrawal.amount, zero, -Withdrawal.amount,
+               null(), Withdrawal.note)
+        .where(Withdrawal.customer_id == customer_id),
+    ).subquery('timeline')
+
+
+def member_timeline(customer, since=None, until=None):
+    """``(query, totals, opening)`` for a member's statement.
+
+    ``query`` selects the timeline rows (optionally only those dated
+    ``since`` .. ``until``) with the running ``loan_outstanding`` and
+    ``savings_balance`` after each row and the collector's ``staff_name``,
+    newest first, ready for ``page()``. The running balances are window sums
+    over the member's whole history, so every page is right on its own.
+    ``totals`` is ``{kind: (count, amount)}`` from one aggregate. ``opening``
+    is ``(loan, savings)`` that the rows do not explain (archived collections,
+    balances carried over from paper), so the newest row ends at the member's
+    stored balances."""
+    rows = timeline(customer.id)
+    aggregates = db.session.execute(
+        select(rows.c.kind, func.count(), func.sum(rows.c.amount), func.sum(rows.c.loan_change),
+               func.sum(rows.c.savings_change)).group_by(rows.c.kind)).all()
+    totals = {kind: (count, amount or 0.0) for kind, count, amount, loan, savings in aggregates}
+    opening = ((customer.remaining_loan or 0) - sum(loan or 0 for kind, count, amount, loan, savings in aggregates),
+               (customer.savings_balance or 0) - sum(savings or 0 for kind, count, amount, loan, savings in aggregates))
+
+    order = (rows.c.date, rows.c.kind, rows.c.id)
+    running = select(
+        rows,
+        type_coerce(literal(opening[0], Money) + func.sum(rows.c.loan_change).over(order_by=order, rows=(None, 0)),
+                    Money).label('loan_outstanding'),
+        type_coerce(literal(opening[1], Money) + func.sum(rows.c.savings_change).over(order_by=order, rows=(None, 0)),
+                    Money).label('savings_balance'),
+    ).subquery('running')
+    query = (db.session.query(running, User.name.label('staff_name'))
+             .outerjoin(User, User.id == running.c.staff_id)
+             .order_by(running.c.date.desc(), running.c.kind.desc(), running.c.id.desc()))
+    query = in_range(query, running.c.date, since, until)
+    return query, totals, opening
+
@@ -0,0 +1,98 @@
+"""Read-replica routing for report and list pages.
+
+With REPLICA_DATABASE_URL set, GET views decorated with ``@reads_from_replica``
+run their SELECTs against the ``replica`` bind (see ``RoutingSession`` in
+models/user_model.py); everything else, and every write, uses the primary.
+
+The replica is skipped, and the view reads from the primary, when:
+
+* the replica is unreachable or more than REPLICA_MAX_LAG seconds behind -
+  measured by comparing the newest ``table_versions.updated_at`` on both
+  sides, which works whatever replicates the data,
+* the user has saved something within the lag window, so they always see
+  their own writes.
+
+Responses of decorated views carry ``X-Read-From: replica`` or ``primary``.
+"""
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, request, session
+from sqlalchemy import func, select
+
+from models.user_model import db
+from models.table_version_model import TableVersion
+
+LAST_WRITE_KEY = '_last_write'
+
+_lock = threading.Lock()
+_status = {'checked': 0.0, 'ok': False, 'lag': None}
+
+
+def replica_lag():
+    """Seconds the replica trails the primary, by their latest recorded write."""
+    stmt = select(func.max(TableVersion.updated_at))
+    with db.engines[None].connect() as conn:
+        primary = conn.execute(stmt).scalar()
+    with db.engines['replica'].connect() as conn:
+        replica = conn.execute(stmt).scalar()
+    if primary is None:
+        return 0.0
+    if replica is None:
+        return float('inf')
+    return max((primary - replica).total_seconds(), 0.0)
+
+
+def replica_healthy(app):
+    """Whether the replica is within REPLICA_MAX_LAG, rechecked at most every
+    REPLICA_CHECK_INTERVAL seconds per process."""
+    if 'replica' not in db.engines:
+        return False
+    now = time.monotonic()
+    with _lock:
+        if now - _status['checked'] < app.config['REPLICA_CHECK_INTERVAL']:
+            return _status['ok']
+        _status['checked'] = now
+    try:
+        lag = replica_lag()
+        ok = lag <= app.config['REPLICA_MAX_LAG']
+    except Exception as e:
+        logging.warning(f'Read replica unavailable, using the primary: {e}')
+        lag, ok = None, False
+    if not ok and _status['ok']:
+        logging.warning(f'Read replica {lag}s behind, using the primary')
+    _status.update(ok=ok, lag=lag)
+    return ok
+
+
+def _wrote_recently(app):
+    window = app.config['REPLICA_MAX_LAG'] + app.config['REPLICA_CHECK_INTERVAL']
+    return time.time() - session.get(LAST_WRITE_KEY, 0) < window
+
+
+def reads_from_replica(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        app = current_app._get_current_object()
+        use = request.method == 'GET' and not _wrote_recently(app) and replica_healthy(app)
+        g.use_replica = use
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        finally:
+            g.use_replica = False
+        response.headers['X-Read-From'] = 'replica' if use else 'primary'
+        return response
+    return wrapper
+
+
+def init_replica(app):
+    if not app.config.get('REPLICA_DATABASE_URL'):
+        return
+
+    @app.after_request
+    def remember_write(response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            session[LAST_WRITE_KEY] = time.time()
+        return response
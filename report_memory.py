@@ -0,0 +1,96 @@
+"""Measure the peak memory of the report pages (projection.py).
+
+    python seed_data.py --database-url sqlite:///bench.db --customers 2000 --loan-collections 100
+    python report_memory.py --database-url sqlite:///bench.db --output report_memory_before.json
+    python report_memory.py --database-url sqlite:///bench.db --compare report_memory_before.json
+
+Every page is requested in a fresh process, logged in as an admin, with
+tracemalloc started just before the request. The peak is the most memory
+Python held at once while the page was built and rendered, over what it
+held before the request, so the numbers do not depend on what was
+imported. Response caching (http_cache.py) is bypassed by not sending
+validators.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+CHILD = '''
+import contextlib, io, json, logging, sys, time, tracemalloc
+logging.disable(logging.CRITICAL)
+from app import app
+client = app.test_client()
+with contextlib.redirect_stdout(io.StringIO()):
+    client.post('/login', data={'email': sys.argv[2], 'password': sys.argv[3]})
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    response = client.get(sys.argv[1])
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+print(json.dumps({'peak_kb': (peak - before) / 1024, 'ms': elapsed * 1000, 'status': response.status_code,
+                  'bytes': len(response.data)}))
+'''
+
+PAGES = ('/reports?period=all', '/daily_report', '/monthly_report', '/profit_loss?period=all',
+         '/staff_collection_report/2')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Measure peak memory of the report pages in fresh processes')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:///bench.db'))
+    parser.add_argument('--page', action='append', help='page to measure (repeatable, default: the reports)')
+    parser.add_argument('--email', default='admin@example.com')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--output', default='report_memory_results.json')
+    parser.add_argument('--compare', help='previous results file to diff against')
+    return parser.parse_args(argv)
+
+
+def run(args):
+    env = dict(os.environ, DATABASE_URL=args.database_url)
+    here = os.path.dirname(os.path.abspath(__file__))
+    pages = {}
+    for page in args.page or PAGES:
+        output = subprocess.run([sys.executable, '-c', CHILD, page, args.email, args.password],
+                                env=env, cwd=here, capture_output=True, text=True)
+        if output.returncode:
+            raise SystemExit(output.stderr)
+        sample = json.loads(output.stdout.strip().splitlines()[-1])
+        pages[page] = {'peak_kb': round(sample['peak_kb'], 1), 'ms': round(sample['ms'], 1),
+                       'status': sample['status'], 'bytes': sample['bytes']}
+        print(f"{page:32} {pages[page]['peak_kb']:10.1f}KB {pages[page]['ms']:9.1f}ms  {sample['status']}")
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'database_url': args.database_url,
+        'python': platform.python_version(),
+        'pages': pages,
+    }
+
+
+def compare(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)['pages']
+    print(f'\nCompared with {previous_path}:')
+    for page, result in current['pages'].items():
+        old = previous.get(page)
+        if old and old['peak_kb']:
+            new = result['peak_kb']
+            print(f"{page:32} {old['peak_kb']:10.1f} -> {new:10.1f}KB ({(new - old['peak_kb']) / old['peak_kb'] * 100:+6.1f}%)"
+                  f"  {old['ms']:9.1f} -> {result['ms']:9.1f}ms")
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    report = run(args)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nResults saved to {args.output}')
+    if args.compare:
+        compare(report, args.compare)
+    sys.exit(0)
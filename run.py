@@ -1,9 +1,10 @@
 import socket
 from app import app, db, bcrypt, User, CashBalance
+from migrate import upgrade
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        upgrade(db.engine)
         
         if not User.query.filter_by(email='admin@example.com').first():
             hashed_pw = bcrypt.generate_password_hash('admin123').decode('utf-8')
@@ -0,0 +1,238 @@
+"""Populate a database with a deterministic synthetic dataset.
+
+Used to measure the app at realistic scale before a release:
+
+    python seed_data.py --database-url sqlite:///bench.db --customers 20000 \
+        --loan-collections 2000000 --saving-collections 2000000 --years 3
+
+The same --seed always produces the same rows, so benchmark runs made
+against separately generated databases stay comparable.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+CHUNK_SIZE = 10000
+
+VILLAGES = ['Rampur', 'Sonapur', 'Kashipur', 'Hatbari', 'Chandpur', 'Nayapara', 'Dighirpar', 'Baliadi']
+PROFESSIONS = ['Business', 'Farmer', 'Tailor', 'Shopkeeper', 'Driver', 'Fisher', 'Teacher']
+EXPENSE_CATEGORIES = ['Salary', 'Office', 'Transport', 'Other']
+INSTALLMENT_TYPES = ['daily', 'weekly', 'monthly']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic NGO dataset')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:///bench.db'))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--staff', type=int, default=20)
+    parser.add_argument('--customers', type=int, default=5000)
+    parser.add_argument('--loans', type=int, default=None, help='defaults to 80%% of customers')
+    parser.add_argument('--loan-collections', type=int, default=200000)
+    parser.add_argument('--saving-collections', type=int, default=200000)
+    parser.add_argument('--withdrawals', type=int, default=2000)
+    parser.add_argument('--expenses', type=int, default=1000)
+    parser.add_argument('--investments', type=int, default=200)
+    parser.add_argument('--years', type=float, default=3)
+    return parser.parse_args(argv)
+
+
+def insert_chunked(db, table, rows):
+    """Insert an iterable of row dicts with executemany, CHUNK_SIZE rows at a time.
+    Rows of branch-partitioned tables go to branch 1 unless they say otherwise."""
+    count = 0
+    chunk = []
+    branched = 'branch_id' in table.c
+    for row in rows:
+        if branched:
+            row.setdefault('branch_id', 1)
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            db.session.execute(table.insert(), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+        count += len(chunk)
+    db.session.commit()
+    return count
+
+
+def random_date(rng, start, span_seconds):
+    return start + timedelta(seconds=rng.randrange(span_seconds))
+
+
+def generate(args):
+    from app import app, db, bcrypt, User, CashBalance
+    from models.branch_model import Branch
+    from models.customer_model import Customer
+    from models.loan_model import Loan
+    from models.loan_collection_model import LoanCollection
+    from models.saving_collection_model import SavingCollection
+    from models.withdrawal_model import Withdrawal
+    from models.expense_model import Expense
+    from models.investment_model import Investment
+
+    rng = random.Random(args.seed)
+    end = datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=int(args.years * 365))
+    span = int((end - start).total_seconds())
+    loan_count = args.loans if args.loans is not None else int(args.customers * 0.8)
+    loan_count = min(loan_count, args.customers)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        t0 = time.time()
+        db.session.add(Branch(id=1, code='HQ', name='Head office'))
+
+        admin_pw = bcrypt.generate_password_hash('admin123').decode('utf-8')
+        staff_pw = bcrypt.generate_password_hash('staff123').decode('utf-8')
+        users = [{'name': 'Admin', 'email': 'admin@example.com', 'password': admin_pw, 'role': 'admin', 'branch_id': None}]
+        for i in range(1, args.staff + 1):
+            users.append({'name': f'Staff {i}', 'email': f'staff{i}@example.com', 'password': staff_pw, 'role': 'staff'})
+        insert_chunked(db, User.__table__, users)
+        staff_ids = [u.id for u in User.query.filter_by(role='staff').order_by(User.id)]
+        print(f'users: {len(users)}')
+
+        customers = []
+        for i in range(1, args.customers + 1):
+            customers.append({
+                'id': i,
+                'name': f'Member {i}',
+                'member_no': f'{i:06d}',
+                'phone': f'01{rng.randrange(700000000, 999999999)}',
+                'father_husband': f'Guardian {i}',
+                'village': rng.choice(VILLAGES),
+                'profession': rng.choice(PROFESSIONS),
+                'admission_fee': rng.choice([0.0, 50.0, 100.0]),
+                'application_fee': 0.0,
+                'welfare_fee': 0.0,
+                'staff_id': staff_ids[i % len(staff_ids)],
+                'total_loan': 0.0,
+                'remaining_loan': 0.0,
+                'savings_balance': 0.0,
+                'created_date': random_date(rng, start, span // 4 or 1),
+            })
+
+        loans = []
+        borrowers = rng.sample(range(1, args.customers + 1), loan_count)
+        for loan_id, customer_id in enumerate(borrowers, start=1):
+            customer = customers[customer_id - 1]
+            amount = float(rng.randrange(5, 101) * 1000)
+            interest = float(rng.choice([10, 12, 15]))
+            loan_date = random_date(rng, customer['created_date'], max(int((end - customer['created_date']).total_seconds()), 1))
+            installment_count = rng.choice([12, 24, 46, 52])
+            total = amount + amount * interest / 100
+            loans.append({
+                'id': loan_id,
+                'customer_id': customer_id,
+                'customer_name': customer['name'],
+                'amount': amount,
+                'interest': interest,
+                'loan_date': loan_date,
+                'due_date': loan_date + timedelta(days=365),
+                'installment_count': installment_count,
+                'installment_amount': round(total / installment_count, 2),
+                'installment_type': rng.choice(INSTALLMENT_TYPES),
+                'service_charge': rng.choice([0.0, 100.0, 200.0]),
+                'status': 'Pending',
+                'staff_id': customer['staff_id'],
+            })
+            customer['total_loan'] += total
+            customer['remaining_loan'] += total
+
+        totals = {'loan_collections': 0.0, 'saving_collections': 0.0}
+
+        def loan_collection_rows():
+            if not borrowers:
+                return
+            for i in range(args.loan_collections):
+                customer = customers[rng.choice(borrowers) - 1]
+                amount = float(rng.randrange(1, 21) * 50)
+                if amount > customer['remaining_loan']:
+                    amount = round(customer['remaining_loan'], 2)
+                if amount <= 0:
+                    continue
+                customer['remaining_loan'] -= amount
+                totals['loan_collections'] += amount
+                yield {
+                    'customer_id': customer['id'],
+                    'amount': amount,
+                    'collection_date': random_date(rng, start, span),
+                    'staff_id': customer['staff_id'],
+                }
+
+        def saving_collection_rows():
+            for i in range(args.saving_collections):
+                customer = customers[rng.randrange(args.customers)]
+                amount = float(rng.randrange(1, 11) * 20)
+                customer['savings_balance'] += amount
+                totals['saving_collections'] += amount
+                yield {
+                    'customer_id': customer['id'],
+                    'amount': amount,
+                    'collection_date': random_date(rng, start, span),
+                    'staff_id': customer['staff_id'],
+                }
+
+        insert_chunked(db, Customer.__table__, customers)
+        print(f'customers: {len(customers)}')
+        insert_chunked(db, Loan.__table__, loans)
+        print(f'loans: {len(loans)}')
+        print(f'loan_collections: {insert_chunked(db, LoanCollection.__table__, loan_collection_rows())}')
+        print(f'saving_collections: {insert_chunked(db, SavingCollection.__table__, saving_collection_rows())}')
+
+        withdrawals = []
+        for i in range(args.withdrawals):
+            if rng.random() < 0.8:
+                customer = customers[rng.randrange(args.customers)]
+                amount = float(min(customer['savings_balance'], rng.randrange(1, 11) * 100))
+                if amount <= 0:
+                    continue
+                customer['savings_balance'] -= amount
+                withdrawals.append({'customer_id': customer['id'], 'investor_name': customer['name'], 'amount': amount,
+                                    'date': random_date(rng, start, span), 'withdrawal_type': 'savings', 'note': ''})
+            else:
+                withdrawals.append({'customer_id': None, 'investor_name': f'Investor {rng.randrange(1, 20)}',
+                                    'amount': float(rng.randrange(1, 50) * 1000), 'date': random_date(rng, start, span),
+                                    'withdrawal_type': 'investment', 'note': ''})
+
+        expenses = [{'category': rng.choice(EXPENSE_CATEGORIES), 'amount': float(rng.randrange(1, 100) * 100),
+                     'description': 'synthetic', 'date': random_date(rng, start, span)} for i in range(args.expenses)]
+        investments = [{'investor_name': f'Investor {rng.randrange(1, 20)}', 'amount': float(rng.randrange(10, 500) * 1000),
+                        'date': random_date(rng, start, span), 'note': ''} for i in range(args.investments)]
+
+        for name, model, rows in [('withdrawals', Withdrawal, withdrawals), ('expenses', Expense, expenses),
+                                  ('investments', Investment, investments)]:
+            print(f'{name}: {insert_chunked(db, model.__table__, rows)}')
+
+        # Balances are only final once every collection and withdrawal has been generated
+        balances = [{'cid': c['id'], 'total': c['total_loan'], 'remaining': round(c['remaining_loan'], 2),
+                     'savings': round(c['savings_balance'], 2)} for c in customers]
+        update = Customer.__table__.update().where(Customer.__table__.c.id == db.bindparam('cid')).values(
+            total_loan=db.bindparam('total'), remaining_loan=db.bindparam('remaining'),
+            savings_balance=db.bindparam('savings'))
+        for offset in range(0, len(balances), CHUNK_SIZE):
+            db.session.execute(update, balances[offset:offset + CHUNK_SIZE])
+        db.session.commit()
+
+        cash = (sum(r['amount'] for r in investments) + totals['loan_collections']
+                + totals['saving_collections'] + sum(c['admission_fee'] for c in customers)
+                + sum(l['service_charge'] for l in loans) - sum(l['amount'] for l in loans)
+                - sum(r['amount'] for r in withdrawals) - sum(r['amount'] for r in expenses))
+        CashBalance.query.delete()
+        db.session.add(CashBalance(balance=cash, branch_id=1))
+        db.session.commit()
+        print(f'Done in {time.time() - t0:.1f}s')
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.staff < 1:
+        sys.exit('--staff must be at least 1')
+    # config.py reads DATABASE_URL at import time, so it must be set before app is imported
+    os.environ['DATABASE_URL'] = args.database_url
+    sys.exit(generate(args))
@@ -1,5 +1,12 @@
-import gspread
-from google.oauth2.service_account import Credentials
+"""Optional mirroring of customers, loans and collections to a Google Sheet
+(see SHEETS_SETUP.md).
+
+The client is created on first use of ``get_sheets_db()`` (or of the
+``sheets_db`` module attribute), not at import: creating it reads
+``credentials.json`` and opens the spreadsheet over the network, and gspread
+and google-auth are slow to import, so importing this module must stay cheap
+for a cold start.
+"""
 from datetime import datetime
 import os
 
@@ -17,6 +24,8 @@ class SheetsDB:
                 self.enabled = False
                 return
             try:
+                import gspread
+                from google.oauth2.service_account import Credentials
                 scopes = ['https://www.googleapis.com/auth/spreadsheets']
                 creds = Credentials.from_service_account_file(credentials_file, scopes=scopes)
                 self.client = gspread.authorize(creds)
@@ -66,4 +75,20 @@ class SheetsDB:
         except:
             pass
 
-sheets_db = SheetsDB()
+
+_client = None
+
+
+def get_sheets_db():
+    """The shared client, created (and connected) on the first call only."""
+    global _client
+    if _client is None:
+        _client = SheetsDB()
+    return _client
+
+
+def __getattr__(name):
+    # ``from sheets_db import sheets_db`` keeps working, created on first access
+    if name == 'sheets_db':
+        return get_sheets_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
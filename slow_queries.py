@@ -0,0 +1,214 @@
+"""Slow-query log.
+
+Every statement sent to any database engine (the main database, the
+archive, the replica, branch storage) is timed. Statements slower than
+SLOW_QUERY_MS are recorded with their parameters, the endpoint (or script)
+that ran them and the database's plan for them: ``EXPLAIN QUERY PLAN`` on
+SQLite, ``EXPLAIN`` on PostgreSQL and MySQL, run on the same connection
+right after the statement.
+
+Entries live in SLOW_QUERY_LOG, a small SQLite file of its own shared by
+every worker process, one row per statement and endpoint with its number of
+slow runs and their total and longest time. Statements differing only in the
+length of an ``IN (...)`` list count as one. When there are more than
+SLOW_QUERY_LOG_SIZE rows, those with the least total time are dropped. The
+admin page ``/admin/slow_queries`` lists them by total time; from a shell:
+
+    python slow_queries.py              # top 20 by total time
+    python slow_queries.py --limit 50 --plans
+    python slow_queries.py clear
+
+Only the execution is timed; rows fetched later from a streaming cursor are
+not included. Set SLOW_QUERY_MS=0 to turn the log off.
+"""
+import argparse
+import hashlib
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MAX_TEXT = 2000
+EXPLAIN = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN ', 'mysql': 'EXPLAIN ', 'mariadb': 'EXPLAIN '}
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+PLACEHOLDER = r'(?:\?|%s|%\(\w+\)s|:\w+)'
+PLACEHOLDER_LIST = re.compile(rf'\(\s*{PLACEHOLDER}(?:\s*,\s*{PLACEHOLDER})*\s*\)')
+
+SCHEMA = ('CREATE TABLE IF NOT EXISTS slow_queries ('
+          'fingerprint TEXT NOT NULL, endpoint TEXT NOT NULL, statement TEXT, parameters TEXT, '
+          'database TEXT, plan TEXT, calls INTEGER, total_ms REAL, max_ms REAL, last_ms REAL, '
+          'first_seen TEXT, last_seen TEXT, PRIMARY KEY (fingerprint, endpoint))')
+
+_settings = {'threshold_ms': 0, 'path': None, 'size': 0}
+_lock = threading.Lock()
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=2)
+    conn.execute(SCHEMA)
+    return conn
+
+
+def fingerprint(statement):
+    """The statement with every ``IN (?, ?, ...)`` list shortened to one placeholder, hashed."""
+    normalized = PLACEHOLDER_LIST.sub('(?)', ' '.join(statement.split()))
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def _endpoint():
+    if has_request_context():
+        return f'{request.method} {request.endpoint or request.path}'
+    return sys.argv[0].rsplit('/', 1)[-1] or 'python'
+
+
+def _plan(cursor, dialect, statement, parameters, executemany):
+    """The database's plan for ``statement``, or None when it has none to give."""
+    prefix = EXPLAIN.get(dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    explain = cursor.connection.cursor()
+    try:
+        explain.execute(prefix + statement, parameters)
+        rows = explain.fetchall()
+    finally:
+        explain.close()
+    if dialect.name == 'sqlite':
+        # (id, parent, notused, detail): indent each step under its parent
+        depth = {0: -1}
+        lines = []
+        for row in rows:
+            depth[row[0]] = depth.get(row[1], -1) + 1
+            lines.append('  ' * depth[row[0]] + str(row[3]))
+        return '\n'.join(lines)
+    return '\n'.join(' | '.join(str(v) for v in row) if len(row) > 1 else str(row[0]) for row in rows)
+
+
+def record(statement, parameters, elapsed_ms, database, endpoint, plan=None):
+    """Add one slow run of ``statement`` to the log."""
+    now = datetime.now().isoformat(timespec='seconds')
+    params = repr(parameters)[:MAX_TEXT] if parameters else ''
+    with _lock:
+        conn = _connect(_settings['path'])
+        try:
+            with conn:
+                new = conn.execute(
+                    'INSERT INTO slow_queries (fingerprint, endpoint, statement, parameters, database, plan, calls, '
+                    'total_ms, max_ms, last_ms, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (fingerprint, endpoint) DO UPDATE SET calls = calls + 1, '
+                    'total_ms = total_ms + excluded.total_ms, max_ms = MAX(max_ms, excluded.max_ms), '
+                    'last_ms = excluded.last_ms, parameters = excluded.parameters, database = excluded.database, '
+                    'plan = COALESCE(excluded.plan, plan), last_seen = excluded.last_seen '
+                    'RETURNING calls',
+                    (fingerprint(statement), endpoint, statement[:MAX_TEXT * 5], params, database, plan,
+                     elapsed_ms, elapsed_ms, elapsed_ms, now, now)).fetchone()[0] == 1
+                if new:
+                    conn.execute('DELETE FROM slow_queries WHERE rowid NOT IN '
+                                 '(SELECT rowid FROM slow_queries ORDER BY total_ms DESC LIMIT ?)', (_settings['size'],))
+        finally:
+            conn.close()
+
+
+def _known(statement, endpoint):
+    """Whether the log already has a plan for ``statement`` from ``endpoint``."""
+    conn = _connect(_settings['path'])
+    try:
+        row = conn.execute('SELECT plan IS NOT NULL FROM slow_queries WHERE fingerprint = ? AND endpoint = ?',
+                           (fingerprint(statement), endpoint)).fetchone()
+    finally:
+        conn.close()
+    return bool(row and row[0])
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_slow_query_started', None)
+    if started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms < _settings['threshold_ms']:
+        return
+    try:
+        endpoint = _endpoint()
+        plan = None
+        if not _known(statement, endpoint):
+            try:
+                plan = _plan(cursor, conn.dialect, statement, parameters, executemany)
+            except Exception as e:
+                plan = f'(no plan: {e})'
+        database = conn.engine.url.render_as_string(hide_password=True)
+        record(statement, parameters, elapsed_ms, database, endpoint, plan)
+    except Exception as e:
+        logging.warning(f'Could not record slow query: {e}')
+
+
+def entries(limit=100):
+    """Logged statements, most total time first, as dicts."""
+    if not _settings['path']:
+        return []
+    conn = _connect(_settings['path'])
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute('SELECT * FROM slow_queries ORDER BY total_ms DESC LIMIT ?', (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [dict(row, avg_ms=row['total_ms'] / row['calls']) for row in rows]
+
+
+def clear():
+    if not _settings['path']:
+        return
+    with _lock:
+        conn = _connect(_settings['path'])
+        try:
+            with conn:
+                conn.execute('DELETE FROM slow_queries')
+        finally:
+            conn.close()
+
+
+def init_slow_queries(app):
+    """Time every statement of every engine when SLOW_QUERY_MS is set."""
+    _settings.update(threshold_ms=app.config.get('SLOW_QUERY_MS', 0), path=app.config.get('SLOW_QUERY_LOG'),
+                     size=app.config.get('SLOW_QUERY_LOG_SIZE', 500))
+    if not _settings['threshold_ms'] or not _settings['path']:
+        return
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Show the slow-query log')
+    parser.add_argument('command', nargs='?', default='show', choices=['show', 'clear'])
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--plans', action='store_true', help='print each query plan')
+    args = parser.parse_args()
+
+    from app import app
+    if not app.config.get('SLOW_QUERY_LOG'):
+        sys.exit('SLOW_QUERY_LOG is not set')
+    _settings['path'] = app.config['SLOW_QUERY_LOG']
+    if args.command == 'clear':
+        clear()
+        print('Slow-query log cleared')
+        sys.exit(0)
+    for e in entries(args.limit):
+        print(f"{e['total_ms']:10.0f}ms total {e['calls']:6}x avg {e['avg_ms']:8.1f}ms max {e['max_ms']:8.1f}ms  "
+              f"{e['endpoint']}")
+        print(f"    {' '.join(e['statement'].split())[:300]}")
+        if args.plans and e['plan']:
+            print('\n'.join('      ' + line for line in e['plan'].splitlines()))
+    sys.exit(0)
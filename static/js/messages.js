@@ -0,0 +1,36 @@
+// Long-poll /messages/poll and keep the unread badge current.
+// Include with data-poll-url and data-since on the script tag.
+(function () {
+  var script = document.currentScript;
+  var url = script.dataset.pollUrl;
+  var since = parseInt(script.dataset.since || '0', 10);
+  var badge = document.getElementById('unread-badge');
+  var notice = document.getElementById('new-message-notice');
+
+  function show(unread, messages) {
+    if (badge) {
+      badge.textContent = unread;
+      badge.classList.toggle('d-none', unread === 0);
+    }
+    if (notice && messages.length) {
+      notice.textContent = '📩 ' + messages[messages.length - 1].content;
+      notice.classList.remove('d-none');
+    }
+  }
+
+  function poll() {
+    fetch(url + '?since=' + since, {credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) { throw new Error(response.status); }
+        return response.json();
+      })
+      .then(function (data) {
+        since = Math.max(since, data.latest);
+        show(data.unread, data.messages);
+        // retry_after: the server had no long-poll slot free and answered at once
+        if (data.retry_after) { setTimeout(poll, data.retry_after * 1000); } else { poll(); }
+      })
+      .catch(function () { setTimeout(poll, 10000); });
+  }
+  poll();
+})();
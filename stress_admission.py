@@ -0,0 +1,161 @@
+"""Collection latency while admins hammer the reports, with and without
+admission control (admission.py).
+
+A fixed pool of --threads threads serves the requests, as one gthread
+gunicorn worker does (gunicorn_config.py). --report-clients admins keep
+requesting a heavy page (--report, monthly_report by default) back to back.
+Meanwhile loan collections for a throwaway member are posted at --rate per
+second, and each one is timed from the moment it is sent until it is
+answered, including any wait for a free thread.
+
+    python seed_data.py --database-url sqlite:///stress.db --customers 2000
+    python stress_admission.py --database-url sqlite:///stress.db --duration 15
+
+Each mode runs in a fresh process (ADMISSION_CONTROL=1 and 0). The member,
+its collections and the cash they brought in are removed afterwards.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Collection latency under report load')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:///stress.db'))
+    parser.add_argument('--threads', type=int, default=12, help='server threads, as in gunicorn_config.py')
+    parser.add_argument('--report-clients', type=int, default=12)
+    parser.add_argument('--report', action='append', help='heavy page to request (repeatable)')
+    parser.add_argument('--rate', type=float, default=5.0, help='loan collections posted per second')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--email', default='admin@example.com')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--mode', choices=['on', 'off'], help='run one mode in this process')
+    return parser.parse_args(argv)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(int(pct / 100.0 * len(ordered)), len(ordered) - 1)]
+
+
+def run(args):
+    from app import app, db
+    from models.customer_model import Customer
+    from models.loan_collection_model import LoanCollection
+    import balances
+
+    reports = args.report or ['/monthly_report']
+    with app.app_context():
+        member = Customer(name='Admission test member', member_no='ADMISSION', phone='0', staff_id=None,
+                          total_loan=1e9, remaining_loan=1e9)
+        db.session.add(member)
+        db.session.commit()
+        customer_id = member.id
+
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+            local.client.post('/login', data={'email': args.email, 'password': args.password})
+        return local.client
+
+    def get(path):
+        return client().get(path).status_code
+
+    def collect():
+        return client().post('/loan_collection/collect', data={'customer_id': customer_id, 'amount': 1}).status_code
+
+    pool = ThreadPoolExecutor(max_workers=args.threads)
+    stop = threading.Event()
+    report_status = []
+
+    def report_client(i):
+        while not stop.is_set():
+            status = pool.submit(get, reports[i % len(reports)]).result()
+            report_status.append(status)
+            if status == 503:
+                time.sleep(0.5)
+
+    latencies, collect_status = [], []
+
+    def timed(started):
+        collect_status.append(collect())
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        barrier = threading.Barrier(args.threads)
+        logins = [pool.submit(lambda: (barrier.wait(), client())) for i in range(args.threads)]
+        for f in logins:  # every pool thread logs in before the clock starts
+            f.result()
+        loaders = [threading.Thread(target=report_client, args=(i,)) for i in range(args.report_clients)]
+        for t in loaders:
+            t.start()
+        time.sleep(1)
+        futures = []
+        end = time.perf_counter() + args.duration
+        while time.perf_counter() < end:
+            started = time.perf_counter()
+            futures.append(pool.submit(timed, started))
+            time.sleep(max(0.0, 1.0 / args.rate - (time.perf_counter() - started)))
+        for f in futures:
+            f.result()
+        stop.set()
+        for t in loaders:
+            t.join()
+        pool.shutdown()
+
+    with app.app_context():
+        collected = db.session.query(db.func.sum(LoanCollection.amount)).filter_by(customer_id=customer_id).scalar() or 0
+        LoanCollection.query.filter_by(customer_id=customer_id).delete()
+        db.session.delete(db.session.get(Customer, customer_id))
+        balances.cash_out(collected)
+        db.session.commit()
+
+    return {
+        'collections': len(latencies),
+        'collect_p50_ms': round(percentile(latencies, 50), 1),
+        'collect_p95_ms': round(percentile(latencies, 95), 1),
+        'collect_max_ms': round(max(latencies or [0]), 1),
+        'collect_failed': sum(1 for s in collect_status if s != 302),
+        'reports_served': report_status.count(200),
+        'reports_refused': report_status.count(503),
+    }
+
+
+def main(args):
+    results = {}
+    for mode in ('off', 'on'):
+        env = dict(os.environ, DATABASE_URL=args.database_url, ADMISSION_CONTROL='1' if mode == 'on' else '0')
+        command = [sys.executable, os.path.abspath(__file__), '--mode', mode] + sys.argv[1:]
+        output = subprocess.run(command, env=env, capture_output=True, text=True)
+        if output.returncode:
+            raise SystemExit(output.stderr)
+        results[mode] = json.loads(output.stdout.strip().splitlines()[-1])
+
+    print(f'{args.threads} threads, {args.report_clients} report clients on {", ".join(args.report or ["/monthly_report"])}, '
+          f'{args.rate:g} collections/s for {args.duration:g}s')
+    for key in results['off']:
+        print(f"  {key:18} {results['off'][key]:>10} {results['on'][key]:>10}")
+    print(f"  {'':18} {'off':>10} {'on':>10}  (admission control)")
+    return 0
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    logging.disable(logging.CRITICAL)
+    if args.mode:
+        os.environ['DATABASE_URL'] = args.database_url
+        print(json.dumps(run(args)))
+        sys.exit(0)
+    sys.exit(main(args))
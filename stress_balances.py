@@ -0,0 +1,117 @@
+"""Concurrency check for balances.py: many staff collecting from one member at once.
+
+A throwaway member is given an outstanding loan of exactly half of what the
+threads will try to collect. Every thread logs in and posts to
+``/loan_collection/collect`` (and ``/saving_collection/collect``) as fast as
+it can, and the run then checks that:
+
+* the member's loan never went below zero and exactly the affordable number
+  of collections was accepted,
+* ``remaining_loan``, ``savings_balance`` and the cash balance moved by
+  exactly the sum of the collection rows written, so no update was lost.
+
+The member, its collections and the cash it brought in are removed again
+afterwards. Run it against a test database:
+
+    python seed_data.py --database-url sqlite:///stress.db --customers 100
+    python stress_balances.py --database-url sqlite:///stress.db --threads 16 --posts 20
+
+Exits with status 1 when a check fails.
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import threading
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Hammer one member with concurrent collections')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:///stress.db'))
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--posts', type=int, default=20, help='loan collections posted by each thread')
+    parser.add_argument('--amount', type=float, default=50.0)
+    parser.add_argument('--email', default='admin@example.com')
+    parser.add_argument('--password', default='admin123')
+    return parser.parse_args(argv)
+
+
+def run(args):
+    from app import app, db
+    from models.customer_model import Customer
+    from models.loan_collection_model import LoanCollection
+    from models.saving_collection_model import SavingCollection
+    from models.cash_balance_model import CashBalance
+    import balances
+
+    attempts = args.threads * args.posts
+    affordable = attempts // 2
+    with app.app_context():
+        member = Customer(name='Stress test member', member_no='STRESS', phone='0', staff_id=None,
+                          total_loan=affordable * args.amount, remaining_loan=affordable * args.amount)
+        db.session.add(member)
+        db.session.commit()
+        customer_id = member.id
+        cash_before = db.session.get(CashBalance, balances.cash_account()).balance
+        db.session.commit()
+
+    start = threading.Barrier(args.threads)
+    errors = []
+
+    def worker():
+        client = app.test_client()
+        client.post('/login', data={'email': args.email, 'password': args.password})
+        start.wait()
+        for i in range(args.posts):
+            response = client.post('/loan_collection/collect', data={'customer_id': customer_id, 'amount': args.amount})
+            if response.status_code != 302:
+                errors.append(response.status_code)
+            client.post('/saving_collection/collect', data={'customer_id': customer_id, 'amount': 10})
+
+    threads = [threading.Thread(target=worker) for i in range(args.threads)]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        member = db.session.get(Customer, customer_id)
+        loan_rows = LoanCollection.query.filter_by(customer_id=customer_id).all()
+        saving_rows = SavingCollection.query.filter_by(customer_id=customer_id).all()
+        collected = sum(c.amount for c in loan_rows)
+        saved = sum(c.amount for c in saving_rows)
+        cash_after = db.session.get(CashBalance, balances.cash_account()).balance
+
+        checks = [
+            ('loan never negative', member.remaining_loan >= 0),
+            (f'{affordable} loan collections accepted (got {len(loan_rows)})', len(loan_rows) == affordable),
+            ('remaining_loan matches collections',
+             abs(member.remaining_loan - (affordable * args.amount - collected)) < 0.005),
+            ('savings_balance matches collections', abs(member.savings_balance - saved) < 0.005),
+            ('cash balance matches collections', abs(cash_after - cash_before - collected - saved) < 0.005),
+            (f'no failed requests ({len(errors)})', not errors),
+        ]
+        print(f'{args.threads} threads x {args.posts} posts in {elapsed:.2f}s: '
+              f'{len(loan_rows)} loan and {len(saving_rows)} saving collections accepted')
+        for label, ok in checks:
+            print(f"  {'ok  ' if ok else 'FAIL'} {label}")
+
+        LoanCollection.query.filter_by(customer_id=customer_id).delete()
+        SavingCollection.query.filter_by(customer_id=customer_id).delete()
+        db.session.delete(member)
+        balances.cash_out(collected + saved)
+        db.session.commit()
+    return 0 if all(ok for label, ok in checks) else 1
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    os.environ['DATABASE_URL'] = args.database_url
+    logging.disable(logging.CRITICAL)
+    sys.exit(run(args))
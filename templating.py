@@ -0,0 +1,97 @@
+"""Template compilation caching and fragment caching.
+
+Compiled templates are kept as bytecode in TEMPLATE_CACHE_DIR so a fresh
+worker does not parse and compile them again, and every template is loaded
+when the app is created - with ``preload_app`` in gunicorn_config.py that
+happens once in the master, before the workers fork.
+
+Expensive partials are wrapped in a cached fragment inside the template,
+keyed by whatever the output depends on (normally the row id and its
+``updated_date``)::
+
+    {% call cache_fragment('customer-row', customer.id, customer.updated_date) %}
+      <tr>...</tr>
+    {% endcall %}
+
+The fragment cache is an in-process LRU of FRAGMENT_CACHE_SIZE entries per
+worker; set it to 0 to turn fragment caching off.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+
+class FragmentCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def warm_templates(app):
+    """Load (and so compile) every template. Returns the number loaded."""
+    started = time.time()
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        try:
+            app.jinja_env.get_template(name)
+        except Exception as e:
+            logging.warning(f'Template {name} failed to compile: {e}')
+    logging.info(f'Warmed {len(names)} templates in {(time.time() - started) * 1000:.0f}ms')
+    return len(names)
+
+
+def init_templates(app):
+    directory = app.config.get('TEMPLATE_CACHE_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+    size = app.config.get('FRAGMENT_CACHE_SIZE', 0)
+    cache = FragmentCache(size) if size else None
+    app.extensions['fragment_cache'] = cache
+
+    def cache_fragment(name, *key, caller):
+        if cache is None:
+            return caller()
+        full_key = (name,) + key
+        html = cache.get(full_key)
+        if html is None:
+            html = Markup(caller())
+            cache.set(full_key, html)
+        return html
+
+    app.jinja_env.globals['cache_fragment'] = cache_fragment
+    warm_templates(app)
+    return cache
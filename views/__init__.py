@@ -0,0 +1,17 @@
+"""The HTML pages, one blueprint per area:
+
+* ``main`` - login, logout and the dashboards
+* ``collections`` - members, loans and the staff's collections
+* ``reports`` - the admin reports
+* ``admin`` - staff, cash, expenses, withdrawals, branches, import
+* ``messages`` - admin to staff messages
+
+Endpoints are named ``<area>.<view>``, e.g. ``url_for('collections.collect_loan')``.
+"""
+
+
+def init_views(app):
+    from views import admin, collections, main, messages, reports
+
+    for module in (main, collections, reports, admin, messages):
+        app.register_blueprint(module.bp)
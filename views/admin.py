@@ -0,0 +1,340 @@
+"""Admin pages: staff, cash balance, expenses, withdrawals, branches, data
+import and the slow-query log."""
+import time
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+import balances
+from admission import request_class
+import branches
+import ledger
+import queries
+import slow_queries
+from extensions import bcrypt
+from models.user_model import db, User
+from models.customer_model import Customer
+from models.loan_collection_model import LoanCollection
+from models.saving_collection_model import SavingCollection
+from models.cash_balance_model import CashBalance
+from models.investment_model import Investment
+from models.withdrawal_model import Withdrawal
+from models.expense_model import Expense
+
+bp = Blueprint('admin', __name__)
+
+
+@bp.route('/admin/staffs')
+@login_required
+def manage_staff():
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    staffs = User.query.filter_by(role='staff').all()
+    return render_template('manage_staff.html', staffs=staffs)
+
+
+@bp.route('/admin/staff/add', methods=['GET', 'POST'])
+@login_required
+def add_staff():
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    if request.method == 'POST':
+        try:
+            name = request.form['name']
+            email = request.form['email']
+            password = request.form['password']
+            
+            if User.query.filter_by(email=email).first():
+                flash('Email already exists!', 'danger')
+                return redirect(url_for('admin.add_staff'))
+            
+            hashed_pw = bcrypt.generate_password_hash(password).decode('utf-8')
+            new_staff = User(name=name, email=email, password=hashed_pw, role='staff')
+            db.session.add(new_staff)
+            db.session.commit()
+            flash('Staff added successfully!', 'success')
+            return redirect(url_for('admin.manage_staff'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error: {str(e)}', 'danger')
+            return redirect(url_for('admin.add_staff'))
+    
+    return render_template('add_staff.html')
+
+
+@bp.route('/cash_balance', methods=['GET', 'POST'])
+@login_required
+def manage_cash_balance():
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    if request.method == 'POST':
+        try:
+            action = request.form['action']
+            amount = float(request.form['amount'])
+            
+            if action == 'add':
+                investor_name = request.form.get('investor_name', '')
+                note = request.form.get('note', '')
+                
+                investment = Investment(
+                    investor_name=investor_name,
+                    amount=amount,
+                    note=note
+                )
+                balances.cash_in(amount)
+                db.session.add(investment)
+                ledger.record(investment)
+                flash(f'৳{amount} যোগ করা হয়েছে!', 'success')
+            elif action == 'withdraw':
+                investor_name = request.form.get('investor_name', '')
+                note = request.form.get('note', '')
+                
+                balances.cash_out(amount)
+                withdrawal = Withdrawal(
+                    investor_name=investor_name,
+                    amount=amount,
+                    note=note
+                )
+                db.session.add(withdrawal)
+                ledger.record(withdrawal)
+                flash(f'৳{amount} Withdrawal সফল হয়েছে!', 'success')
+            
+            db.session.commit()
+            return redirect(url_for('admin.manage_cash_balance'))
+        except balances.InsufficientBalance:
+            db.session.rollback()
+            flash('পর্যাপ্ত টাকা নেই!', 'danger')
+            return redirect(url_for('admin.manage_cash_balance'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error: {str(e)}', 'danger')
+            return redirect(url_for('admin.manage_cash_balance'))
+    
+    cash_balance_record = CashBalance.query.first()
+    cash_balance = cash_balance_record.balance if cash_balance_record else 0
+    since, until = queries.date_range(request.args)
+    investments = queries.investments(since, until)
+    withdrawals = queries.withdrawals(since=since, until=until)
+    invested = queries.totals_by(investments, Investment, Investment.investor_name)
+    withdrawn = queries.totals_by(withdrawals, Withdrawal, Withdrawal.investor_name)
+    total_investment = sum(total for count, total in invested.values())
+    total_withdrawal = sum(total for count, total in withdrawn.values())
+    by_investor = [{'investor_name': name, 'invested': invested.get(name, (0, 0.0))[1], 'withdrawn': withdrawn.get(name, (0, 0.0))[1]}
+                   for name in sorted(set(invested) | set(withdrawn), key=lambda n: n or '') if name]
+    investments = queries.page(investments, Investment.date.desc(), Investment.id.desc(), arg='investment_page')
+    withdrawals = queries.page(withdrawals, Withdrawal.date.desc(), Withdrawal.id.desc(), arg='withdrawal_page')
+    return render_template('manage_cash_balance.html', cash_balance=cash_balance, investments=investments, withdrawals=withdrawals, total_investment=total_investment, total_withdrawal=total_withdrawal, by_investor=by_investor, from_date=request.args.get('from_date', ''), to_date=request.args.get('to_date', ''))
+
+
+@bp.route('/expenses', methods=['GET', 'POST'])
+@login_required
+def manage_expenses():
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    if request.method == 'POST':
+        try:
+            category = request.form['category']
+            amount = float(request.form['amount'])
+            description = request.form.get('description', '')
+            
+            balances.cash_out(amount)
+            expense = Expense(
+                category=category,
+                amount=amount,
+                description=description
+            )
+            db.session.add(expense)
+            ledger.record(expense)
+            db.session.commit()
+            flash(f'{category} - ৳{amount} ব্যয় সফল হয়েছে!', 'success')
+            
+            return redirect(url_for('admin.manage_expenses'))
+        except balances.InsufficientBalance:
+            db.session.rollback()
+            flash('পর্যাপ্ত টাকা নেই!', 'danger')
+            return redirect(url_for('admin.manage_expenses'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error: {str(e)}', 'danger')
+            return redirect(url_for('admin.manage_expenses'))
+    
+    since, until = queries.date_range(request.args)
+    expenses = queries.expenses(since, until)
+    by_category = {category: total for category, (count, total) in queries.totals_by(expenses, Expense, Expense.category).items()}
+    total_expenses = sum(by_category.values())
+    expenses = queries.page(expenses, Expense.date.desc(), Expense.id.desc())
+    
+    cash_balance_record = CashBalance.query.first()
+    cash_balance = cash_balance_record.balance if cash_balance_record else 0
+    
+    return render_template('manage_expenses.html', expenses=expenses, total_expenses=total_expenses, cash_balance=cash_balance, salary_total=by_category.get('Salary', 0), office_total=by_category.get('Office', 0), transport_total=by_category.get('Transport', 0), from_date=request.args.get('from_date', ''), to_date=request.args.get('to_date', ''))
+
+
+@bp.route('/manage_withdrawals', methods=['GET', 'POST'])
+@login_required
+def manage_withdrawals():
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    if request.method == 'POST':
+        withdrawal_type = request.form.get('withdrawal_type')
+        note = request.form.get('note', '')
+        try:
+            amount = float(request.form['amount'])
+            customer_id = int(request.form['customer_id']) if withdrawal_type == 'savings' else None
+        except (KeyError, ValueError):
+            flash('সঠিক তথ্য দিন!', 'danger')
+            return redirect(url_for('admin.manage_withdrawals'))
+        if amount <= 0:
+            flash('টাকার পরিমাণ ০ এর বেশি হতে হবে!', 'danger')
+            return redirect(url_for('admin.manage_withdrawals'))
+        if withdrawal_type == 'savings' and db.session.get(Customer, customer_id) is None:
+            flash('গ্রাহক পাওয়া যায়নি!', 'danger')
+            return redirect(url_for('admin.manage_withdrawals'))
+
+        try:
+            if withdrawal_type == 'savings':
+                balances.withdraw_savings(customer_id, amount)
+                withdrawal = Withdrawal(customer_id=customer_id, amount=amount, note=note, withdrawal_type='savings')
+            else:
+                withdrawal = Withdrawal(investor_name=request.form.get('investor_name', ''), amount=amount, note=note,
+                                        withdrawal_type='investment')
+            balances.cash_out(amount)
+        except balances.InsufficientBalance as e:
+            db.session.rollback()
+            flash(f'পর্যাপ্ত টাকা নেই! {e}', 'danger')
+            return redirect(url_for('admin.manage_withdrawals'))
+        db.session.add(withdrawal)
+        ledger.record(withdrawal)
+        db.session.commit()
+        flash(f'৳{amount} Withdrawal সফল হয়েছে!', 'success')
+        return redirect(url_for('admin.manage_withdrawals'))
+    
+    withdrawals = Withdrawal.query.order_by(Withdrawal.date.desc()).all()
+    customers = Customer.query.all()
+    cash_balance_record = CashBalance.query.first()
+    cash_balance = cash_balance_record.balance if cash_balance_record else 0
+    total_withdrawal = sum(w.amount for w in withdrawals)
+    savings_withdrawal = sum(w.amount for w in withdrawals if w.withdrawal_type == 'savings')
+    investment_withdrawal = sum(w.amount for w in withdrawals if w.withdrawal_type == 'investment')
+    return render_template('manage_withdrawals.html', withdrawals=withdrawals, customers=customers, cash_balance=cash_balance, total_withdrawal=total_withdrawal, savings_withdrawal=savings_withdrawal, investment_withdrawal=investment_withdrawal)
+
+
+@bp.route('/admin/branches')
+@request_class('heavy')
+@login_required
+def branch_report():
+    if current_user.role != 'admin' or current_user.branch_id is not None:
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    started = time.perf_counter()
+    results = branches.fan_out(branches.branch_summary)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return render_template('branches.html', results=results, total=branches.merge(results), elapsed_ms=elapsed_ms)
+
+
+@bp.route('/admin/slow_queries', methods=['GET', 'POST'])
+@login_required
+def slow_query_log():
+    if current_user.role != 'admin' or current_user.branch_id is not None:
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    if request.method == 'POST':
+        slow_queries.clear()
+        flash('Slow-query log cleared.', 'success')
+        return redirect(url_for('admin.slow_query_log'))
+    limit = request.args.get('limit', 100, type=int)
+    return render_template('slow_queries.html', entries=slow_queries.entries(limit), limit=limit,
+                           threshold_ms=current_app.config.get('SLOW_QUERY_MS', 0))
+
+
+@bp.route('/admin/import', methods=['GET', 'POST'])
+@request_class('heavy')
+@login_required
+def import_data():
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    import importer  # numpy and openpyxl are only needed here
+    result = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('ফাইল নির্বাচন করুন!', 'danger')
+            return redirect(url_for('admin.import_data'))
+        try:
+            result = importer.import_file(request.form['kind'], upload.stream, upload.filename,
+                                          dry_run=bool(request.form.get('dry_run')),
+                                          skip_invalid=bool(request.form.get('skip_invalid')),
+                                          update_balances=not request.form.get('no_balances'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error: {str(e)}', 'danger')
+    return render_template('import_data.html', kinds=importer.KINDS, result=result)
+
+
+@bp.route('/admin/staff/edit/<int:id>', methods=['GET', 'POST'])
+@login_required
+def edit_staff(id):
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    staff = User.query.get_or_404(id)
+    if staff.role != 'staff':
+        flash('Invalid staff!', 'danger')
+        return redirect(url_for('admin.manage_staff'))
+    
+    if request.method == 'POST':
+        try:
+            staff.name = request.form['name']
+            staff.email = request.form['email']
+            
+            if request.form.get('password'):
+                staff.password = bcrypt.generate_password_hash(request.form['password']).decode('utf-8')
+            
+            db.session.commit()
+            flash('Staff updated successfully!', 'success')
+            return redirect(url_for('admin.manage_staff'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error: {str(e)}', 'danger')
+            return redirect(url_for('admin.edit_staff', id=id))
+    
+    return render_template('edit_staff.html', staff=staff)
+
+
+@bp.route('/admin/staff/delete/<int:id>')
+@login_required
+def delete_staff(id):
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    try:
+        staff = User.query.get_or_404(id)
+        if staff.role != 'staff':
+            flash('Invalid staff!', 'danger')
+            return redirect(url_for('admin.manage_staff'))
+        
+        LoanCollection.query.filter_by(staff_id=id).update({'staff_id': None})
+        SavingCollection.query.filter_by(staff_id=id).update({'staff_id': None})
+        Customer.query.filter_by(staff_id=id).update({'staff_id': None})
+        
+        db.session.delete(staff)
+        db.session.commit()
+        flash('Staff deleted successfully!', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error: {str(e)}', 'danger')
+    return redirect(url_for('admin.manage_staff'))
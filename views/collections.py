@@ -0,0 +1,511 @@
+"""Members, loans and the field staff's loan and saving collections."""
+from datetime import datetime
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+import balances
+import ledger
+import queries
+from admission import request_class
+from archive import archived_collections, collection_summary
+from http_cache import conditional
+from installments import apply_payment, create_schedule, due_list
+from replica import reads_from_replica
+from models.user_model import db, User
+from models.customer_model import Customer
+from models.loan_model import Loan
+from models.loan_collection_model import LoanCollection
+from models.saving_collection_model import SavingCollection
+from models.cash_balance_model import CashBalance
+
+bp = Blueprint('collections', __name__)
+
+
+@bp.route('/loan_collection/collect', methods=['POST'])
+@login_required
+def collect_loan():
+    print("\n" + "="*50)
+    print("LOAN COLLECTION DEBUG")
+    print("="*50)
+    print(f"All form data: {dict(request.form)}")
+    print(f"Form keys: {list(request.form.keys())}")
+    
+    customer_id = request.form.get('customer_id')
+    amount = request.form.get('amount')
+    
+    print(f"customer_id value: '{customer_id}' (type: {type(customer_id)})")
+    print(f"amount value: '{amount}' (type: {type(amount)})")
+    print("="*50 + "\n")
+    
+    if not customer_id:
+        print("ERROR: customer_id is empty")
+        flash('গ্রাহক নির্বাচন করুন!', 'danger')
+        return redirect(url_for('collections.loan_collection'))
+    
+    if not amount:
+        print("ERROR: amount is empty")
+        flash('টাকার পরিমাণ দিন!', 'danger')
+        return redirect(url_for('collections.loan_collection'))
+    
+    try:
+        customer_id = int(customer_id)
+        amount = float(amount)
+        print(f"Converted - customer_id: {customer_id}, amount: {amount}")
+    except Exception as e:
+        print(f"ERROR converting: {e}")
+        flash('সঠিক তথ্য দিন!', 'danger')
+        return redirect(url_for('collections.loan_collection'))
+    
+    if amount <= 0:
+        flash('টাকার পরিমাণ ০ এর বেশি হতে হবে!', 'danger')
+        return redirect(url_for('collections.loan_collection'))
+    
+    customer = Customer.query.get(customer_id)
+    if not customer:
+        flash('গ্রাহক পাওয়া যায়নি!', 'danger')
+        return redirect(url_for('collections.loan_collection'))
+    
+    if customer.remaining_loan <= 0:
+        flash(f'{customer.name} এর কোনো বকেয়া লোন নেই!', 'warning')
+        return redirect(url_for('collections.loan_collection'))
+    
+    if amount > customer.remaining_loan:
+        flash(f'টাকা বাকি লোন থেকে বেশি!', 'danger')
+        return redirect(url_for('collections.loan_collection'))
+    
+    try:
+        collection = LoanCollection(customer_id=customer_id, amount=amount, staff_id=current_user.id)
+        balances.repay_loan(customer_id, amount)
+        balances.cash_in(amount)
+        
+        db.session.add(collection)
+        ledger.record(collection)
+        apply_payment(customer_id, amount)
+        db.session.commit()
+        print(f"SUCCESS: Collection saved - Customer: {customer.name}, Amount: {amount}")
+        flash(f'সফলভাবে ৳{amount} কালেকশন সম্পন্ন!', 'success')
+    except balances.InsufficientBalance:
+        # another collection for this member was posted in the meantime
+        db.session.rollback()
+        flash(f'টাকা বাকি লোন থেকে বেশি!', 'danger')
+    except Exception as e:
+        print(f"ERROR saving: {e}")
+        db.session.rollback()
+        flash(f'এরর: {str(e)}', 'danger')
+    
+    return redirect(url_for('collections.loan_collection'))
+
+
+@bp.route('/saving_collection/collect', methods=['POST'])
+@login_required
+def collect_saving():
+    customer_id = request.form.get('customer_id')
+    amount = request.form.get('amount')
+    
+    if not customer_id:
+        flash('গ্রাহক নির্বাচন করুন!', 'danger')
+        return redirect(url_for('collections.saving_collection'))
+    
+    if not amount:
+        flash('টাকার পরিমাণ দিন!', 'danger')
+        return redirect(url_for('collections.saving_collection'))
+    
+    try:
+        customer_id = int(customer_id)
+        amount = float(amount)
+    except:
+        flash('সঠিক তথ্য দিন!', 'danger')
+        return redirect(url_for('collections.saving_collection'))
+    
+    if amount <= 0:
+        flash('টাকার পরিমাণ ০ এর বেশি হতে হবে!', 'danger')
+        return redirect(url_for('collections.saving_collection'))
+    
+    customer = Customer.query.get(customer_id)
+    if not customer:
+        flash('গ্রাহক পাওয়া যায়নি!', 'danger')
+        return redirect(url_for('collections.saving_collection'))
+    
+    try:
+        collection = SavingCollection(customer_id=customer_id, amount=amount, staff_id=current_user.id)
+        balances.deposit_savings(customer_id, amount)
+        balances.cash_in(amount)
+        
+        db.session.add(collection)
+        ledger.record(collection)
+        db.session.commit()
+        flash(f'সফলভাবে ৳{amount} সেভিংস জমা!', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'এরর: {str(e)}', 'danger')
+    
+    return redirect(url_for('collections.saving_collection'))
+
+
+@bp.route('/loans')
+@login_required
+@reads_from_replica
+@conditional(Loan, User)
+def manage_loans():
+    loans = queries.loans(current_user).all()
+    staffs = User.query.filter_by(role='staff').all()
+    total_amount = sum(loan.amount for loan in loans)
+    period = request.args.get('period', 'all')
+    return render_template('manage_loans.html', loans=loans, staffs=staffs, total_amount=total_amount, period=period)
+
+
+@bp.route('/loan/add', methods=['GET', 'POST'])
+@login_required
+def add_loan():
+    if current_user.role != 'admin':
+        flash('শুধুমাত্র Admin লোন দিতে পারবে!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    if request.method == 'POST':
+        try:
+            customer_id = int(request.form['customer_id'])
+            amount = float(request.form['amount'])
+            interest_rate = float(request.form['interest'])
+            customer = Customer.query.get_or_404(customer_id)
+            
+            interest_amount = (amount * interest_rate) / 100
+            service_charge = float(request.form.get('service_charge', 0))
+            total_with_interest = amount + interest_amount
+            loan_date = request.form.get('loan_date')
+            
+            loan = Loan(
+                customer_id=customer.id,
+                customer_name=customer.name,
+                amount=amount,
+                interest=interest_rate,
+                loan_date=datetime.strptime(loan_date, '%Y-%m-%d') if loan_date else datetime.now(),
+                due_date=datetime.strptime(request.form['due_date'], '%Y-%m-%d'),
+                installment_count=int(request.form.get('installment_count') or 0),
+                installment_amount=float(request.form.get('installment_amount') or 0),
+                installment_type=request.form.get('installment_type') or None,
+                service_charge=service_charge,
+                staff_id=customer.staff_id
+            )
+            
+            balances.cash_out(amount)
+            balances.cash_in(service_charge)
+            balances.disburse_loan(customer.id, total_with_interest)
+            
+            db.session.add(loan)
+            ledger.record(loan)
+            create_schedule(loan, total_with_interest)
+            db.session.commit()
+            flash(f'ঋণ যোগ সফল! পরিমাণ: ৳{amount}, সুদ: ৳{interest_amount}, মোট: ৳{total_with_interest}', 'success')
+            return redirect(url_for('collections.manage_loans'))
+        except balances.InsufficientBalance as e:
+            db.session.rollback()
+            flash(f'পর্যাপ্ত টাকা নেই! বর্তমান ব্যালেন্স: ৳{e.available}', 'danger')
+            return redirect(url_for('collections.add_loan'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error: {str(e)}', 'danger')
+            return redirect(url_for('collections.add_loan'))
+    
+    cash_balance_record = CashBalance.query.first()
+    cash_balance = cash_balance_record.balance if cash_balance_record else 0
+    customers = Customer.query.all()
+    return render_template('add_loan.html', customers=customers, cash_balance=cash_balance)
+
+
+@bp.route('/loan_collection', methods=['GET'])
+@login_required
+def loan_collection():
+    customers = queries.customers(current_user, outstanding=True).all()
+    return render_template('loan_collection.html', customers=customers)
+
+
+@bp.route('/due_today')
+@login_required
+def due_today():
+    from datetime import date
+    selected_date_str = request.args.get('date')
+    selected_date = datetime.strptime(selected_date_str, '%Y-%m-%d').date() if selected_date_str else date.today()
+    
+    if current_user.role == 'staff':
+        staff_id = current_user.id
+    else:
+        staff_id = request.args.get('staff_id', type=int)
+    
+    entries = due_list(staff_id, selected_date) if staff_id else []
+    total_due = sum(e.amount_due for e in entries)
+    total_paid = sum(e.paid_amount or 0 for e in entries)
+    staffs = User.query.filter_by(role='staff').all() if current_user.role == 'admin' else []
+    return render_template('due_today.html', entries=entries, total_due=total_due, total_paid=total_paid, staffs=staffs, staff_id=staff_id, selected_date=selected_date.strftime('%Y-%m-%d'))
+
+
+@bp.route('/loan_collections_history')
+@request_class('heavy')
+@login_required
+@reads_from_replica
+@conditional(LoanCollection, Customer, User)
+def loan_collections_history():
+    staff_filter = request.args.get('staff_id', type=int)
+    customer_filter = request.args.get('customer', '')
+    
+    if current_user.role == 'staff':
+        query = LoanCollection.query.filter_by(staff_id=current_user.id)
+        total = db.session.query(db.func.sum(LoanCollection.amount)).filter_by(staff_id=current_user.id).scalar() or 0
+    else:
+        query = LoanCollection.query
+        if staff_filter:
+            query = query.filter_by(staff_id=staff_filter)
+        total = db.session.query(db.func.sum(LoanCollection.amount)).scalar() or 0
+    
+    if customer_filter:
+        query = query.join(Customer).filter(Customer.name.contains(customer_filter))
+    
+    loan_collections = query.order_by(LoanCollection.collection_date.desc()).all()
+    staffs = User.query.filter_by(role='staff').all()
+    return render_template('loan_collections_history.html', loan_collections=loan_collections, staffs=staffs, total=total)
+
+
+@bp.route('/saving_collection', methods=['GET'])
+@login_required
+def saving_collection():
+    if current_user.role == 'staff':
+        customers = Customer.query.filter_by(staff_id=current_user.id).all()
+    else:
+        customers = Customer.query.all()
+    return render_template('saving_collection.html', customers=customers)
+
+
+@bp.route('/savings')
+@request_class('heavy')
+@login_required
+@reads_from_replica
+@conditional(SavingCollection, Customer, User)
+def manage_savings():
+    query = SavingCollection.query
+    if current_user.role == 'staff':
+        query = query.filter_by(staff_id=current_user.id)
+    savings = query.all()
+    staffs = User.query.filter_by(role='staff').all()
+    total = db.session.query(db.func.sum(SavingCollection.amount)).scalar() or 0
+    return render_template('manage_savings.html', savings=savings, staffs=staffs, total=total)
+
+
+@bp.route('/daily_collections')
+@login_required
+def daily_collections():
+    from datetime import date
+    today_date = date.today()
+    
+    if current_user.role == 'staff':
+        all_loan = LoanCollection.query.filter_by(staff_id=current_user.id).all()
+        all_saving = SavingCollection.query.filter_by(staff_id=current_user.id).all()
+        
+        loan_collections = [lc for lc in all_loan if lc.collection_date.date() == today_date]
+        saving_collections = [sc for sc in all_saving if sc.collection_date.date() == today_date]
+    else:
+        all_loan = LoanCollection.query.all()
+        all_saving = SavingCollection.query.all()
+        
+        loan_collections = [lc for lc in all_loan if lc.collection_date.date() == today_date]
+        saving_collections = [sc for sc in all_saving if sc.collection_date.date() == today_date]
+    
+    total_loan = sum(lc.amount for lc in loan_collections)
+    total_saving = sum(sc.amount for sc in saving_collections)
+    
+    return render_template('daily_collections.html', loan_collections=loan_collections, saving_collections=saving_collections, total_loan=total_loan, total_saving=total_saving)
+
+
+@bp.route('/customers')
+@login_required
+@reads_from_replica
+@conditional(Customer, User)
+def manage_customers():
+    customers = queries.customers(current_user).options(db.joinedload(Customer.staff)).all()
+    return render_template('manage_customers.html', customers=customers)
+
+
+@bp.route('/loan_customers')
+@login_required
+@reads_from_replica
+@conditional(Customer, User)
+def loan_customers():
+    customers = queries.customers(current_user, with_loan=True).options(db.joinedload(Customer.staff)).all()
+    return render_template('loan_customers.html', customers=customers)
+
+
+@bp.route('/customer_details/<int:id>')
+@login_required
+def customer_details(id):
+    customer = Customer.query.get_or_404(id)
+    
+    if current_user.role == 'staff' and customer.staff_id != current_user.id:
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    since, until = queries.date_range(request.args)
+    timeline, totals, opening = queries.member_timeline(customer, since, until)
+    rows = queries.page(timeline)
+    
+    summary = collection_summary(id)
+    show_archived = request.args.get('archived') == '1'
+    archived_loan, archived_saving = archived_collections(id) if summary and show_archived else ([], [])
+    
+    total_collected = totals.get('loan_collection', (0, 0.0))[1]
+    if summary:
+        total_collected += summary.archived_loan_total or 0
+    total_withdrawn = totals.get('withdrawal', (0, 0.0))[1]
+    
+    return render_template('customer_details.html', customer=customer, rows=rows, totals=totals, opening=opening, total_collected=total_collected, total_withdrawn=total_withdrawn, summary=summary, show_archived=show_archived, archived_loan=archived_loan, archived_saving=archived_saving, from_date=request.args.get('from_date', ''), to_date=request.args.get('to_date', ''))
+
+
+@bp.route('/customer/add', methods=['GET', 'POST'])
+@login_required
+def add_customer():
+    if request.method == 'POST':
+        try:
+            admission_fee = float(request.form.get('admission_fee', 0))
+            balances.cash_in(admission_fee)
+            
+            customer = Customer(
+                name=request.form['name'],
+                member_no=request.form.get('member_no', ''),
+                phone=request.form['phone'],
+                father_husband=request.form.get('father_husband', ''),
+                village=request.form.get('village', ''),
+                post=request.form.get('post', ''),
+                thana=request.form.get('thana', ''),
+                district=request.form.get('district', ''),
+                granter=request.form.get('granter', ''),
+                profession=request.form.get('profession', ''),
+                nid_no=request.form.get('nid_no', ''),
+                admission_fee=admission_fee,
+                address=request.form.get('address', ''),
+                staff_id=current_user.id
+            )
+            db.session.add(customer)
+            ledger.record(customer)
+            db.session.commit()
+            flash(f'সদস্য সফলভাবে যোগ হয়েছে! ভর্তি ফি: ৳{admission_fee}', 'success')
+            return redirect(url_for('collections.manage_customers'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error: {str(e)}', 'danger')
+            return redirect(url_for('collections.add_customer'))
+    return render_template('add_customer.html')
+
+
+@bp.route('/customer_details_print/<int:id>')
+@request_class('heavy')
+@login_required
+def customer_details_print(id):
+    customer = Customer.query.get_or_404(id)
+    since, until = queries.date_range(request.args)
+    timeline, totals, opening = queries.member_timeline(customer, since, until)
+    rows = queries.page(timeline)
+    summary = collection_summary(id)
+    total_loan_collected = totals.get('loan_collection', (0, 0.0))[1]
+    total_saving_collected = totals.get('saving_collection', (0, 0.0))[1]
+    if summary:
+        total_loan_collected += summary.archived_loan_total or 0
+        total_saving_collected += summary.archived_saving_total or 0
+    total_withdrawn = totals.get('withdrawal', (0, 0.0))[1]
+    return render_template('customer_details_print.html', customer=customer, rows=rows, totals=totals, opening=opening, total_loan_collected=total_loan_collected, total_saving_collected=total_saving_collected, total_withdrawn=total_withdrawn)
+
+
+@bp.route('/loan/edit/<int:id>', methods=['GET', 'POST'])
+@login_required
+def edit_loan(id):
+    loan = Loan.query.get_or_404(id)
+    
+    if request.method == 'POST':
+        try:
+            loan.customer_name = request.form['customer_name']
+            loan.amount = float(request.form['amount'])
+            loan.interest = float(request.form['interest'])
+            loan.due_date = datetime.strptime(request.form['due_date'], '%Y-%m-%d')
+            db.session.commit()
+            flash('Loan updated successfully!', 'success')
+            return redirect(url_for('collections.manage_loans'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error: {str(e)}', 'danger')
+            return redirect(url_for('collections.edit_loan', id=id))
+    
+    return render_template('edit_loan.html', loan=loan)
+
+
+@bp.route('/collection', methods=['GET', 'POST'])
+@login_required
+def collection():
+    if request.method == 'POST':
+        try:
+            if not request.form.get('customer_id'):
+                flash('সব তথ্য পূরণ করুন!', 'danger')
+                return redirect(url_for('collections.collection'))
+            
+            customer_id = int(request.form['customer_id'])
+            loan_amount = float(request.form.get('loan_amount') or 0)
+            saving_amount = float(request.form.get('saving_amount') or 0)
+            
+            if loan_amount <= 0 and saving_amount <= 0:
+                flash('লোন অথবা সেভিংস কালেকশন পরিমাণ দিন!', 'danger')
+                return redirect(url_for('collections.collection'))
+            
+            customer = Customer.query.get_or_404(customer_id)
+            total_collected = 0
+            
+            if loan_amount > 0:
+                try:
+                    balances.repay_loan(customer_id, loan_amount)
+                except balances.InsufficientBalance as e:
+                    db.session.rollback()
+                    flash(f'লোন কালেকশন বাকি লোন (৳{e.available}) থেকে বেশি হতে পারবে না!', 'danger')
+                    return redirect(url_for('collections.collection'))
+                
+                loan_collection = LoanCollection(
+                    customer_id=customer_id,
+                    amount=loan_amount,
+                    staff_id=current_user.id
+                )
+                db.session.add(loan_collection)
+                ledger.record(loan_collection)
+                apply_payment(customer_id, loan_amount)
+                total_collected += loan_amount
+            
+            if saving_amount > 0:
+                saving_collection = SavingCollection(
+                    customer_id=customer_id,
+                    amount=saving_amount,
+                    staff_id=current_user.id
+                )
+                balances.deposit_savings(customer_id, saving_amount)
+                db.session.add(saving_collection)
+                ledger.record(saving_collection)
+                total_collected += saving_amount
+            
+            balances.cash_in(total_collected)
+            
+            db.session.commit()
+            flash(f'সফলভাবে কালেকশন সম্পন্ন হয়েছে! মোট: ৳{total_collected}', 'success')
+            return redirect(url_for('collections.collection'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error: {str(e)}', 'danger')
+            return redirect(url_for('collections.collection'))
+    
+    if current_user.role == 'staff':
+        customers = Customer.query.filter_by(staff_id=current_user.id).all()
+    else:
+        customers = Customer.query.all()
+    return render_template('collection.html', customers=customers)
+
+
+@bp.route('/manage_collections')
+@request_class('heavy')
+@login_required
+@reads_from_replica
+@conditional(LoanCollection, SavingCollection, Customer, User)
+def manage_collections():
+    loan_collections = queries.collections(LoanCollection, current_user).all()
+    saving_collections = queries.collections(SavingCollection, current_user).all()
+    return render_template('manage_collections.html', loan_collections=loan_collections, saving_collections=saving_collections)
@@ -0,0 +1,92 @@
+"""Login, logout and the dashboards."""
+from datetime import datetime
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required, login_user, logout_user
+
+import branches
+import messaging
+from extensions import bcrypt
+from models.user_model import db, User
+from models.customer_model import Customer
+from models.loan_model import Loan
+from models.loan_collection_model import LoanCollection
+from models.saving_collection_model import SavingCollection
+from models.cash_balance_model import CashBalance
+
+bp = Blueprint('main', __name__)
+
+
+@bp.route('/')
+def home():
+    return redirect(url_for('main.login'))
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        email = request.form['email']
+        password = request.form['password']
+
+        user = User.query.filter_by(email=email).first()
+        if user and bcrypt.check_password_hash(user.password, password):
+            login_user(user)
+            flash('Login Successful!', 'success')
+            return redirect(url_for('main.dashboard'))
+        else:
+            flash('Invalid email or password', 'danger')
+
+    return render_template('login.html')
+
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    if current_user.role == 'admin':
+        staff_count = User.query.filter_by(role='staff').count()
+        totals = _admin_totals()
+        if current_user.branch_id is None:  # head office: add the branches the main database does not hold
+            totals = branches.merge([(None, totals)] + branches.fan_out(_admin_totals, branches.separate_storage()))
+        total_loans, pending_loans = totals['total_loans'], totals['pending_loans']
+        total_savings, total_customers = totals['total_savings'], totals['total_customers']
+        cash_balance = totals['cash_balance']
+        
+        period = request.args.get('period', 'all')
+        fee_period = request.args.get('fee_period', 'all')
+        
+        total_fees = totals['admission_fees'] + totals['service_charges']
+        
+        return render_template('admin_dashboard.html', name=current_user.name, staff_count=staff_count, total_loans=total_loans, pending_loans=pending_loans, total_savings=total_savings, total_customers=total_customers, cash_balance=cash_balance, period=period, fee_period=fee_period, total_fees=total_fees)
+    elif current_user.role == 'staff':
+        my_customers = Customer.query.filter_by(staff_id=current_user.id).count()
+        total_remaining = db.session.query(db.func.sum(Customer.remaining_loan)).filter_by(staff_id=current_user.id).scalar() or 0
+        today = datetime.now().replace(hour=0, minute=0, second=0)
+        today_loan_collections = LoanCollection.query.filter_by(staff_id=current_user.id).filter(LoanCollection.collection_date >= today).count()
+        today_saving_collections = SavingCollection.query.filter_by(staff_id=current_user.id).filter(SavingCollection.collection_date >= today).count()
+        today_collections = today_loan_collections + today_saving_collections
+        unread_messages, latest_message_id = messaging.counter(current_user.id)
+        return render_template('staff_dashboard.html', name=current_user.name, my_customers=my_customers, total_remaining=total_remaining, today_collections=today_collections, unread_messages=unread_messages, latest_message_id=latest_message_id)
+    else:
+        flash('Invalid role!', 'danger')
+        return redirect(url_for('main.logout'))
+
+
+def _admin_totals(branch=None):
+    """The admin dashboard's totals in the current branch scope and storage."""
+    return {
+        'total_loans': db.session.query(db.func.sum(Customer.total_loan)).scalar() or 0,
+        'pending_loans': db.session.query(db.func.sum(Customer.remaining_loan)).scalar() or 0,
+        'total_savings': db.session.query(db.func.sum(Customer.savings_balance)).scalar() or 0,
+        'total_customers': Customer.query.count(),
+        'cash_balance': db.session.query(db.func.sum(CashBalance.balance)).scalar() or 0,
+        'admission_fees': db.session.query(db.func.sum(Customer.admission_fee)).scalar() or 0,
+        'service_charges': db.session.query(db.func.sum(Loan.service_charge)).scalar() or 0,
+    }
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('Logged out successfully.', 'info')
+    return redirect(url_for('main.login'))
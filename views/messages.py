@@ -0,0 +1,75 @@
+"""Admin to staff messages and the staff's unread-message long-poll."""
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+import messaging
+from admission import refused, request_class
+from models.user_model import db, User
+from models.message_model import Message
+
+bp = Blueprint('messages', __name__)
+
+
+@bp.route('/messages')
+@login_required
+def view_messages():
+    if current_user.role == 'staff':
+        messages = Message.query.filter_by(staff_id=current_user.id).order_by(Message.created_date.desc()).all()
+        unread_messages, latest_message_id = messaging.counter(current_user.id)
+        return render_template('staff_messages.html', messages=messages, unread_messages=unread_messages, latest_message_id=latest_message_id)
+    else:
+        staffs = User.query.filter_by(role='staff').all()
+        return render_template('admin_messages.html', staffs=staffs)
+
+
+@bp.route('/message/send', methods=['POST'])
+@login_required
+def send_message():
+    if current_user.role == 'admin':
+        try:
+            content = request.form['content']
+            if request.form['staff_id'] == 'all':
+                sent = messaging.broadcast(content)
+                flash(f'Message sent to {sent} staff!', 'success')
+            else:
+                messaging.send([int(request.form['staff_id'])], content)
+                flash('Message sent successfully!', 'success')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error: {str(e)}', 'danger')
+    return redirect(url_for('messages.view_messages'))
+
+
+@bp.route('/message/<int:id>/read', methods=['POST'])
+@login_required
+def mark_message_read(id):
+    messaging.mark_read(current_user.id, [id])
+    return redirect(url_for('messages.view_messages'))
+
+
+@bp.route('/messages/read_all', methods=['POST'])
+@login_required
+def mark_all_messages_read():
+    ids = request.form.getlist('message_id', type=int)
+    marked = messaging.mark_read(current_user.id, ids or None)
+    flash(f'{marked} message(s) marked as read', 'success')
+    return redirect(url_for('messages.view_messages'))
+
+
+@bp.route('/messages/poll')
+@request_class('poll', fallback=True)
+@login_required
+def poll_messages():
+    if current_user.role != 'staff':
+        return jsonify({'unread': 0, 'latest': 0, 'messages': []})
+    since = request.args.get('since', 0, type=int)
+    wait = current_app.config['MESSAGE_POLL_WAIT']
+    retry_after = refused()
+    if retry_after is not None:
+        # no long-poll slot free: check once and have the page poll again later
+        result = messaging.wait_for_messages(current_user.id, since, timeout=0)
+        result['retry_after'] = min(retry_after, wait)
+        return jsonify(result)
+    result = messaging.wait_for_messages(current_user.id, since, timeout=wait,
+                                         interval=current_app.config['MESSAGE_POLL_INTERVAL'])
+    return jsonify(result)
@@ -0,0 +1,256 @@
+"""Admin reports: collections, daily and monthly statements, profit and
+loss, withdrawals and arrears."""
+from datetime import datetime
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+from sqlalchemy import func, select
+
+import queries
+from admission import request_class
+from http_cache import conditional
+from projection import fetch, row_type, stream, total
+from replica import reads_from_replica
+from models.user_model import db, User
+from models.customer_model import Customer
+from models.loan_model import Loan
+from models.loan_collection_model import LoanCollection
+from models.saving_collection_model import SavingCollection
+from models.cash_balance_model import CashBalance
+from models.investment_model import Investment
+from models.withdrawal_model import Withdrawal
+from models.expense_model import Expense
+from models.arrears_model import ArrearsSnapshot
+
+bp = Blueprint('reports', __name__)
+
+CollectionRow = row_type('CollectionRow', 'amount collection_date customer_name staff_name')
+MemberRow = row_type('MemberRow', 'id member_no name')
+
+
+def _collection_rows(query, model):
+    """``query``'s collections as CollectionRows, with the member's and collector's names."""
+    query = (query.outerjoin(Customer, Customer.id == model.customer_id).outerjoin(User, User.id == model.staff_id)
+             .with_entities(model.amount, model.collection_date, Customer.name, User.name))
+    return fetch(query.statement, CollectionRow)
+
+
+@bp.route('/reports')
+@request_class('heavy')
+@login_required
+@reads_from_replica
+@conditional(LoanCollection, SavingCollection, Customer, User)
+def reports():
+    period = request.args.get('period', 'daily')
+    staff_id = request.args.get('staff_id', type=int)
+    
+    start_date = queries.period_start(period)
+    loan_collections = _collection_rows(queries.collections(LoanCollection, current_user, staff_id=staff_id, since=start_date), LoanCollection)
+    saving_collections = _collection_rows(queries.collections(SavingCollection, current_user, staff_id=staff_id, since=start_date), SavingCollection)
+    
+    total_loans = sum(l.amount for l in loan_collections)
+    total_savings = sum(s.amount for s in saving_collections)
+    total_payments = total_loans
+    
+    staffs = User.query.filter_by(role='staff').all()
+    
+    return render_template('reports.html', 
+                         loan_collections=loan_collections, saving_collections=saving_collections,
+                         total_loans=total_loans, total_savings=total_savings, 
+                         total_payments=total_payments, staffs=staffs, period=period)
+
+
+@bp.route('/daily_report')
+@request_class('heavy')
+@login_required
+@reads_from_replica
+@conditional(LoanCollection, SavingCollection, Customer, Loan, Expense, Withdrawal, Investment)
+def daily_report():
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    from datetime import date
+    selected_date_str = request.args.get('date')
+    if selected_date_str:
+        selected_date = datetime.strptime(selected_date_str, '%Y-%m-%d').date()
+    else:
+        selected_date = date.today()
+    
+    today_start = datetime.combine(selected_date, datetime.min.time())
+    today_end = datetime.combine(selected_date, datetime.max.time())
+    
+    by_member = {}
+    for key, model in (('loan', LoanCollection), ('saving', SavingCollection)):
+        by_member[key] = dict(stream(select(model.customer_id, func.sum(model.amount))
+                                     .where(model.collection_date >= today_start, model.collection_date <= today_end)
+                                     .group_by(model.customer_id)))
+    
+    total_installment = sum(by_member['loan'].values())
+    total_saving = sum(by_member['saving'].values())
+    
+    customers = stream(select(Customer.id, Customer.member_no, Customer.name).order_by(Customer.member_no), MemberRow)
+    collections = [{'customer': customer, 'loan_amount': by_member['loan'].get(customer.id, 0), 'saving_amount': by_member['saving'].get(customer.id, 0)}
+                   for customer in customers]
+    
+    total_welfare_fee = 0
+    total_admission_fee = 0
+    total_application_fee = 0
+    total_expense = 0
+    total_loan_distributed = 0
+    total_withdrawal = 0
+    total_outflow = 0
+    return render_template('daily_report.html', report_date=selected_date.strftime('%d-%m-%Y'), selected_date=selected_date.strftime('%Y-%m-%d'), total_installment=total_installment, total_saving=total_saving, collections=collections, total_welfare_fee=total_welfare_fee, total_admission_fee=total_admission_fee, total_application_fee=total_application_fee, total_expense=total_expense, total_loan_distributed=total_loan_distributed, total_withdrawal=total_withdrawal, total_outflow=total_outflow)
+
+
+@bp.route('/monthly_report')
+@request_class('heavy')
+@login_required
+@reads_from_replica
+@conditional(LoanCollection, SavingCollection, Customer, Loan, Expense, Investment, CashBalance)
+def monthly_report():
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    import calendar
+    today = datetime.now()
+    month = int(request.args.get('month', today.month))
+    year = int(request.args.get('year', today.year))
+    
+    available_years = list(range(2020, today.year + 2))
+    month_names = ['', 'জানুয়ারি', 'ফেব্রুয়ারি', 'মার্চ', 'এপ্রিল', 'মে', 'জুন', 'জুলাই', 'আগস্ট', 'সেপ্টেম্বর', 'অক্টোবর', 'নভেম্বর', 'ডিসেম্বর']
+    month_name = month_names[month]
+    last_day = calendar.monthrange(year, month)[1]
+    
+    month_start = datetime(year, month, 1)
+    month_end = datetime(year, month, last_day, 23, 59, 59)
+    
+    cash_balance_record = CashBalance.query.first()
+    opening_balance = cash_balance_record.balance if cash_balance_record else 0
+    
+    daily_data = {}
+    for day in range(1, last_day + 1):
+        daily_data[day] = {'installments': 0, 'savings': 0, 'capital_savings': 0, 'total_income': 0, 'total_expense': 0, 'balance': 0}
+    
+    # (model, date column, daily_data key): only the date and amount of each row are read
+    for model, column, key in ((Investment, Investment.date, 'capital_savings'),
+                               (LoanCollection, LoanCollection.collection_date, 'installments'),
+                               (SavingCollection, SavingCollection.collection_date, 'savings'),
+                               (Expense, Expense.date, 'total_expense')):
+        for when, amount in stream(select(column, model.amount).where(column >= month_start, column <= month_end)):
+            daily_data[when.day][key] += amount
+    
+    for day in range(1, last_day + 1):
+        daily_data[day]['total_income'] = daily_data[day]['installments'] + daily_data[day]['savings']
+        daily_data[day]['balance'] = daily_data[day]['total_income'] - daily_data[day]['total_expense']
+    
+    total_capital_savings = sum(d['capital_savings'] for d in daily_data.values())
+    total_loan_distributed = total(Loan.amount, Loan.loan_date >= month_start, Loan.loan_date <= month_end)
+    
+    total_monthly_expenses = sum(d['total_expense'] for d in daily_data.values())
+    cash_balance = cash_balance_record.balance if cash_balance_record else 0
+    total_interest = 0
+    prev_remaining = 0
+    current_remaining = total(Customer.remaining_loan)
+    
+    return render_template('monthly_report.html', month=month, month_name=month_name, year=year, available_years=available_years, daily_data=daily_data, last_day=last_day, opening_balance=opening_balance, total_capital_savings=total_capital_savings, total_loan_distributed=total_loan_distributed, total_monthly_expenses=total_monthly_expenses, cash_balance=cash_balance, total_interest=total_interest, prev_remaining=prev_remaining, current_remaining=current_remaining)
+
+
+@bp.route('/profit_loss')
+@request_class('heavy')
+@login_required
+@reads_from_replica
+@conditional(LoanCollection, SavingCollection, Customer, Loan, Expense, Withdrawal, Investment)
+def profit_loss():
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    period = request.args.get('period', 'monthly')
+    today = datetime.now()
+    
+    if period == 'monthly':
+        start_date = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    else:
+        start_date = today.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    
+    total_loan_collected = total(LoanCollection.amount, LoanCollection.collection_date >= start_date)
+    total_savings_collected = total(SavingCollection.amount, SavingCollection.collection_date >= start_date)
+    total_income = total_loan_collected + total_savings_collected
+    
+    total_expenses = total(Expense.amount, Expense.date >= start_date)
+    total_withdrawals = total(Withdrawal.amount, Withdrawal.date >= start_date)
+    total_loans_given = total(Loan.amount, Loan.loan_date >= start_date)
+    
+    net_profit = total_income - (total_expenses + total_withdrawals + total_loans_given)
+    
+    return render_template('profit_loss.html', period=period, total_income=total_income, total_loan_collected=total_loan_collected, total_savings_collected=total_savings_collected, total_expenses=total_expenses, total_withdrawals=total_withdrawals, total_loans_given=total_loans_given, net_profit=net_profit)
+
+
+@bp.route('/withdrawal_report')
+@request_class('heavy')
+@login_required
+@reads_from_replica
+@conditional(Withdrawal, Customer)
+def withdrawal_report():
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    from_date = request.args.get('from_date', '')
+    to_date = request.args.get('to_date', '')
+    since, until = queries.date_range(request.args)
+    withdrawals = queries.withdrawals(since=since, until=until)
+    by_type = queries.totals_by(withdrawals, Withdrawal, Withdrawal.withdrawal_type)
+    total = sum(total for count, total in by_type.values())
+    savings_total = by_type.get('savings', (0, 0.0))[1]
+    investment_total = by_type.get('investment', (0, 0.0))[1]
+    withdrawals = queries.page(withdrawals.options(db.joinedload(Withdrawal.customer)), Withdrawal.date.desc(), Withdrawal.id.desc())
+    return render_template('withdrawal_report.html', withdrawals=withdrawals, total=total, from_date=from_date, to_date=to_date, savings_total=savings_total, investment_total=investment_total)
+
+
+@bp.route('/admin/arrears', methods=['GET', 'POST'])
+@request_class('heavy')
+@login_required
+@reads_from_replica
+def arrears_report():
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    from portfolio import take_snapshot, snapshot_report, BUCKETS
+    if request.method == 'POST':
+        try:
+            summary = take_snapshot()
+            flash(f"Snapshot তৈরি হয়েছে! {summary['loans']} টি লোন, PAR30: {summary['par30']:.2%}", 'success')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error: {str(e)}', 'danger')
+        return redirect(url_for('reports.arrears_report'))
+    
+    snapshot_dates = [d for (d,) in db.session.query(ArrearsSnapshot.snapshot_date).distinct().order_by(ArrearsSnapshot.snapshot_date.desc()).limit(60)]
+    selected_date_str = request.args.get('date')
+    if selected_date_str:
+        snapshot_date = datetime.strptime(selected_date_str, '%Y-%m-%d').date()
+    else:
+        snapshot_date = snapshot_dates[0] if snapshot_dates else None
+    
+    report = snapshot_report(snapshot_date) if snapshot_date else None
+    staffs = {u.id: u.name for u in User.query.filter_by(role='staff').all()}
+    return render_template('arrears_report.html', report=report, buckets=BUCKETS, snapshot_date=snapshot_date, snapshot_dates=snapshot_dates, staffs=staffs)
+
+
+@bp.route('/staff_collection_report/<int:id>')
+@request_class('heavy')
+@login_required
+def staff_collection_report(id):
+    if current_user.role != 'admin':
+        flash('Access denied!', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    staff = User.query.get_or_404(id)
+    loan_collections = _collection_rows(LoanCollection.query.filter_by(staff_id=id).order_by(LoanCollection.collection_date.desc()), LoanCollection)
+    saving_collections = _collection_rows(SavingCollection.query.filter_by(staff_id=id).order_by(SavingCollection.collection_date.desc()), SavingCollection)
+    total_loan = sum(lc.amount for lc in loan_collections)
+    total_saving = sum(sc.amount for sc in saving_collections)
+    return render_template('staff_collection_report.html', staff=staff, loan_collections=loan_collections, saving_collections=saving_collections, total_loan=total_loan, total_saving=total_saving)